@@ -0,0 +1,806 @@
+"""Measure the latency and allocations of each suppression probe.
+
+The probes run offline against recorded fixtures in benchmarks/fixtures:
+
+* processes.tsv.gz - a process table (pid, uid, comm, argv[0]) written out
+  as a synthetic /proc, read by the process index and by psutil
+* windows.txt.gz - the output of xwininfo -tree -root
+* config.yaml - a user config with process and window blacklists
+
+For each benchmark the distribution of the wall time of a call (min, p50,
+p90, p99, max) is reported, together with the peak memory allocated during
+a call as traced by tracemalloc. The full validation runs _validateTimeout
+of the core on the validation pipeline's threads, with the probe cache
+emptied before every call.
+
+The results are compared to a baseline saved on the same machine with
+--save-baseline, by default in benchmarks/baselines which isn't committed.
+A benchmark regresses when its peak allocation or its p50, scaled by how
+much faster or slower a fixed calibration workload ran than when the
+benchmark's baseline was saved, grows by more than the threshold, and the
+script then exits with 1. The scaling absorbs CPU frequency changes
+between runs, it doesn't make baselines from other machines comparable.
+
+The committed fixtures are generated, terminal server sized, --generate
+rewrites them and --record replaces them with this machine's processes and
+windows.
+
+Usage:
+    python benchmarks/probes.py [--only process_*] [--threshold 0.25]
+        [--save-baseline] [--generate | --record]
+"""
+import argparse
+import fnmatch
+import gc
+import gzip
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+_SOURCE_DIRECTORY = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "src")
+)
+_FIXTURE_DIRECTORY = os.path.join(os.path.dirname(__file__), "fixtures")
+_PROCESSES_FIXTURE = os.path.join(_FIXTURE_DIRECTORY, "processes.tsv.gz")
+_WINDOWS_FIXTURE = os.path.join(_FIXTURE_DIRECTORY, "windows.txt.gz")
+_CONFIG_FIXTURE = os.path.join(_FIXTURE_DIRECTORY, "config.yaml")
+_DEFAULT_BASELINE = os.path.join(
+    os.path.dirname(__file__), "baselines", "probes.json"
+)
+
+_WARMUP_RUNS = 3
+_MIN_RUNS = 10
+_ALLOCATION_RUNS = 5
+# changes below these are noise whatever the threshold
+_TIME_FLOOR_US = 2.0
+_ALLOCATION_FLOOR_KIB = 1.0
+# seconds the calibration workload is timed for, before and after the
+# benchmarks
+_CALIBRATION_TIME = 0.3
+_CALIBRATION_TEXT = "\n".join("process-{}".format(i) for i in range(2000))
+_CALIBRATION_PATTERN = re.compile(r"^PROCESS-1999$", re.MULTILINE)
+
+# comm is truncated like the kernel does
+_COMM_LENGTH = 15
+
+_SYSTEM_PROCESSES = [
+    "systemd", "systemd-journald", "systemd-udevd", "systemd-logind",
+    "systemd-resolved", "systemd-timesyncd", "dbus-daemon", "polkitd",
+    "rsyslogd", "cron", "sshd", "NetworkManager", "wpa_supplicant",
+    "avahi-daemon", "cupsd", "cups-browsed", "udisksd", "accounts-daemon",
+    "xrdp", "xrdp-sesman", "containerd", "dockerd", "snapd", "chronyd",
+    "irqbalance", "thermald", "rtkit-daemon", "colord", "agetty",
+    "unattended-upgrade-shutdown",
+]
+_KERNEL_THREADS = [
+    "kworker/{}:{}", "ksoftirqd/{}", "migration/{}", "cpuhp/{}",
+    "idle_inject/{}", "kworker/{}:{}H",
+]
+_SESSION_PROCESSES = [
+    "systemd", "(sd-pam)", "sshd", "bash", "Xorg", "xrdp-chansrv",
+    "dbus-daemon", "xfce4-session", "xfwm4", "xfce4-panel", "xfsettingsd",
+    "xfdesktop", "xfce4-power-manager", "xfce4-notifyd", "Thunar",
+    "panel-6-systray", "at-spi-bus-launcher", "at-spi2-registryd",
+    "gvfsd", "gvfsd-fuse", "gvfs-udisks2-volume-monitor", "pipewire",
+    "wireplumber", "pipewire-pulse", "ssh-agent", "gpg-agent",
+    "xiccd", "light-locker", "nm-applet", "blueman-applet",
+    "eyecare_reminder", "xfce4-terminal", "tmux: server",
+]
+_APPLICATION_PROCESSES = [
+    ["firefox", "Web Content", "Web Content", "Web Content",
+     "WebExtensions", "Privileged Cont", "RDD Process", "Socket Process",
+     "Utility Process", "Isolated Web Co", "Isolated Web Co"],
+    ["thunderbird", "Web Content"],
+    ["code", "code", "code", "code", "code", "python3", "node"],
+    ["slack", "slack", "slack", "slack"],
+    ["soffice.bin", "oosplash"],
+    ["spotify", "spotify", "spotify"],
+    ["python3", "ipython"],
+    ["vim"],
+    ["htop"],
+    ["evince"],
+]
+# truncated names whose argv[0] doesn't start with them
+_ALIASES = {
+    "Isolated Web Co": "/usr/lib/firefox/firefox",
+    "Privileged Cont": "/usr/lib/firefox/firefox",
+    "Utility Process": "/usr/lib/firefox/firefox",
+    "Web Content": "/usr/lib/firefox/firefox",
+    "WebExtensions": "/usr/lib/firefox/firefox",
+    "RDD Process": "/usr/lib/firefox/firefox",
+    "Socket Process": "/usr/lib/firefox/firefox",
+    "tmux: server": "tmux",
+    "(sd-pam)": "(sd-pam)",
+}
+_WINDOW_TITLES = [
+    "{} - Mozilla Firefox", "Inbox - {}@example.com - Mozilla Thunderbird",
+    "{}@terminal: ~/src", "main.py - {} - Visual Studio Code",
+    "Slack | {} | Team", "Spotify Premium", "{}.ods - LibreOffice Calc",
+    "Report {} - LibreOffice Writer", "{} - File Manager",
+    "Document Viewer - {}.pdf",
+]
+_WINDOW_CLASSES = [
+    ("Navigator", "firefox"), ("Mail", "thunderbird"),
+    ("xfce4-terminal", "Xfce4-terminal"), ("code", "Code"),
+    ("slack", "Slack"), ("spotify", "Spotify"),
+    ("libreoffice", "libreoffice-calc"),
+    ("libreoffice", "libreoffice-writer"), ("thunar", "Thunar"),
+    ("evince", "Evince"),
+]
+_SESSION_WINDOWS = [
+    ("xfce4-panel", ("xfce4-panel", "Xfce4-panel")),
+    ("Desktop", ("xfdesktop", "Xfdesktop")),
+    ("xfce4-notifyd", ("xfce4-notifyd", "Xfce4-notifyd")),
+    ("Whisker Menu", ("wrapper-2.0", "Wrapper-2.0")),
+]
+_WORDS = [
+    "alice", "bob", "carol", "dave", "erin", "frank", "grace", "heidi",
+    "ivan", "judy", "mallory", "niaj", "olivia", "peggy", "rupert",
+    "sybil", "trent", "victor", "walter", "quarterly", "budget", "roadmap",
+]
+
+
+def _argv0(name):
+    return _ALIASES.get(name, "/usr/bin/{}".format(name))
+
+
+def _generateProcesses(rng, sessions):
+    # kernel threads have no command line
+    names = []
+    for cpu in range(32):
+        for pattern in _KERNEL_THREADS:
+            names.append((0, pattern.format(cpu, rng.randrange(4)), ""))
+    names.extend((0, name, _argv0(name)) for name in _SYSTEM_PROCESSES)
+    for session in range(sessions):
+        uid = 1001 + session
+        programs = list(_SESSION_PROCESSES)
+        for application in rng.sample(_APPLICATION_PROCESSES, 6):
+            programs.extend(application)
+            # some run more tabs or windows than others
+            programs.extend(
+                application[-1] for _ in range(rng.randrange(4))
+            )
+        names.extend((uid, name, _argv0(name)) for name in programs)
+    rows = []
+    pid = 1
+    for uid, name, argv0 in names:
+        pid += rng.randrange(1, 40)
+        rows.append((pid, uid, name[:_COMM_LENGTH], argv0))
+    return rows
+
+
+def _windowLine(indent, window_id, title, classes, geometry):
+    name = '"{}"'.format(title) if title else "(has no name)"
+    class_names = '("{}" "{}")'.format(*classes) if classes else "()"
+    return "{}0x{:x} {}: {}  {}  +{}".format(
+        " " * indent, window_id, name, class_names, geometry,
+        geometry.split("+", 1)[1],
+    )
+
+
+def _children(lines, indent, count):
+    lines.append("{}{} {}:".format(
+        " " * indent, count, "child" if count == 1 else "children"
+    ))
+
+
+def _generateWindows(rng, sessions):
+    # one X server per session, like a terminal server's xwininfo would
+    # show them concatenated
+    lines = []
+    window_id = 0x1e00000
+    for session in range(sessions):
+        top_level = []
+        for title, classes in _SESSION_WINDOWS:
+            top_level.append((title, classes, 1))
+        for _ in range(rng.randrange(6, 14)):
+            index = rng.randrange(len(_WINDOW_TITLES))
+            title = _WINDOW_TITLES[index]
+            if "{}" in title:
+                title = title.format(rng.choice(_WORDS))
+            top_level.append((title, _WINDOW_CLASSES[index], 2))
+        # unnamed helper and tooltip windows outnumber the named ones
+        for _ in range(rng.randrange(20, 40)):
+            top_level.append((None, None, 0))
+        rng.shuffle(top_level)
+        root = 0x6a0 + session
+        lines.extend([
+            "",
+            "xwininfo: Window id: 0x{:x} (the root window) "
+            "(has no name)".format(root),
+            "",
+            "  Root window id: 0x{:x} (the root window) "
+            "(has no name)".format(root),
+            "  Parent window id: 0x0 (none)",
+        ])
+        _children(lines, 5, len(top_level))
+        for title, classes, depth in top_level:
+            window_id += rng.randrange(1, 0x200)
+            lines.append(_windowLine(
+                5, window_id, title, classes, "1920x1048+0+32"
+            ))
+            if depth:
+                # the frame's client window and its focus proxy
+                _children(lines, 8, depth)
+                for child in range(depth):
+                    window_id += 1
+                    lines.append(_windowLine(
+                        8,
+                        window_id,
+                        title if child == 0 else None,
+                        classes if child == 0 else None,
+                        "1920x1048+0+0" if child == 0 else "1x1+-1+-1",
+                    ))
+    lines.append("")
+    return "\n".join(lines) + "\n"
+
+
+def _writeFixture(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # without a timestamp regenerating gives identical files
+    with open(path, "wb") as _f:
+        with gzip.GzipFile(filename="", mode="wb", fileobj=_f, mtime=0) as gz:
+            gz.write(data)
+
+
+def _writeProcesses(rows):
+    _writeFixture(_PROCESSES_FIXTURE, "".join(
+        "{}\t{}\t{}\t{}\n".format(*row) for row in rows
+    ).encode())
+
+
+def _generate(seed, sessions):
+    rng = random.Random(seed)
+    rows = _generateProcesses(rng, sessions)
+    _writeProcesses(rows)
+    windows = _generateWindows(rng, sessions)
+    _writeFixture(_WINDOWS_FIXTURE, windows.encode())
+    print("generated {} processes and {} windows".format(
+        len(rows), windows.count("\n     0x")
+    ))
+
+
+def _record():
+    rows = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        path = os.path.join("/proc", entry)
+        try:
+            uid = os.stat(path).st_uid
+            with open(os.path.join(path, "comm"), "rb") as _f:
+                comm = _f.read().rstrip(b"\n").decode(errors="replace")
+            with open(os.path.join(path, "cmdline"), "rb") as _f:
+                argv0 = _f.read().split(b"\0")[0].decode(errors="replace")
+        except OSError:
+            continue
+        rows.append((int(entry), uid, comm.replace("\t", " "),
+                     argv0.replace("\t", " ").replace("\n", " ")))
+    _writeProcesses(sorted(rows))
+    print("recorded {} processes".format(len(rows)))
+    try:
+        windows = subprocess.check_output(["xwininfo", "-tree", "-root"])
+    except (OSError, subprocess.CalledProcessError) as e:
+        print("windows not recorded: {}".format(e))
+        return
+    _writeFixture(_WINDOWS_FIXTURE, windows)
+    print("recorded {} windows".format(windows.count(b"\n")))
+
+
+def _readFixture(path):
+    with gzip.open(path, "rb") as _f:
+        return _f.read()
+
+
+def _readProcesses():
+    rows = []
+    for line in _readFixture(_PROCESSES_FIXTURE).decode().splitlines():
+        pid, uid, comm, argv0 = line.split("\t")
+        rows.append((int(pid), int(uid), comm, argv0))
+    return rows
+
+
+def _writeProc(directory, rows):
+    """Lay out the process table as the /proc files the probes read."""
+    with open(os.path.join(directory, "stat"), "w") as _f:
+        # psutil reads the boot time to compute the process start times
+        _f.write("cpu  0 0 0 0 0 0 0 0 0 0\nbtime 1700000000\n")
+    for pid, uid, comm, argv0 in rows:
+        path = os.path.join(directory, str(pid))
+        os.mkdir(path)
+        with open(os.path.join(path, "comm"), "w") as _f:
+            _f.write(comm + "\n")
+        with open(os.path.join(path, "cmdline"), "w") as _f:
+            _f.write(argv0 + "\0")
+        with open(os.path.join(path, "stat"), "w") as _f:
+            # the fields of proc(5) after the name, start time 22nd
+            fields = ["S", "1", str(pid), str(pid)] + ["0"] * 15
+            fields += ["100"] + ["0"] * 30
+            _f.write("{} ({}) {}\n".format(pid, comm, " ".join(fields)))
+
+
+def _windowNames(dump):
+    # the strings WindowIndex.text holds, titles and class names
+    names = []
+    for match in re.finditer(
+        r'^\s+0x[0-9a-f]+ (?:"(.*)"|\(has no name\)): \((.*)\)',
+        dump,
+        re.MULTILINE,
+    ):
+        if match.group(1):
+            names.append(match.group(1))
+        names.extend(re.findall(r'"([^"]*)"', match.group(2)))
+    return names
+
+
+class _NullBackend(object):
+    """Accept sounds without an audio device, leaving the engine's own
+    dispatch to be measured."""
+
+    name = "null"
+
+    def load(self, sound):
+        pass
+
+    def play(self, sound):
+        pass
+
+
+class _Loop(object):
+    """The event loop adapter of the validation benchmark.
+
+    Timers never fire, results handed back from the validation threads
+    wake the benchmark up.
+    """
+
+    def __init__(self):
+        self.finished = threading.Event()
+        self.result = None
+
+    def createTimerBackend(self):
+        return _Timer()
+
+    def callSoon(self, callback):
+        pass
+
+    def callSoonThreadsafe(self, callback, *args):
+        self.result = args[0] if args else None
+        self.finished.set()
+
+    def addReader(self, fd, callback):
+        pass
+
+    def removeReader(self, fd):
+        pass
+
+    def stop(self):
+        pass
+
+
+class _Timer(object):
+
+    def setCallback(self, callback):
+        pass
+
+    def arm(self, deadline, tolerance):
+        pass
+
+    def disarm(self):
+        pass
+
+
+class _Idle(object):
+
+    @staticmethod
+    def getIdleTime():
+        return 0
+
+
+class _Microphone(object):
+    isConnected = True
+    isCaptureActive = False
+
+
+class _WindowIndex(object):
+
+    def __init__(self, names):
+        self.text = "\n".join(names)
+
+
+def _createBenchmarks(proc_directory, windows_dump):
+    """Return the benchmarks as (name, function, setup) tuples."""
+    from eyecare_reminder import (
+        audio, config, core, loader, matcher, processes, utils,
+    )
+
+    class FixtureProcessIndex(processes.ProcessIndex):
+        """The process index, scanning the fixture /proc without events."""
+
+        @staticmethod
+        def _openConnector():
+            return None
+
+    class FixtureCore(core.ReminderCore):
+        """The core, probing the fixtures on its real validation pipeline."""
+
+        def _createConfigLoader(self):
+            return loader.ConfigLoader(_CONFIG_FIXTURE, environment={})
+
+        def _createProbeSources(self):
+            self._idle_backend = _Idle()
+            self._window_index = window_index
+            self._process_index = process_index
+            self._microphone_monitor = _Microphone()
+
+        def _createConfigWatcher(self):
+            return None
+
+        def _deferredStartup(self):
+            pass
+
+    processes._PROC = proc_directory
+    process_index = FixtureProcessIndex(float("inf"))
+    window_index = _WindowIndex(
+        _windowNames(windows_dump.decode(errors="replace"))
+    )
+    user_config = utils.import_yaml(_CONFIG_FIXTURE)
+    process_matcher = core.ReminderCore._compileProcessRule(
+        user_config["blacklist_process_names"]
+    )
+    window_matcher = matcher.compileRules(
+        user_config["blacklist_window_names"]
+    )[config.window_mode_any]
+
+    backends = audio._BACKENDS
+    audio._BACKENDS = [_NullBackend]
+    try:
+        audio._ENGINE = audio.AudioEngine()
+    finally:
+        audio._BACKENDS = backends
+    audio._ENGINE.preload([config.reminder_sound])
+
+    loop = _Loop()
+    reminder_core = FixtureCore(loop)
+    from eyecare_reminder import headless
+    reminder_core.setup(headless.HeadlessFrontend(reminder_core, []))
+
+    def validate():
+        reminder_core._validateTimeout()
+        if not loop.finished.wait(config.probe_timeout * 2):
+            raise RuntimeError("Validation didn't finish")
+        if not loop.result.valid:
+            raise RuntimeError(
+                "Fixtures suppressed the timeout: {}".format(loop.result)
+            )
+
+    def resetValidation():
+        reminder_core._probe_cache.invalidate()
+        loop.finished.clear()
+
+    benchmarks = [
+        ("process_scan", process_index.rescan, None),
+        # the lookups of the core, the blacklists are absent from the
+        # fixtures so every lookup scans everything
+        (
+            "process_matcher",
+            lambda: process_matcher.search(process_index.text),
+            None,
+        ),
+        (
+            "window_output",
+            lambda: window_matcher.search(
+                windows_dump.decode(errors="replace")
+            ),
+            None,
+        ),
+        (
+            "window_matcher",
+            lambda: window_matcher.search(window_index.text),
+            None,
+        ),
+        ("yaml_import", lambda: utils.import_yaml(_CONFIG_FIXTURE), None),
+        (
+            "config_validate",
+            lambda: loader.ConfigLoader(
+                _CONFIG_FIXTURE, environment={}
+            ).load(),
+            None,
+        ),
+        (
+            "play_sound",
+            lambda: utils.play_sound(config.reminder_sound),
+            None,
+        ),
+        ("validate_timeout", validate, resetValidation),
+    ]
+    try:
+        import psutil
+    except ImportError:
+        print("psutil not installed, process_psutil skipped")
+    else:
+        psutil.PROCFS_PATH = proc_directory
+        benchmarks.insert(2, (
+            "process_psutil",
+            lambda: any(
+                process_matcher.search(name)
+                for name in utils.iterProcessNames()
+            ),
+            None,
+        ))
+    return benchmarks
+
+
+def _calibrationWorkload():
+    # the mix of bytecode, allocations and regex searches the probes run
+    names = {}
+    for line in _CALIBRATION_TEXT.splitlines():
+        names[line] = line.upper()
+    _CALIBRATION_PATTERN.search("\n".join(sorted(names.values())))
+
+
+def _percentile(values, fraction):
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def _timings(function, setup, min_time):
+    for _ in range(_WARMUP_RUNS):
+        if setup is not None:
+            setup()
+        function()
+    timings = []
+    gc.collect()
+    # like timeit, keep collections out of the timings
+    gc.disable()
+    try:
+        deadline = time.perf_counter() + min_time
+        while len(timings) < _MIN_RUNS or time.perf_counter() < deadline:
+            if setup is not None:
+                setup()
+            started = time.perf_counter_ns()
+            function()
+            timings.append(time.perf_counter_ns() - started)
+    finally:
+        gc.enable()
+    timings.sort()
+    return timings
+
+
+def _calibrate():
+    """Return the p50 of the calibration workload in us, compared like the
+    benchmarks' p50."""
+    timings = _timings(_calibrationWorkload, None, _CALIBRATION_TIME)
+    return _percentile(timings, 0.5) / 1000
+
+
+def _measure(function, setup, min_time):
+    timings = _timings(function, setup, min_time)
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(_ALLOCATION_RUNS):
+            if setup is not None:
+                setup()
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            function()
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+    finally:
+        tracemalloc.stop()
+    peaks.sort()
+
+    result = {"runs": len(timings)}
+    for name, fraction in (
+        ("min", 0.0), ("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0)
+    ):
+        result["{}_us".format(name)] = round(
+            _percentile(timings, fraction) / 1000, 2
+        )
+    result["peak_kib"] = round(_percentile(peaks, 0.5) / 1024, 2)
+    return result
+
+
+def _machine():
+    model = platform.processor()
+    try:
+        with open("/proc/cpuinfo") as _f:
+            for line in _f:
+                if line.startswith("model name"):
+                    model = line.split(":", 1)[1].strip()
+                    break
+    except OSError:
+        pass
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "system": platform.system(),
+        "cpu": model,
+        "cpus": os.cpu_count(),
+    }
+
+
+def _expected(result, baseline, metric):
+    before = (baseline or {}).get(metric)
+    if before is None or not metric.endswith("_us"):
+        return before
+    # timings follow the speed of the machine at the time
+    return before * result["calibration_us"] / baseline.get(
+        "calibration_us", result["calibration_us"]
+    )
+
+
+def _regressions(name, result, baseline, threshold):
+    """Return the metrics of a benchmark that regressed beyond threshold."""
+    problems = []
+    for metric, floor in (
+        ("p50_us", _TIME_FLOOR_US), ("peak_kib", _ALLOCATION_FLOOR_KIB)
+    ):
+        before = _expected(result, baseline, metric)
+        if before is None:
+            continue
+        after = result[metric]
+        if after > before * (1 + threshold) and after - before > floor:
+            problems.append("{} {} {:.2f} -> {:.2f} (+{:.0f}%)".format(
+                name, metric, before, after,
+                (after / before - 1) * 100 if before else float("inf"),
+            ))
+    return problems
+
+
+def _change(result, baseline, metric):
+    before = _expected(result, baseline, metric)
+    if not before:
+        return ""
+    return "{:+.0f}%".format((result[metric] / before - 1) * 100)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--only", action="append", default=[], metavar="PATTERN",
+        help="run the benchmarks matching a glob pattern, repeatable",
+    )
+    parser.add_argument(
+        "--min-time", type=float, default=1.0, metavar="SECONDS",
+        help="time each benchmark for at least this long",
+    )
+    parser.add_argument(
+        "--threshold", type=float, default=0.25,
+        help="relative growth counted as a regression, eg. 0.25 for 25%%",
+    )
+    parser.add_argument(
+        "--baseline", default=_DEFAULT_BASELINE, metavar="PATH",
+        help="the baseline file to compare with or save to",
+    )
+    parser.add_argument(
+        "--save-baseline", action="store_true",
+        help="save the results as the baseline of this machine",
+    )
+    parser.add_argument(
+        "--json", action="store_true", help="print the results as JSON"
+    )
+    fixtures = parser.add_mutually_exclusive_group()
+    fixtures.add_argument(
+        "--generate", action="store_true",
+        help="rewrite the process and window fixtures from --seed",
+    )
+    fixtures.add_argument(
+        "--record", action="store_true",
+        help="replace the fixtures with this session's processes and windows",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="seed of --generate"
+    )
+    parser.add_argument(
+        "--sessions", type=int, default=40,
+        help="user sessions the fixtures of --generate hold",
+    )
+    arguments = parser.parse_args()
+    if arguments.generate:
+        _generate(arguments.seed, arguments.sessions)
+        return 0
+    if arguments.record:
+        _record()
+        return 0
+
+    sys.path.insert(0, _SOURCE_DIRECTORY)
+    proc_directory = tempfile.mkdtemp(prefix="eyecare_reminder_proc_")
+    try:
+        _writeProc(proc_directory, _readProcesses())
+        benchmarks = _createBenchmarks(
+            proc_directory, _readFixture(_WINDOWS_FIXTURE)
+        )
+        calibration = _calibrate()
+        results = {}
+        for name, function, setup in benchmarks:
+            if arguments.only and not any(
+                fnmatch.fnmatch(name, pattern) for pattern in arguments.only
+            ):
+                continue
+            results[name] = _measure(function, setup, arguments.min_time)
+        # the machine may have sped up or slowed down meanwhile
+        calibration = round((calibration + _calibrate()) / 2, 2)
+        for result in results.values():
+            result["calibration_us"] = calibration
+    finally:
+        shutil.rmtree(proc_directory)
+
+    machine = _machine()
+    baseline = {}
+    try:
+        with open(arguments.baseline) as _f:
+            baseline = json.load(_f)
+    except FileNotFoundError:
+        if not arguments.save_baseline:
+            print("no baseline at {}".format(arguments.baseline))
+    baseline_results = baseline.get("benchmarks", {})
+
+    if arguments.json:
+        print(json.dumps(
+            {"machine": machine, "benchmarks": results},
+            indent=2,
+            sort_keys=True,
+        ))
+    else:
+        print("calibration {:.1f}us".format(calibration))
+        print("{:<17} {:>6} {:>10} {:>10} {:>10} {:>10} {:>10} {:>10}"
+              " {:>7} {:>7}".format(
+                  "benchmark", "runs", "min us", "p50 us", "p90 us",
+                  "p99 us", "max us", "peak KiB", "p50", "peak",
+              ))
+        for name, result in results.items():
+            print("{:<17} {:>6} {:>10.1f} {:>10.1f} {:>10.1f} {:>10.1f}"
+                  " {:>10.1f} {:>10.1f} {:>7} {:>7}".format(
+                      name, result["runs"], result["min_us"],
+                      result["p50_us"], result["p90_us"], result["p99_us"],
+                      result["max_us"], result["peak_kib"],
+                      _change(result, baseline_results.get(name), "p50_us"),
+                      _change(
+                          result, baseline_results.get(name), "peak_kib"
+                      ),
+                  ))
+
+    if arguments.save_baseline:
+        if baseline.get("machine") != machine:
+            # results of another machine aren't kept alongside
+            baseline_results = {}
+        baseline_results.update(results)
+        os.makedirs(os.path.dirname(arguments.baseline), exist_ok=True)
+        with open(arguments.baseline, "w") as _f:
+            json.dump(
+                {"machine": machine, "benchmarks": baseline_results},
+                _f,
+                indent=2,
+                sort_keys=True,
+            )
+            _f.write("\n")
+        print("baseline saved to {}".format(arguments.baseline))
+        return 0
+    if not baseline_results:
+        return 0
+    if baseline.get("machine") != machine:
+        print("warning: the baseline was saved on another machine: {}".format(
+            baseline.get("machine")
+        ))
+    problems = []
+    for name, result in results.items():
+        if name in baseline_results:
+            problems.extend(_regressions(
+                name, result, baseline_results[name], arguments.threshold
+            ))
+    for problem in problems:
+        print("regression: {}".format(problem))
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+"""Measure how long eyecare reminder takes to start.
+
+Every run starts the app in a fresh interpreter with empty XDG directories
+and reports:
+
+* wall - from spawning the process to the app being ready
+* ready - from the start of the app's imports to the tray icon being shown,
+  or with --headless, to the asyncio loop running
+* deferred - the work done after that, see ReminderCore._deferredStartup
+* rss - the resident memory once the deferred work is done
+
+followed by the modules with the highest import time, from a run with
+python -X importtime.
+
+The first run parses the config, later runs reuse the parsed config cache,
+pass --cold to start every run from empty directories.
+
+Usage:
+    python benchmarks/startup.py [--runs 10] [--top 20] [--cold] [--headless]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+_SOURCE_DIRECTORY = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "src")
+)
+
+
+def _residentMegabytes():
+    with open("/proc/self/status") as _f:
+        for line in _f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def _child():
+    started = time.perf_counter()
+    from PyQt5.QtCore import QTimer
+    from PyQt5.QtWidgets import QApplication
+    from eyecare_reminder import eyecare_reminder, view
+
+    app = QApplication(sys.argv[:1])
+    app.setQuitOnLastWindowClosed(False)
+    result = {}
+
+    def shown():
+        result["ready"] = (time.perf_counter() - started) * 1000
+        # wall time is measured by the parent up to this line
+        print("shown", flush=True)
+
+    def deferred():
+        result["deferred"] = (
+            (time.perf_counter() - started) * 1000 - result["ready"]
+        )
+        result["rss"] = _residentMegabytes()
+        print(json.dumps(result), flush=True)
+        app.quit()
+
+    controller = eyecare_reminder.EyecareReminder()
+    _view = view.View(controller)
+    # zero timers run in the order they were started, so shown runs on the
+    # first event loop iteration, before the controller's deferred startup
+    QTimer.singleShot(0, shown)
+    controller.setup(_view)
+    _view.show()
+    QTimer.singleShot(0, deferred)
+    app.exec()
+
+
+def _headlessChild():
+    started = time.perf_counter()
+    import asyncio
+    from eyecare_reminder import aioloop, core, headless
+
+    loop = asyncio.new_event_loop()
+    result = {}
+
+    def shown():
+        result["ready"] = (time.perf_counter() - started) * 1000
+        print("shown", flush=True)
+
+    def deferred():
+        result["deferred"] = (
+            (time.perf_counter() - started) * 1000 - result["ready"]
+        )
+        result["rss"] = _residentMegabytes()
+        result["qt"] = any(name.startswith("PyQt5") for name in sys.modules)
+        print(json.dumps(result), flush=True)
+        loop.stop()
+
+    reminder_core = core.ReminderCore(aioloop.AsyncioEventLoop(loop))
+    # callbacks run in the order they were scheduled, like in _child
+    loop.call_soon(shown)
+    reminder_core.setup(headless.HeadlessFrontend(reminder_core, []))
+    loop.call_soon(deferred)
+    loop.run_forever()
+
+
+def _environment(directory):
+    environment = dict(os.environ)
+    environment["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [_SOURCE_DIRECTORY, environment.get("PYTHONPATH")])
+    )
+    for name in ("CONFIG", "DATA", "CACHE"):
+        path = os.path.join(directory, name.lower())
+        os.makedirs(path, exist_ok=True)
+        environment["XDG_{}_HOME".format(name)] = path
+    # the log file is opened at import time
+    os.makedirs(
+        os.path.join(directory, "config", "eyecare_reminder"), exist_ok=True
+    )
+    # keep the system config out of the measurement
+    environment["XDG_CONFIG_DIRS"] = os.path.join(directory, "system")
+    return environment
+
+
+def _run(directory, headless, python_options=()):
+    command = [sys.executable] + list(python_options) + [__file__, "--child"]
+    if headless:
+        command.append("--headless")
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        command,
+        env=_environment(directory),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    if process.stdout.readline().strip() != "shown":
+        raise RuntimeError(process.communicate()[1])
+    wall = (time.perf_counter() - started) * 1000
+    stdout, stderr = process.communicate()
+    result = json.loads(stdout)
+    result["wall"] = wall
+    return result, stderr
+
+
+def _importTimes(stderr):
+    # lines look like "import time:  self [us] | cumulative | name"
+    times = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times.append((int(self_us), int(cumulative_us), name.rstrip()))
+    return times
+
+
+def _printSummary(name, values, unit="ms"):
+    print(
+        "{0:<10} min {1:8.1f}{4}  median {2:8.1f}{4}  max {3:8.1f}{4}".format(
+            name, min(values), statistics.median(values), max(values), unit
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--cold", action="store_true")
+    parser.add_argument("--headless", action="store_true")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    arguments = parser.parse_args()
+    if arguments.child:
+        if arguments.headless:
+            _headlessChild()
+        else:
+            _child()
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as shared_directory:
+        for _ in range(arguments.runs):
+            if arguments.cold:
+                with tempfile.TemporaryDirectory() as directory:
+                    results.append(_run(directory, arguments.headless)[0])
+            else:
+                results.append(_run(shared_directory, arguments.headless)[0])
+        _, stderr = _run(
+            shared_directory,
+            arguments.headless,
+            python_options=["-X", "importtime"],
+        )
+
+    print("{} runs, {}".format(
+        arguments.runs, "headless" if arguments.headless else "tray"
+    ))
+    for name in ("wall", "ready", "deferred"):
+        _printSummary(name, [result[name] for result in results])
+    _printSummary("rss", [result["rss"] for result in results], unit="MB")
+    if any(result.get("qt") for result in results):
+        print("warning: Qt was imported in headless mode")
+
+    times = _importTimes(stderr)
+    print()
+    print("total import time {:.1f}ms".format(
+        sum(self_us for self_us, _, _ in times) / 1000
+    ))
+    print("{:>10} {:>12}  module".format("self", "cumulative"))
+    for self_us, cumulative_us, name in sorted(times, reverse=True)[
+        :arguments.top
+    ]:
+        print("{:>8.1f}ms {:>10.1f}ms  {}".format(
+            self_us / 1000, cumulative_us / 1000, name
+        ))
+
+
+if __name__ == "__main__":
+    main()
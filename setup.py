@@ -55,6 +55,9 @@ setup(
         (desktop_file_directory, [desktop_file_name]),
         (icon_file_directory, ["src/eyecare_reminder/images/icon.png"])
     ],
+    # the notification client needs jeepney.io, without it the tray
+    # icon's own messages are shown
+    install_requires=["jeepney>=0.7"],
     keywords="eye eyecare reminder notification timer",
     python_requires=">=3.8",
 )
@@ -0,0 +1,144 @@
+"""The event loop adapter running the core on asyncio, without Qt."""
+import logging
+
+from . import clock
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class AsyncioTimerBackend(object):
+
+    def __init__(self, loop):
+        """The timer of a scheduler.Scheduler on an asyncio loop.
+
+        A timerfd on CLOCK_BOOTTIME is armed at the deadline where the
+        system has one, so deadlines that pass during a suspend fire on
+        resume. Otherwise the loop's own timer is used, which fires late by
+        the time spent suspended.
+
+        Args:
+            loop (asyncio.AbstractEventLoop): The loop.
+        """
+        self._loop = loop
+        self._callback = None
+        self._handle = None
+        self._timer_fd = clock.createTimerFd()
+        if self._timer_fd is not None:
+            loop.add_reader(self._timer_fd.fileno(), self._timerFdActivated)
+
+    def setCallback(self, callback):
+        """Set the function called when the timer fires.
+
+        Args:
+            callback (callable): Called without arguments.
+        """
+        self._callback = callback
+
+    def arm(self, deadline, tolerance):
+        """Arm the timer, replacing the earlier deadline.
+
+        Args:
+            deadline (float): A clock.now time.
+            tolerance (float): Seconds the timer may be off by, unused
+                as asyncio has no coarse timers.
+        """
+        if self._timer_fd is not None:
+            self._timer_fd.setDeadline(deadline)
+            return
+        if self._handle is not None:
+            self._handle.cancel()
+        self._handle = self._loop.call_at(
+            self._loop.time() + max(0.0, deadline - clock.now()), self._fired
+        )
+
+    def disarm(self):
+        """Stop the timer."""
+        if self._timer_fd is not None:
+            self._timer_fd.setDeadline(None)
+            self._timer_fd.acknowledge()
+        elif self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def _timerFdActivated(self):
+        if self._timer_fd.acknowledge():
+            self._fired()
+
+    def _fired(self):
+        self._handle = None
+        if self._callback is not None:
+            self._callback()
+
+
+class AsyncioEventLoop(object):
+
+    def __init__(self, loop):
+        """Run the callbacks of a core.ReminderCore on an asyncio loop.
+
+        Args:
+            loop (asyncio.AbstractEventLoop): The loop.
+        """
+        self.loop = loop
+
+    def createTimerBackend(self):
+        """Create the timer of the scheduler.
+
+        Returns:
+            AsyncioTimerBackend: The timer backend.
+        """
+        return AsyncioTimerBackend(self.loop)
+
+    def callSoon(self, callback):
+        """Call a function on the next event loop iteration.
+
+        Args:
+            callback (callable): Called without arguments.
+        """
+        self.loop.call_soon(callback)
+
+    def callSoonThreadsafe(self, callback, *args):
+        """Call a function on the event loop, from any thread.
+
+        Args:
+            callback (callable): The function.
+            *args: Its arguments.
+        """
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    def addReader(self, fd, callback):
+        """Call a function whenever a file descriptor is readable.
+
+        Args:
+            fd (int): The file descriptor.
+            callback (callable): Called without arguments.
+        """
+        self.loop.add_reader(fd, callback)
+
+    def removeReader(self, fd):
+        """Stop watching a file descriptor.
+
+        Args:
+            fd (int): The file descriptor.
+        """
+        self.loop.remove_reader(fd)
+
+    def addWriter(self, fd, callback):
+        """Call a function whenever a file descriptor is writable.
+
+        Args:
+            fd (int): The file descriptor.
+            callback (callable): Called without arguments.
+        """
+        self.loop.add_writer(fd, callback)
+
+    def removeWriter(self, fd):
+        """Stop waiting for a file descriptor to be writable.
+
+        Args:
+            fd (int): The file descriptor.
+        """
+        self.loop.remove_writer(fd)
+
+    def stop(self):
+        """Stop the loop."""
+        self.loop.stop()
@@ -0,0 +1,381 @@
+"""Notification sounds decoded once and played through a persistent output.
+
+Backends are tried in order: QSoundEffect from QtMultimedia, a long-lived
+ALSA playback handle through ctypes, and finally aplay fed from memory.
+"""
+import atexit
+import ctypes
+import ctypes.util
+import io
+import logging
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import wave
+
+_LOGGER = logging.getLogger(__name__)
+
+# alsa/pcm.h
+_SND_PCM_STREAM_PLAYBACK = 0
+_SND_PCM_ACCESS_RW_INTERLEAVED = 3
+_SND_PCM_FORMATS = {1: 1, 2: 2, 3: 32, 4: 10}  # sample width -> format
+_ALSA_LATENCY_US = 100000
+
+_ENGINE = None
+
+
+class AudioError(RuntimeError):
+    """Raised when a sound can't be decoded or played."""
+
+
+class Sound(object):
+
+    def __init__(self, path, wav_data):
+        """Decoded PCM data of a sound.
+
+        Args:
+            path (str): The source file path.
+            wav_data (bytes): The sound as a complete WAV file.
+        """
+        self.path = path
+        self.wav_data = wav_data
+        with wave.open(io.BytesIO(wav_data)) as _f:
+            self.channels = _f.getnchannels()
+            self.sample_width = _f.getsampwidth()
+            self.rate = _f.getframerate()
+            self.frames = _f.readframes(_f.getnframes())
+        self._wav_path = None
+
+    @property
+    def wavPath(self):
+        """str: Path of a WAV file holding the sound, written on demand
+        for sources that weren't WAV files."""
+        if self._wav_path is None:
+            if self.path.lower().endswith(".wav"):
+                self._wav_path = self.path
+            else:
+                handle, self._wav_path = tempfile.mkstemp(
+                    prefix="eyecare_reminder_", suffix=".wav"
+                )
+                with os.fdopen(handle, "wb") as _f:
+                    _f.write(self.wav_data)
+        return self._wav_path
+
+    def close(self):
+        """Delete the WAV file written for wavPath, if any."""
+        if self._wav_path is not None and self._wav_path != self.path:
+            try:
+                os.unlink(self._wav_path)
+            except OSError as e:
+                _LOGGER.warning(
+                    "COULD NOT DELETE {}: {}".format(self._wav_path, e)
+                )
+        self._wav_path = None
+
+
+def decodeSound(path):
+    """Decode a sound file into memory.
+
+    WAV files are read directly, other formats are converted once with
+    ffmpeg.
+
+    Args:
+        path (str): The sound file path.
+
+    Returns:
+        Sound: The decoded sound.
+
+    Raises:
+        AudioError: If the file can't be decoded.
+    """
+    if not path.lower().endswith(".wav") and shutil.which("ffmpeg") is None:
+        raise AudioError(
+            "Could not decode {}: ffmpeg is needed for sounds other than "
+            "WAV files".format(path)
+        )
+    try:
+        if path.lower().endswith(".wav"):
+            with open(path, "rb") as _f:
+                wav_data = _f.read()
+        else:
+            wav_data = subprocess.run(
+                ["ffmpeg", "-v", "error", "-i", path, "-f", "wav", "-"],
+                stdout=subprocess.PIPE,
+                check=True,
+            ).stdout
+        return Sound(path, wav_data)
+    except (OSError, subprocess.CalledProcessError, wave.Error) as e:
+        raise AudioError("Could not decode {}: {}".format(path, e))
+
+
+class QtBackend(object):
+    """Play through QSoundEffect, which keeps decoded sounds loaded."""
+    name = "qsoundeffect"
+
+    def __init__(self):
+        """Initialize the backend.
+
+        Raises:
+            AudioError: If QtMultimedia is unavailable.
+        """
+        if "PyQt5.QtCore" not in sys.modules:
+            # don't load Qt only to play sounds, eg. in headless mode
+            raise AudioError("Qt isn't in use")
+        try:
+            from PyQt5.QtCore import QCoreApplication
+            from PyQt5.QtMultimedia import QSoundEffect
+        except ImportError as e:
+            raise AudioError("QtMultimedia unavailable: {}".format(e))
+        if QCoreApplication.instance() is None:
+            raise AudioError("QSoundEffect requires a running application")
+        self._effect_class = QSoundEffect
+        self._effects = {}
+
+    def load(self, sound):
+        """Prepare a sound for playback.
+
+        Args:
+            sound (Sound): The decoded sound.
+        """
+        from PyQt5.QtCore import QUrl
+        effect = self._effect_class()
+        effect.setSource(QUrl.fromLocalFile(sound.wavPath))
+        self._effects[sound.path] = effect
+
+    def play(self, sound):
+        """Start playing a loaded sound.
+
+        Args:
+            sound (Sound): The decoded sound.
+        """
+        self._effects[sound.path].play()
+
+
+class AlsaBackend(object):
+    """Play through a long-lived ALSA handle owned by a worker thread."""
+    name = "alsa"
+
+    def __init__(self, device="default"):
+        """Initialize the backend.
+
+        Args:
+            device (str): The ALSA device name.
+
+        Raises:
+            AudioError: If libasound or the device is unavailable.
+        """
+        path = ctypes.util.find_library("asound") or "libasound.so.2"
+        try:
+            self._lib = ctypes.CDLL(path)
+        except OSError as e:
+            raise AudioError("libasound unavailable: {}".format(e))
+        self._lib.snd_pcm_open.argtypes = [
+            ctypes.POINTER(ctypes.c_void_p),
+            ctypes.c_char_p,
+            ctypes.c_int,
+            ctypes.c_int,
+        ]
+        self._lib.snd_pcm_set_params.argtypes = [
+            ctypes.c_void_p,
+            ctypes.c_int,
+            ctypes.c_int,
+            ctypes.c_uint,
+            ctypes.c_uint,
+            ctypes.c_int,
+            ctypes.c_uint,
+        ]
+        self._lib.snd_pcm_writei.argtypes = [
+            ctypes.c_void_p, ctypes.c_char_p, ctypes.c_ulong,
+        ]
+        self._lib.snd_pcm_writei.restype = ctypes.c_long
+        self._lib.snd_pcm_recover.argtypes = [
+            ctypes.c_void_p, ctypes.c_int, ctypes.c_int,
+        ]
+        self._lib.snd_pcm_drain.argtypes = [ctypes.c_void_p]
+        self._lib.snd_pcm_prepare.argtypes = [ctypes.c_void_p]
+        self._handle = ctypes.c_void_p()
+        error = self._lib.snd_pcm_open(
+            ctypes.byref(self._handle),
+            device.encode(),
+            _SND_PCM_STREAM_PLAYBACK,
+            0,
+        )
+        if error < 0:
+            raise AudioError("Could not open ALSA device {}".format(device))
+        self._format = None
+        self._queue = queue.Queue()
+        thread = threading.Thread(
+            target=self._run, name="audio", daemon=True
+        )
+        thread.start()
+
+    def load(self, sound):
+        """Check a sound can be played by ALSA.
+
+        Args:
+            sound (Sound): The decoded sound.
+
+        Raises:
+            AudioError: If the sample width is unsupported.
+        """
+        if sound.sample_width not in _SND_PCM_FORMATS:
+            raise AudioError(
+                "Unsupported sample width {}".format(sound.sample_width)
+            )
+
+    def play(self, sound):
+        """Queue a sound for playback and return immediately.
+
+        Args:
+            sound (Sound): The decoded sound.
+        """
+        self._queue.put(sound)
+
+    def _run(self):
+        while True:
+            sound = self._queue.get()
+            try:
+                self._write(sound)
+            except AudioError as e:
+                _LOGGER.error("COULD NOT PLAY SOUND: {}".format(e))
+
+    def _write(self, sound):
+        sound_format = (sound.sample_width, sound.channels, sound.rate)
+        if sound_format != self._format:
+            error = self._lib.snd_pcm_set_params(
+                self._handle,
+                _SND_PCM_FORMATS[sound.sample_width],
+                _SND_PCM_ACCESS_RW_INTERLEAVED,
+                sound.channels,
+                sound.rate,
+                1,
+                _ALSA_LATENCY_US,
+            )
+            if error < 0:
+                raise AudioError("Could not configure ALSA device")
+            self._format = sound_format
+        else:
+            self._lib.snd_pcm_prepare(self._handle)
+        frame_size = sound.sample_width * sound.channels
+        data = sound.frames
+        while data:
+            written = self._lib.snd_pcm_writei(
+                self._handle, data, len(data) // frame_size
+            )
+            if written < 0:
+                if self._lib.snd_pcm_recover(self._handle, written, 1) < 0:
+                    raise AudioError("ALSA write failed ({})".format(written))
+                continue
+            data = data[written * frame_size:]
+        self._lib.snd_pcm_drain(self._handle)
+
+
+class AplayBackend(object):
+    """Fall back to piping the decoded sound into aplay."""
+    name = "aplay"
+
+    def load(self, sound):
+        """Nothing to prepare, sounds are piped from memory.
+
+        Args:
+            sound (Sound): The decoded sound.
+        """
+
+    @staticmethod
+    def play(sound):
+        """Start playing a sound, reaping aplay from a worker thread.
+
+        Args:
+            sound (Sound): The decoded sound.
+        """
+        def run():
+            try:
+                subprocess.run(
+                    ["aplay", "-q", "-"],
+                    input=sound.wav_data,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                )
+            except OSError as e:
+                _LOGGER.error("COULD NOT PLAY SOUND: {}".format(e))
+        threading.Thread(target=run, name="aplay", daemon=True).start()
+
+
+_BACKENDS = [QtBackend, AlsaBackend, AplayBackend]
+
+
+class AudioEngine(object):
+
+    def __init__(self):
+        """Select the best available backend and hold the decoded sounds."""
+        self._sounds = {}
+        self._lock = threading.Lock()
+        self.backend = None
+        for backend_class in _BACKENDS:
+            try:
+                self.backend = backend_class()
+            except AudioError as e:
+                _LOGGER.warning(
+                    "AUDIO BACKEND {} UNAVAILABLE: {}".format(
+                        backend_class.name.upper(), e
+                    )
+                )
+                continue
+            break
+        _LOGGER.info("AUDIO BACKEND: {}".format(self.backend.name.upper()))
+
+    def preload(self, paths):
+        """Decode sounds ahead of their first playback.
+
+        Args:
+            paths (list[str]): The sound file paths.
+        """
+        for path in paths:
+            try:
+                self._load(path)
+            except AudioError as e:
+                _LOGGER.error(str(e))
+
+    def _load(self, path):
+        with self._lock:
+            sound = self._sounds.get(path)
+            if sound is None:
+                sound = decodeSound(path)
+                self.backend.load(sound)
+                self._sounds[path] = sound
+            return sound
+
+    def play(self, path):
+        """Play a sound, decoding it first if it wasn't preloaded.
+
+        Args:
+            path (str): The sound file path.
+
+        Raises:
+            AudioError: If the sound can't be decoded.
+        """
+        self.backend.play(self._load(path))
+
+    def shutdown(self):
+        """Delete the temporary files of the decoded sounds."""
+        with self._lock:
+            for sound in self._sounds.values():
+                sound.close()
+            self._sounds = {}
+
+
+def getAudioEngine():
+    """Return the shared audio engine, creating it on first use.
+
+    Returns:
+        AudioEngine: The audio engine.
+    """
+    global _ENGINE
+    if _ENGINE is None:
+        _ENGINE = AudioEngine()
+        atexit.register(_ENGINE.shutdown)
+    return _ENGINE
@@ -0,0 +1,101 @@
+import logging
+import threading
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ProbeCache(object):
+
+    def __init__(self, ttls, now=time.monotonic):
+        """Cache of probe results with a time to live per probe.
+
+        Event sources expire entries early through invalidate(), so probes
+        whose inputs they watch can use long time to live values.
+
+        Args:
+            ttls (dict[str, float]): Seconds each probe result stays valid,
+                probes not listed are never cached.
+            now (callable): Returns the current clock time in seconds.
+        """
+        self._ttls = dict(ttls)
+        self._now = now
+        self._entries = {}
+        self._hits = {}
+        self._misses = {}
+        # bumped by invalidate(), a result computed across an invalidation
+        # may predate it and isn't stored
+        self._generation = 0
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def _generationOf(self, probe):
+        return self._generation, self._generations.get(probe, 0)
+
+    def get(self, probe, key, compute):
+        """Return a cached result or compute and cache it.
+
+        Args:
+            probe (str): The probe name, selects the time to live.
+            key (object): Hashable argument of the probe.
+            compute (callable): Computes the result on a miss.
+
+        Returns:
+            object: The probe result.
+        """
+        ttl = self._ttls.get(probe)
+        if not ttl:
+            return compute()
+        now = self._now()
+        with self._lock:
+            entry = self._entries.get((probe, key))
+            if entry is not None and entry[0] > now:
+                self._hits[probe] = self._hits.get(probe, 0) + 1
+                return entry[1]
+            self._misses[probe] = self._misses.get(probe, 0) + 1
+            generation = self._generationOf(probe)
+        value = compute()
+        with self._lock:
+            if self._generationOf(probe) == generation:
+                self._entries[(probe, key)] = (now + ttl, value)
+        return value
+
+    def invalidate(self, probe=None):
+        """Expire cached results early.
+
+        Args:
+            probe (str, optional): The probe to expire, all if not given.
+        """
+        with self._lock:
+            if probe is None:
+                self._generation += 1
+                self._entries.clear()
+            else:
+                self._generations[probe] = self._generations.get(probe, 0) + 1
+                for entry_key in list(self._entries):
+                    if entry_key[0] == probe:
+                        del self._entries[entry_key]
+
+    def setTtls(self, ttls):
+        """Replace the time to live values, expiring every entry.
+
+        Args:
+            ttls (dict[str, float]): Seconds each probe result stays valid.
+        """
+        with self._lock:
+            self._ttls = dict(ttls)
+            self._generation += 1
+            self._entries.clear()
+
+    def logStats(self):
+        """Write the hit and miss counters of each probe to the log."""
+        with self._lock:
+            for probe in sorted(set(self._hits) | set(self._misses)):
+                hits = self._hits.get(probe, 0)
+                misses = self._misses.get(probe, 0)
+                message = "PROBE CACHE {}: {} HITS, {} MISSES, {:.0%} HIT RATE"
+                _LOGGER.info(
+                    message.format(
+                        probe.upper(), hits, misses, hits / (hits + misses)
+                    )
+                )
@@ -0,0 +1,159 @@
+"""The clock reminder deadlines are measured with.
+
+CLOCK_BOOTTIME is monotonic like time.monotonic, but unlike CLOCK_MONOTONIC
+on Linux it keeps counting while the system is suspended, so a deadline
+stays tied to the time that actually passed. A timerfd on that clock
+expires on resume if its deadline passed during the suspend.
+"""
+import ctypes
+import ctypes.util
+import logging
+import os
+import struct
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+# linux/time.h and sys/timerfd.h
+_CLOCK_BOOTTIME = getattr(time, "CLOCK_BOOTTIME", None)
+_TFD_CLOEXEC = 0o2000000
+_TFD_NONBLOCK = 0o4000
+_TFD_TIMER_ABSTIME = 1
+
+_EXPIRATIONS = struct.Struct("=Q")
+
+
+def now():
+    """Return the current time of the deadline clock.
+
+    Returns:
+        float: Seconds since an arbitrary point, including suspended time
+            where the system supports it.
+    """
+    if _CLOCK_BOOTTIME is not None:
+        return time.clock_gettime(_CLOCK_BOOTTIME)
+    return time.monotonic()
+
+
+def suspendedTime():
+    """Return the total time the system spent suspended since boot.
+
+    Returns:
+        float: The suspended time in seconds, 0 where it can't be measured.
+    """
+    if _CLOCK_BOOTTIME is None:
+        return 0.0
+    return max(0.0, now() - time.monotonic())
+
+
+def toWallTime(deadline):
+    """Convert a deadline to wall clock time.
+
+    Args:
+        deadline (float): A time of the deadline clock.
+
+    Returns:
+        float: The deadline in seconds since the epoch.
+    """
+    return time.time() + deadline - now()
+
+
+class _Timespec(ctypes.Structure):
+    _fields_ = [("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long)]
+
+
+class _Itimerspec(ctypes.Structure):
+    _fields_ = [("it_interval", _Timespec), ("it_value", _Timespec)]
+
+
+class TimerFd(object):
+
+    def __init__(self, libc):
+        """A one-shot timer file descriptor on CLOCK_BOOTTIME.
+
+        The descriptor becomes readable once the deadline passed, use
+        createTimerFd to create one.
+
+        Args:
+            libc (ctypes.CDLL): The C library.
+        """
+        self._libc = libc
+        self._fd = libc.timerfd_create(
+            _CLOCK_BOOTTIME, _TFD_NONBLOCK | _TFD_CLOEXEC
+        )
+        if self._fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+
+    def fileno(self):
+        """Return the file descriptor to wait for.
+
+        Returns:
+            int: The file descriptor.
+        """
+        return self._fd
+
+    def setDeadline(self, deadline):
+        """Arm the timer, or disarm it.
+
+        Args:
+            deadline (float or None): A time of the deadline clock, None to
+                disarm. Deadlines in the past expire immediately.
+        """
+        value = _Itimerspec()
+        if deadline is not None:
+            deadline = max(deadline, 0.0)
+            value.it_value.tv_sec = int(deadline)
+            value.it_value.tv_nsec = int((deadline - int(deadline)) * 1e9)
+            if not value.it_value.tv_sec and not value.it_value.tv_nsec:
+                # a zero it_value would disarm the timer
+                value.it_value.tv_nsec = 1
+        if self._libc.timerfd_settime(
+            self._fd, _TFD_TIMER_ABSTIME, ctypes.byref(value), None
+        ) < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+
+    def acknowledge(self):
+        """Clear the expiration so the descriptor stops being readable.
+
+        Returns:
+            int: The number of expirations since the last call.
+        """
+        try:
+            data = os.read(self._fd, _EXPIRATIONS.size)
+        except BlockingIOError:
+            return 0
+        return _EXPIRATIONS.unpack(data)[0]
+
+    def close(self):
+        """Close the file descriptor."""
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def createTimerFd():
+    """Create a timer on CLOCK_BOOTTIME, where the system has timerfd.
+
+    Returns:
+        TimerFd or None: The timer, None if it isn't supported.
+    """
+    if _CLOCK_BOOTTIME is None:
+        return None
+    library = ctypes.util.find_library("c")
+    if library is None:
+        return None
+    try:
+        libc = ctypes.CDLL(library, use_errno=True)
+        libc.timerfd_create.argtypes = [ctypes.c_int, ctypes.c_int]
+        libc.timerfd_settime.argtypes = [
+            ctypes.c_int,
+            ctypes.c_int,
+            ctypes.POINTER(_Itimerspec),
+            ctypes.POINTER(_Itimerspec),
+        ]
+        return TimerFd(libc)
+    except (OSError, AttributeError) as e:
+        _LOGGER.warning("TIMERFD NOT AVAILABLE: {}".format(e))
+        return None
@@ -9,22 +9,108 @@ default_suppress_when_microphone_active = True
 default_enable_sound = True
 default_blacklist_process_names = []
 default_blacklist_window_names = []
+default_suppression_rules = []
+default_log_events = False
+
+# blacklist window rule modes
+window_mode_any = "any"  # window open anywhere in the window tree
+window_mode_active = "active"  # window is focused
+window_mode_fullscreen = "fullscreen"  # window is focused and fullscreen
+window_modes = (window_mode_any, window_mode_active, window_mode_fullscreen)
+
+# blacklist entry match types
+match_substring = "substring"
+match_glob = "glob"
+match_regex = "regex"
+match_types = (match_substring, match_glob, match_regex)
+
+# seconds after which the process list is rescanned when process
+# exec/exit events can't be received
+process_rescan_interval = 10
+
+# seconds after which a validation probe is abandoned
+probe_timeout = 2
+# maximum number of validation probes running at once
+probe_max_workers = 4
+# number of suppression rules evaluated at once, in plan order
+probe_max_in_flight = 2
+
+# seconds each probe result is cached for, watchers expire them early
+probe_cache_ttls = {
+    "process": 60,
+    "window": 60,
+    "microphone": 10,
+}
 
 # config location
 default_config_location = os.path.join(
     BaseDirectory.xdg_config_home, "eyecare_reminder", "config.yaml"
 )
+# system wide configs layered under the user config, lowest priority first
+system_config_locations = [
+    os.path.join(directory, "eyecare_reminder", "config.yaml")
+    for directory in reversed(BaseDirectory.xdg_config_dirs)
+    if directory != BaseDirectory.xdg_config_home
+]
+# environment variables override the config files, eg.
+# EYECARE_REMINDER_REMINDER_INTERVAL=600
+config_environment_prefix = "EYECARE_REMINDER_"
+# parsed config files, reused while the files are unchanged
+config_cache_location = os.path.join(
+    BaseDirectory.xdg_cache_home, "eyecare_reminder", "config_cache.json"
+)
+
+# milliseconds to wait for a burst of config file writes to settle
+config_reload_debounce = 500
+config_reload_slack = 250
+
+# milliseconds the end of a reminder or cooldown may be late by, so it can
+# share a CPU wakeup with other timers
+reminder_timer_slack = 1000
+# seconds a phase may end late by, through the slack and the validation,
+# and still have the next phase start at its deadline instead of the time
+# it actually ended, so the lateness doesn't add up over the cycles
+phase_catch_up = 10
 
 # log location
 default_log_location = os.path.join(
     BaseDirectory.xdg_config_home, "eyecare_reminder", "log.log"
 )
+# structured events as JSON lines, written when log_events is enabled
+default_events_log_location = os.path.join(
+    BaseDirectory.xdg_config_home, "eyecare_reminder", "events.jsonl"
+)
+# bytes after which a log is rotated, and the number of old logs kept
+log_max_bytes = 1024 * 1024
+log_backup_count = 3
 
 # messages
 reminder_message = "Look in the distance for {} seconds."
 reminder_end_message = "You can go back to whatever you were doing now."
 config_reloaded_message = "Config successfully reloaded"
 next_reminder_message = "Next reminder at: {}"
+bad_config_message = "The config file is broken, the previous settings stay in effect."
+
+# headless mode
+# reminders are sent to clients of this socket in the runtime directory
+headless_socket_name = "eyecare_reminder.sock"
+
+# probe daemon
+# sessions ask the daemon for the host wide probes through this socket,
+# when it exists, see eyecare_reminder --daemon
+probe_daemon_socket = "/run/eyecare_reminder/probes.sock"
+# connections the probe daemon accepts from each user
+probe_daemon_max_clients = 8
+
+# simulation
+# assumed seconds a call of each probe costs, scenarios can override them,
+# see eyecare_reminder.simulation
+simulation_probe_costs = {
+    "idle": 0.0001,
+    "process": 0.0005,
+    "window": 0.0005,
+    "microphone": 0.00001,
+}
 
 # sounds
 reminder_sound = os.path.abspath(
@@ -35,13 +121,29 @@ cooldown_sound = os.path.abspath(
 )
 
 # icon
-icon = os.path.join(__file__, "..", "images", "icon.png")
-icon_attention = os.path.join(__file__, "..", "images", "icon_attention.png")
+icon_file_name = "icon.png"
+icon_attention_file_name = "icon_attention.png"
+# absolute paths, for notification servers which load the icon themselves
+images_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "images")
+icon = os.path.join(images_directory, icon_file_name)
+icon_attention = os.path.join(images_directory, icon_attention_file_name)
 icon_animation_speed = 500
+icon_animation_slack = 100
+# the cooldown progress ring is drawn in this many steps
+icon_progress_steps = 24
+# sizes tray icons are commonly shown at, the tray's actual size is added
+# once it is known
+tray_icon_sizes = [16, 22, 24, 32, 48]
 
 # notification
 reminder_notification_duration = 10000
 reminder_cooldown_duration = 10000
+bad_config_notification_duration = 10000
+notification_app_name = "Eyecare Reminder"
+notification_skip_label = "Skip"
+notification_edit_config_label = "Edit config"
+countdown_update_interval = 1000
+countdown_update_slack = 250
 
 # desktop file
 desktop_file_name = "eyecare_reminder.desktop"
@@ -50,28 +152,69 @@ desktop_file_icon_path = os.path.abspath(
         BaseDirectory.xdg_data_home, "icons", "eyecare_reminder", "icon.png",
     )
 )
+desktop_file_location = os.path.join(
+    BaseDirectory.xdg_data_home, "applications", desktop_file_name
+)
+autostart_file_location = os.path.join(
+    BaseDirectory.xdg_config_home, "autostart", desktop_file_name
+)
 autostart_key = "X-GNOME-Autostart-enabled"
+autostart_hidden_key = "Hidden"
 icon_key = "Icon"
 
 
 class ConfigKey(object):
 
-    def __init__(self, name, _type, default_value):
-        """Config key object storing key name and value type."""
+    def __init__(self, name, _type, default_value, required=True,
+                 min_value=None, max_value=None):
+        """Config key object storing key name, value type and range.
+
+        Keys that aren't required may be missing from older config files.
+        """
         self.name = name
         self.type = _type
         self.default_value = default_value
+        self.required = required
+        self.min_value = min_value
+        self.max_value = max_value
+
+    @property
+    def environmentVariable(self):
+        """str: The environment variable overriding the key."""
+        return config_environment_prefix + self.name.upper()
+
+    def validate(self, value):
+        """Return why a value is invalid for the key.
+
+        Args:
+            value (object): The value to check.
+
+        Returns:
+            str: The problem with the value, None if it's valid.
+        """
+        # bool is a subclass of int but never a valid number of seconds
+        if not isinstance(value, self.type) or (
+            isinstance(value, bool) and self.type is not bool
+        ):
+            return "expected {}, got {!r}".format(self.type.__name__, value)
+        if self.min_value is not None and value < self.min_value:
+            return "{} is less than {}".format(value, self.min_value)
+        if self.max_value is not None and value > self.max_value:
+            return "{} is more than {}".format(value, self.max_value)
+        return None
 
 
 class ConfigKeys(object):
     """Initialize and store the config key objects for later reference."""
-    reminder_interval = ConfigKey("reminder_interval", int, default_reminder_interval)
-    reminder_cooldown_interval = ConfigKey("reminder_cooldown_interval", int, default_reminder_cooldown_interval)
-    idle_time = ConfigKey("idle_time", int, default_idle_time)
+    reminder_interval = ConfigKey("reminder_interval", int, default_reminder_interval, min_value=1, max_value=86400)
+    reminder_cooldown_interval = ConfigKey("reminder_cooldown_interval", int, default_reminder_cooldown_interval, min_value=1, max_value=3600)
+    idle_time = ConfigKey("idle_time", int, default_idle_time, min_value=1, max_value=86400)
     suppress_when_microphone_active = ConfigKey("suppress_when_microphone_active", bool, default_suppress_when_microphone_active)
     enable_sound = ConfigKey("enable_sound", bool, default_enable_sound)
     blacklist_process_names = ConfigKey("blacklist_process_names", list, default_blacklist_process_names)
     blacklist_window_names = ConfigKey("blacklist_window_names", list, default_blacklist_window_names)
+    suppression_rules = ConfigKey("suppression_rules", list, default_suppression_rules, required=False)
+    log_events = ConfigKey("log_events", bool, default_log_events, required=False)
 
 
 def configKeysAsList():
@@ -88,4 +231,87 @@ def configKeysAsList():
         ConfigKeys.enable_sound,
         ConfigKeys.blacklist_window_names,
         ConfigKeys.blacklist_process_names,
+        ConfigKeys.suppression_rules,
+        ConfigKeys.log_events,
     ]
+
+
+def _freeze(value):
+    # lists become tuples, so a consumer can't change the snapshot in place
+    # or through the config it was made from, mappings are copied
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return {key: _freeze(item) for key, item in value.items()}
+    return value
+
+
+class ConfigSnapshot(object):
+    """Immutable, validated config values read as attributes, lists are
+    stored as tuples."""
+    __slots__ = tuple(key.name for key in configKeysAsList()) + ("sources",)
+
+    def __init__(self, values, sources):
+        """Initialize the snapshot.
+
+        Args:
+            values (dict): A value for every config key.
+            sources (dict[str, str]): The layer each value came from.
+        """
+        for key in configKeysAsList():
+            object.__setattr__(self, key.name, _freeze(values[key.name]))
+        object.__setattr__(self, "sources", dict(sources))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ConfigSnapshot is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("ConfigSnapshot is immutable")
+
+    def get(self, name, default=None):
+        """Return a config value by key name.
+
+        Args:
+            name (str): The key name.
+            default (object, optional): Returned for unknown keys.
+
+        Returns:
+            object: The config value.
+        """
+        return getattr(self, name, default)
+
+    def asDict(self):
+        """Return the config values keyed by key name.
+
+        Returns:
+            dict: The config values.
+        """
+        return {key.name: self.get(key.name) for key in configKeysAsList()}
+
+    def changedKeys(self, other):
+        """Return the names of the keys whose value differs from another
+        snapshot.
+
+        Args:
+            other (ConfigSnapshot): The snapshot to compare with, None
+                counts as every key changed.
+
+        Returns:
+            set[str]: The changed key names.
+        """
+        return set(
+            key.name
+            for key in configKeysAsList()
+            if other is None or self.get(key.name) != other.get(key.name)
+        )
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, ConfigSnapshot)
+            and self.asDict() == other.asDict()
+        )
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
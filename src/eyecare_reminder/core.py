@@ -0,0 +1,882 @@
+"""The reminder logic, independent of the frontend and the event loop.
+
+ReminderCore runs on an event loop adapter, see qtloop.QtEventLoop and
+aioloop.AsyncioEventLoop, and shows reminders through a frontend, the Qt
+tray view.View or the headless.HeadlessFrontend.
+"""
+import logging
+import os
+import subprocess
+import time
+
+from .config import ConfigKeys
+from . import (
+    cache,
+    clock,
+    config,
+    daemon,
+    desktop,
+    idle,
+    loader,
+    logs,
+    matcher,
+    processes,
+    pulse,
+    reminder,
+    rules,
+    scheduler,
+    utils,
+    validation,
+    watcher,
+    windows,
+    x11,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# config keys grouped by the subsystem that has to be updated when they change
+_RULE_KEYS = frozenset([
+    ConfigKeys.suppress_when_microphone_active.name,
+    ConfigKeys.blacklist_process_names.name,
+    ConfigKeys.blacklist_window_names.name,
+    ConfigKeys.suppression_rules.name,
+])
+_IDLE_KEYS = frozenset([
+    ConfigKeys.idle_time.name,
+    ConfigKeys.reminder_cooldown_interval.name,
+])
+_TIMER_KEYS = frozenset([
+    ConfigKeys.reminder_interval.name,
+    ConfigKeys.reminder_cooldown_interval.name,
+])
+
+
+class ReminderCore(object):
+
+    def __init__(self, loop, now=clock.now, suspended=clock.suspendedTime):
+        """Initialize the Eyecare controller.
+
+        The parts touching the system are created by the _create* methods,
+        which eyecare_reminder.simulation replaces with scripted ones.
+
+        Args:
+            loop (object): The event loop adapter, runs callbacks, watches
+                file descriptors and creates the scheduler's timer backend.
+            now (callable): Returns the current clock time in seconds, the
+                clock the timer backend is armed on.
+            suspended (callable): Returns the seconds the system spent
+                suspended so far.
+        """
+        self._loop = loop
+        self._view = None
+        self._config_loader = self._createConfigLoader()
+        self._desktop_entries = desktop.createDesktopEntryManager()
+        # eyecare_reminder.config.ConfigSnapshot, None until loaded
+        self._config = None
+        self._scheduler = scheduler.Scheduler(
+            loop.createTimerBackend(), now=now
+        )
+        self._rule_engine = self._createRuleEngine([], {}, None)
+        self._probe_cache = cache.ProbeCache(config.probe_cache_ttls, now=now)
+        self._display = None
+        self._idle_backend = None
+        self._idle_monitor = None
+        self._window_index = None
+        self._process_index = None
+        self._microphone_monitor = None
+        self._probe_daemon = None
+        self._createProbeSources()
+        self._validation_pipeline = self._createValidationPipeline()
+        if self._display is not None:
+            loop.addReader(self._display.fileno(), self._processX11Events)
+        self._state = reminder.ReminderState(now=now, suspended=suspended)
+        self._timeout_task = None
+        # created by setup, once the config file and its directory exist
+        self._config_watcher = None
+        _LOGGER.info("STARTING")
+
+    def _createConfigLoader(self):
+        """Create the loader of the layered config.
+
+        Returns:
+            eyecare_reminder.loader.ConfigLoader: The config loader.
+        """
+        return loader.createConfigLoader()
+
+    def _createProbeSources(self):
+        """Connect to the sources the suppression probes read.
+
+        Sets the X display, the idle backend and monitor, the window and
+        process indexes, the microphone monitor and the probe daemon
+        client, each left None when unavailable.
+        """
+        self._display = x11.openDisplay()
+        self._idle_backend = idle.createIdleBackend(self._display)
+        if isinstance(self._idle_backend, idle.XSyncIdleBackend):
+            self._idle_monitor = idle.IdleMonitor(
+                self._idle_backend,
+                on_idle=self._systemIdle,
+                on_resume=self._systemResumed,
+            )
+        self._window_index = windows.createWindowIndex(
+            self._display,
+            on_change=lambda: self._probe_cache.invalidate("window"),
+        )
+        self._probe_daemon = daemon.connectProbeDaemon(
+            config.probe_daemon_socket
+        )
+        if self._probe_daemon is not None:
+            # the daemon's answers are always current, there are no events
+            # to expire cached ones with
+            self._probe_cache.setTtls({
+                probe: ttl for probe, ttl in config.probe_cache_ttls.items()
+                if probe not in daemon.PROBES
+            })
+        else:
+            self._process_index = processes.createProcessIndex(
+                config.process_rescan_interval,
+                on_change=lambda: self._probe_cache.invalidate("process"),
+            )
+        self._microphone_monitor = pulse.MicrophoneMonitor(
+            on_change=lambda active: self._probe_cache.invalidate("microphone")
+        )
+
+    def _createValidationPipeline(self):
+        """Create the pipeline running the probes of a validation.
+
+        Returns:
+            eyecare_reminder.validation.ValidationPipeline: The pipeline.
+        """
+        return validation.ValidationPipeline(
+            max_workers=config.probe_max_workers
+        )
+
+    def _createConfigWatcher(self):
+        """Watch the user config for edits.
+
+        Returns:
+            eyecare_reminder.watcher.FileWatcher: The watcher.
+        """
+        return watcher.FileWatcher(
+            self._config_loader.user_path,
+            config.config_reload_debounce,
+            self._loop,
+            self._scheduler,
+            self._configFileChanged,
+            slack=config.config_reload_slack,
+        )
+
+    def _createRuleEngine(self, suppression_rules, probes, stats):
+        """Compile the suppression rules.
+
+        Args:
+            suppression_rules (list[dict]): The rules from the config.
+            probes (dict): The compile and check functions of every probe
+                kind, see eyecare_reminder.rules.RuleEngine.
+            stats (dict, optional): The probe statistics of the previous
+                engine.
+
+        Returns:
+            eyecare_reminder.rules.RuleEngine: The rule engine.
+
+        Raises:
+            eyecare_reminder.rules.RuleError: If a rule is malformed.
+        """
+        return rules.RuleEngine(suppression_rules, probes, stats=stats)
+
+    @property
+    def scheduler(self):
+        """eyecare_reminder.scheduler.Scheduler: Runs the app's timers."""
+        return self._scheduler
+
+    def setup(self, view):
+        """Set up the controller.
+
+        Adds reference to the view object, imports the config and starts
+        watching it for edits.
+
+        Args:
+            view (object): The frontend, eg. eyecare_reminder.view.View.
+        """
+        self._view = view
+        self.reloadConfig()
+        if self._config_watcher is None:
+            self._config_watcher = self._createConfigWatcher()
+        # runs once the event loop has shown the tray icon
+        self._loop.callSoon(self._deferredStartup)
+
+    def _deferredStartup(self):
+        """Do the startup work that isn't needed to show the tray icon."""
+        self.setDesktopFileIconPath()
+        self._view.setupDeferred()
+
+    def _startReminderTimer(self):
+        """Start the reminder phase."""
+        _LOGGER.info("STARTED REMINDER TIMER")
+        self._probe_cache.logStats()
+        self._scheduler.logStats()
+        self._state.begin(
+            reminder.PHASE_REMINDER,
+            self._config.reminder_interval,
+            catch_up=config.phase_catch_up,
+        )
+        self._scheduleTimeout()
+        self._view.setDefaultTrayIcon()
+
+    def _startReminderCooldownTimer(self):
+        """Start the cooldown phase."""
+        _LOGGER.info("STARTED COOLDOWN TIMER")
+        self._state.begin(
+            reminder.PHASE_COOLDOWN,
+            self._config.reminder_cooldown_interval,
+            catch_up=config.phase_catch_up,
+        )
+        self._scheduleTimeout()
+        self._view.startCooldownAnimation()
+
+    def _scheduleTimeout(self):
+        """Schedule the timeout at the deadline of the current phase."""
+        self._cancelTimeout()
+        if self._state.isRunning:
+            self._timeout_task = self._scheduler.callAt(
+                self._state.deadline,
+                self._timeout,
+                self._state.phase,
+                slack=utils.convert_ms_to_seconds(config.reminder_timer_slack),
+            )
+            self._view.setReminderToolTip(self._get_next_timeout_time())
+
+    def _cancelTimeout(self):
+        """Cancel the scheduled timeout."""
+        if self._timeout_task is not None:
+            self._timeout_task.cancel()
+            self._timeout_task = None
+
+    def _timeout(self):
+        """Timeout callback method.
+
+        Starts validating the timeout off the GUI thread, the result is
+        handled by _validationFinished.
+        """
+        self._timeout_task = None
+        state = self._state
+        if (
+            state.phase == reminder.PHASE_REMINDER
+            and state.suspendedDuringPhase()
+            >= self._config.reminder_cooldown_interval
+        ):
+            # the system was suspended for at least a whole break
+            _LOGGER.info("SUSPEND COUNTED AS BREAK")
+            logs.logEvent(
+                "suspend_break", suspended=round(state.suspendedDuringPhase())
+            )
+            self._startReminderTimer()
+            return
+        self._validateTimeout(context=(state.phase, state.generation))
+
+    def _validationFinished(self, result):
+        """Validation result callback method.
+
+        Shows correct message and starts correct timer. Results for a phase
+        which has since changed, eg. by a config reload, are dropped.
+
+        Args:
+            result (eyecare_reminder.validation.ValidationResult):
+                The validation result, its context is the phase and
+                generation of the state that timed out.
+        """
+        phase, generation = result.context
+        if generation != self._state.generation:
+            _LOGGER.debug("STALE VALIDATION RESULT DROPPED")
+            return
+        is_valid_timeout = result.valid
+        if not is_valid_timeout:
+            _LOGGER.info(
+                "TIMEOUT SUPPRESSED BY: {}".format(result.suppressed_by.upper())
+            )
+            logs.logEvent(
+                "timeout_suppressed",
+                suppressed_by=result.suppressed_by,
+                phase=phase,
+            )
+
+        enable_sound = self._config.enable_sound
+
+        if phase == reminder.PHASE_REMINDER:
+            if is_valid_timeout:
+                logs.logEvent(
+                    "reminder_fired", interval=self._config.reminder_interval
+                )
+                # the cooldown deadline has to be set for the countdown of
+                # the reminder message to start from it
+                self._startReminderCooldownTimer()
+                self._view.showReminderMessage(play_sound=enable_sound)
+            else:
+                self._startReminderTimer()
+        elif phase == reminder.PHASE_COOLDOWN:
+            if is_valid_timeout:
+                logs.logEvent(
+                    "cooldown_finished",
+                    interval=self._config.reminder_cooldown_interval,
+                )
+                self._view.showCooldownMessage(play_sound=enable_sound)
+            self._startReminderTimer()
+        self._processX11Events()
+
+    def _processX11Events(self):
+        """Dispatch pending events from the persistent X connection."""
+        if self._display is not None:
+            self._display.processEvents()
+
+    def _systemIdle(self, threshold):
+        """Idle monitor callback for when an idle threshold is crossed.
+
+        Once the user has been away for a whole cooldown the break is
+        considered taken, so all timers are stopped until input resumes.
+
+        Args:
+            threshold (int): The crossed idle threshold in milliseconds.
+        """
+        cooldown = utils.convert_seconds_to_ms(
+            self._config.reminder_cooldown_interval
+        )
+        # higher thresholds of the same idle period find the timers stopped
+        if threshold >= cooldown and self._state.isRunning:
+            _LOGGER.info("IDLE PERIOD COUNTED AS BREAK, TIMERS STOPPED")
+            logs.logEvent("idle_break", threshold_ms=threshold)
+            self._state.stop()
+            self._cancelTimeout()
+            self._view.closeReminderMessage()
+            self._view.setDefaultTrayIcon()
+
+    def _systemResumed(self, duration):
+        """Idle monitor callback for when user input resumes.
+
+        Args:
+            duration (float): The idle period duration in milliseconds.
+        """
+        cooldown = utils.convert_seconds_to_ms(
+            self._config.reminder_cooldown_interval
+        )
+        if duration >= cooldown and not self._state.isRunning:
+            self._startReminderTimer()
+
+    def _get_next_timeout_time(self):
+        """Return the time the next reminder will be at.
+
+        Returns:
+            str: Time next reminder will be at in HH:MM format, empty while
+                the timers are stopped.
+        """
+        next_reminder = self._state.nextReminder(
+            self._config.reminder_interval
+        )
+        if next_reminder is None:
+            return ""
+        next_time = clock.toWallTime(next_reminder)
+        return time.strftime("%H:%M", time.localtime(next_time))
+
+    def _validateTimeout(self, context=None):
+        """Start checking whether the timeout is valid.
+
+        Timeout is invalid if any of the suppression rules is true, eg. the
+        microphone is in use, the system is idle or a blacklisted
+        application or window is running. The rules are evaluated in the
+        validation pipeline, cheapest and likeliest to suppress first, and
+        the result is handed to _validationFinished on the event loop.
+
+        Args:
+            context (object, optional): Passed back in the result.
+        """
+        engine = self._rule_engine
+        _LOGGER.debug("SUPPRESSION PLAN: {}".format(engine.plan()))
+        probes = [
+            validation.Probe(
+                rule.label(), rule.evaluate, config.probe_timeout, False
+            )
+            for rule in engine.orderedRules()
+        ]
+        self._validation_pipeline.validate(
+            probes,
+            lambda result: self._loop.callSoonThreadsafe(
+                self._validationFinished, result
+            ),
+            context=context,
+            max_in_flight=config.probe_max_in_flight,
+        )
+
+    def _isSystemIdle(self):
+        """Check whether the system is idle.
+
+        Returns:
+            bool: Whether the system is idle.
+        """
+        idle_time = utils.convert_seconds_to_ms(self._config.idle_time)
+        if self._idle_backend.getIdleTime() >= idle_time:
+            _LOGGER.info("SYSTEM IDLE")
+            return True
+        else:
+            return False
+
+    def _isMicrophoneActive(self):
+        """Check whether the microphone is currently active.
+
+        Returns:
+            bool: Whether the microphone is currently active.
+        """
+        if self._microphone_monitor.isConnected:
+            active = self._microphone_monitor.isCaptureActive
+        elif self._probe_daemon is not None:
+            active = self._probe_daemon.isCaptureActive()
+        else:
+            active = pulse.checkMicrophoneActive()
+        if active:
+            _LOGGER.info("MICROPHONE ACTIVE")
+        return active
+
+    def _isBlacklistedProcessRunning(self, process_matcher):
+        """Check whether a blacklisted process is currently running.
+
+        Args:
+            process_matcher (eyecare_reminder.matcher.PatternMatcher):
+                The compiled blacklisted process names.
+
+        Returns:
+            bool: Whether a blacklisted process is currently running.
+        """
+        if not process_matcher:
+            return False
+        pattern = None
+        if self._probe_daemon is not None:
+            pattern = process_matcher.search(
+                self._probe_daemon.processNames()
+            )
+        elif self._process_index is not None:
+            pattern = process_matcher.search(self._process_index.text)
+        else:
+            for process_name in utils.iterProcessNames():
+                pattern = process_matcher.search(process_name)
+                if pattern is not None:
+                    break
+        if pattern is not None:
+            _LOGGER.info(
+                "BLACKLISTED PROCESS RUNNING: {}".format(
+                    matcher.describePattern(pattern)
+                )
+            )
+            return True
+        return False
+
+    def _isBlacklistedWindowRunning(self, window_matchers):
+        """Check whether a blacklisted window is currently open.
+
+        Rules in "any" mode look through every open window, rules in
+        "active" or "fullscreen" mode only inspect the focused window.
+
+        Args:
+            window_matchers (dict): The compiled blacklisted window names,
+                a eyecare_reminder.matcher.PatternMatcher for each mode.
+
+        Returns:
+            bool: Whether a blacklisted window is currently open.
+        """
+        active_matcher = window_matchers[config.window_mode_active]
+        fullscreen_matcher = window_matchers[config.window_mode_fullscreen]
+        if active_matcher or fullscreen_matcher:
+            active_window = windows.getActiveWindow(self._display)
+            if active_window is not None:
+                names = "\n".join(active_window.names)
+                pattern = active_matcher.search(names)
+                if pattern is None and active_window.fullscreen:
+                    pattern = fullscreen_matcher.search(names)
+                if pattern is not None:
+                    _LOGGER.info(
+                        "BLACKLISTED {} WINDOW: {}".format(
+                            pattern.mode.upper(),
+                            matcher.describePattern(pattern),
+                        )
+                    )
+                    return True
+
+        tree_matcher = window_matchers[config.window_mode_any]
+        if not tree_matcher:
+            return False
+        if self._window_index is not None:
+            text = self._window_index.text
+        else:
+            output = subprocess.check_output(
+                ["xwininfo", "-tree", "-root"], timeout=config.probe_timeout
+            )
+            text = output.decode(errors="replace")
+        pattern = tree_matcher.search(text)
+        if pattern is not None:
+            _LOGGER.info(
+                "BLACKLISTED WINDOW RUNNING: {}".format(
+                    matcher.describePattern(pattern)
+                )
+            )
+            return True
+        return False
+
+    def writeDefaultConfig(self):
+        """Write a default config at the default config location specified in
+        eyecare_reminder.config"""
+        self._writeDefaultConfigFile()
+        _LOGGER.info("CONFIG RESET TO DEFAULT")
+        self.reloadConfig()
+
+    def _writeDefaultConfigFile(self):
+        """Write the default config file.
+
+        When a system config exists the user config only holds overrides,
+        so it starts out empty instead of masking the system values.
+        """
+        if self._config_loader.hasSystemConfig():
+            with open(self._config_loader.user_path, "w") as _f:
+                _f.write(
+                    "# Settings here override {}\n".format(
+                        ", ".join(self._config_loader.system_paths)
+                    )
+                )
+            return
+        data = {}
+        for key in config.configKeysAsList():
+            data[key.name] = key.default_value
+        utils.write_yaml(self._config_loader.user_path, data)
+
+    def importConfig(self):
+        """Import the layered config, see eyecare_reminder.loader.
+
+        Raises:
+            eyecare_reminder.loader.ConfigError: If the config is invalid.
+        """
+        if not os.path.exists(self._config_loader.user_path):
+            self._writeDefaultConfigFile()
+        self._config = self._config_loader.load()
+
+    def reloadConfig(self):
+        """Reload a config from the default config location specified in
+        eyecare_reminder.config"""
+        self._loadConfig(interactive=True)
+
+    def _configFileChanged(self):
+        """Config watcher callback, applies edits as soon as they are saved.
+
+        A broken config is only reported in the log here, as it's likely
+        still being edited, the previous config stays in effect.
+        """
+        self._loadConfig(interactive=False)
+
+    def _loadConfig(self, interactive):
+        """Import the config and update the subsystems whose keys changed.
+
+        Args:
+            interactive (bool): Whether to show the result to the user.
+        """
+        previous = self._config
+        try:
+            self.importConfig()
+        except loader.ConfigError as e:
+            _LOGGER.error("INVALID CONFIG: {}".format(e))
+        else:
+            changed = self._config.changedKeys(previous)
+            if self._applyConfigChanges(changed):
+                if interactive:
+                    self._view.showConfigReloadedMessage()
+                _LOGGER.info(
+                    "CONFIG RELOADED, CHANGED: {}".format(
+                        ", ".join(sorted(changed)) or "NOTHING"
+                    )
+                )
+                logs.logEvent("config_reloaded", changed=sorted(changed))
+                return
+        self._config = previous
+        if interactive:
+            self._view.showBadConfigMessage()
+
+    def _applyConfigChanges(self, changed):
+        """Update only the subsystems affected by the changed keys.
+
+        The running phase keeps its progress when the intervals change,
+        only its deadline moves, and it ends right away if the new
+        deadline already passed.
+
+        Args:
+            changed (set[str]): Names of the keys whose value changed.
+
+        Returns:
+            bool: Whether the changed config could be applied.
+        """
+        if changed & _RULE_KEYS and not self._compileRules():
+            return False
+        if changed & _IDLE_KEYS:
+            self._setIdleThresholds()
+        if ConfigKeys.log_events.name in changed:
+            logs.setEventLogging(self._config.log_events)
+        if changed & _TIMER_KEYS:
+            self._retime()
+        return True
+
+    def _retime(self):
+        """Apply the configured intervals to the running phase.
+
+        The cycle is started by the first config that loads, a cycle
+        stopped for an idle break stays stopped until input resumes.
+        """
+        if self._state.phase == reminder.PHASE_COOLDOWN:
+            self._state.retime(self._config.reminder_cooldown_interval)
+        elif self._state.phase == reminder.PHASE_REMINDER:
+            self._state.retime(self._config.reminder_interval)
+        elif self._state.generation == 0:
+            self._startReminderTimer()
+            return
+        else:
+            return
+        _LOGGER.info("TIMER RETIMED")
+        self._scheduleTimeout()
+
+    def _setIdleThresholds(self):
+        """Register idle alarms at the configured idle and cooldown times."""
+        if self._idle_monitor is None:
+            return
+        self._idle_monitor.setThresholds([
+            utils.convert_seconds_to_ms(self._config.idle_time),
+            utils.convert_seconds_to_ms(
+                self._config.reminder_cooldown_interval
+            ),
+        ])
+
+    def _defaultRules(self):
+        """Build the suppression rules equivalent to the simple config keys.
+
+        Returns:
+            list[dict]: The suppression rules.
+        """
+        default_rules = [{"idle": True}]
+        if self._config.suppress_when_microphone_active:
+            default_rules.append({"microphone": True})
+        process_names = self._config.blacklist_process_names
+        if process_names:
+            default_rules.append({"process": process_names})
+        window_names = self._config.blacklist_window_names
+        if window_names:
+            default_rules.append({"window": window_names})
+        return default_rules
+
+    def _compileRules(self):
+        """Compile the suppression rules of the loaded config.
+
+        Without explicit suppression_rules, the rules are built from the
+        simple config keys.
+
+        Returns:
+            bool: Whether all the rules are valid.
+        """
+        suppression_rules = self._config.suppression_rules
+        if not suppression_rules:
+            suppression_rules = self._defaultRules()
+        probes = {
+            "idle": (
+                self._compileFlagRule,
+                lambda value: self._isSystemIdle(),
+            ),
+            "microphone": (
+                self._compileFlagRule,
+                self._cachedCheck(
+                    "microphone", lambda value: self._isMicrophoneActive()
+                ),
+            ),
+            "process": (
+                self._compileProcessRule,
+                self._cachedCheck(
+                    "process", self._isBlacklistedProcessRunning
+                ),
+            ),
+            "window": (
+                self._compileWindowRule,
+                self._cachedCheck("window", self._isBlacklistedWindowRunning),
+            ),
+        }
+        try:
+            engine = self._createRuleEngine(
+                suppression_rules, probes, self._rule_engine.stats()
+            )
+        except rules.RuleError as e:
+            _LOGGER.error("INVALID CONFIG: {}".format(e))
+            return False
+        self._rule_engine = engine
+        self._probe_cache.invalidate()
+        _LOGGER.info("SUPPRESSION PLAN: {}".format(engine.plan()))
+        return True
+
+    def _cachedCheck(self, probe, check):
+        """Wrap a rule check so its results go through the probe cache.
+
+        Args:
+            probe (str): The probe name, selects the cache time to live.
+            check (callable): Called with the compiled rule value.
+
+        Returns:
+            callable: The wrapped check.
+        """
+        def cached(value):
+            # compiled values live as long as the engine, which is replaced
+            # together with a full cache invalidation
+            return self._probe_cache.get(
+                probe, id(value), lambda: check(value)
+            )
+        return cached
+
+    @staticmethod
+    def _compileFlagRule(value):
+        """Compile the value of an idle or microphone rule.
+
+        Args:
+            value (bool): The rule value, must be true.
+
+        Raises:
+            ValueError: If the value isn't true.
+        """
+        if value is not True:
+            raise ValueError("Expected true, got {}".format(value))
+
+    @staticmethod
+    def _compileProcessRule(value):
+        """Compile the value of a process rule.
+
+        Args:
+            value (str or dict or tuple): A blacklist entry or a tuple or
+                list of them.
+
+        Returns:
+            eyecare_reminder.matcher.PatternMatcher: The compiled entries.
+        """
+        entries = value if isinstance(value, (list, tuple)) else [value]
+        return matcher.PatternMatcher(
+            [matcher.parseRule(entry, ignore_case=True) for entry in entries]
+        )
+
+    def _compileWindowRule(self, value):
+        """Compile the value of a window rule.
+
+        Args:
+            value (str or dict or tuple): A blacklist entry or a tuple or
+                list of them.
+
+        Returns:
+            dict[str, eyecare_reminder.matcher.PatternMatcher]:
+                The compiled entries for each window mode.
+        """
+        entries = value if isinstance(value, (list, tuple)) else [value]
+        window_matchers = matcher.compileRules(entries)
+        if self._display is None:
+            # the focused window can't be inspected, search all windows
+            patterns = [
+                pattern._replace(mode=config.window_mode_any)
+                for m in window_matchers.values()
+                for pattern in m.patterns
+                if pattern.name
+            ]
+            window_matchers = matcher.compileRules([])
+            window_matchers[config.window_mode_any] = matcher.PatternMatcher(
+                patterns
+            )
+        return window_matchers
+
+    @staticmethod
+    def editConfig():
+        """Open the config with the default system application for editing."""
+        _LOGGER.info("EDITING CONFIG")
+        subprocess.run(("xdg-open", config.default_config_location))
+
+    @staticmethod
+    def openLog():
+        """Open the log file with the default system application for editing.
+        """
+        subprocess.run(("xdg-open", config.default_log_location))
+
+    def skipCooldown(self):
+        """End the current cooldown early and start the next reminder."""
+        if self._state.phase != reminder.PHASE_COOLDOWN:
+            return
+        _LOGGER.info("COOLDOWN SKIPPED")
+        logs.logEvent("cooldown_skipped")
+        self._startReminderTimer()
+
+    def getRemainingTime(self):
+        """Return the time left in the current phase.
+
+        Returns:
+            float: The remaining seconds, None if the timers are stopped.
+        """
+        return self._state.remaining()
+
+    def getCooldownValue(self):
+        """Return the current configured cooldown value.
+
+        Returns:
+            int: The currently configured cooldown value.
+        """
+        return self._config.reminder_cooldown_interval
+
+    def getDesktopFilePath(self):
+        """Get the desktop file path.
+
+        Returns:
+            str: The desktop file path, None if it isn't installed.
+        """
+        if not self._desktop_entries.isInstalled:
+            _LOGGER.warning(
+                "DESKTOP FILE NOT FOUND: {}".format(
+                    self._desktop_entries.application.path
+                )
+            )
+            return None
+        return self._desktop_entries.application.path
+
+    def getDesktopFileAutostart(self):
+        """Return whether the app starts on login.
+
+        Returns:
+            bool: Whether autostart is true or false, None if the desktop
+                file isn't installed.
+        """
+        if self.getDesktopFilePath() is None:
+            return None
+        return self._desktop_entries.isAutostartEnabled()
+
+    def getDesktopFileIcon(self):
+        """Read the desktop file and return the value of the icon key.
+
+        Returns:
+            str: The icon path, None if the desktop file isn't installed.
+        """
+        return self._desktop_entries.getIconPath()
+
+    def toggleAutostart(self):
+        """Toggle starting with system."""
+        enabled = self.getDesktopFileAutostart()
+        if enabled is None:
+            return
+        try:
+            self._desktop_entries.setAutostart(not enabled)
+        except OSError as e:
+            _LOGGER.error("COULD NOT CHANGE AUTOSTART: {}".format(e))
+
+    def setDesktopFileIconPath(self):
+        """Sets .desktop icon absolute path as they can't be relative.
+
+        Also writes the autostart entry for configs from older versions.
+        """
+        if self.getDesktopFilePath() is None:
+            return
+        try:
+            self._desktop_entries.setIconPath(config.desktop_file_icon_path)
+            self._desktop_entries.migrateAutostart()
+        except OSError as e:
+            _LOGGER.error("COULD NOT UPDATE DESKTOP FILE: {}".format(e))
+
+    def exit(self):
+        """Quit the application."""
+        _LOGGER.info("EXITING")
+        self._loop.stop()
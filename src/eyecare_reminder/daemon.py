@@ -0,0 +1,395 @@
+"""Host-wide probes shared by every session on the host.
+
+On hosts with many logged in users, eg. terminal servers, every session
+would keep its own process index and query the sound cards itself. The
+daemon, run once per host as root, does both and answers the sessions over
+a Unix socket, so the host-wide cost doesn't grow with the number of
+users. Each session is only told about the processes its own user runs.
+
+The probes of the session itself, the X idle time, the windows and the
+session's sound server, stay in the session.
+
+Requests and replies are JSON lines, eg. {"probe": "process"} is answered
+with {"value": "bash\\nfirefox"} or {"error": "..."}.
+"""
+import glob
+import json
+import logging
+import os
+import signal
+import socket
+import struct
+import threading
+
+from . import config, processes
+
+_LOGGER = logging.getLogger(__name__)
+
+PROBE_PROCESS = "process"
+PROBE_MICROPHONE = "microphone"
+# probes answered by the daemon
+PROBES = (PROBE_PROCESS, PROBE_MICROPHONE)
+
+# the status of every capture substream of every sound card
+_CAPTURE_STATUS_GLOB = "/proc/asound/card*/pcm*c/sub*/status"
+_CAPTURE_RUNNING = "state: RUNNING"
+# struct ucred
+_PEER_CREDENTIALS = struct.Struct("3i")
+# bytes of a request line the daemon reads before dropping the client
+_MAX_REQUEST = 4096
+# bytes of replies a client may leave unread before it's dropped
+_MAX_PENDING_REPLIES = 1024 * 1024
+
+
+class ProbeDaemonError(Exception):
+    """Raised when the probe daemon can't be reached or fails a request."""
+
+
+def checkCaptureActive():
+    """Check whether any sound card is capturing audio.
+
+    Reads the substream states from /proc/asound, which covers the sound
+    servers of every user without connecting to any of them.
+
+    Returns:
+        bool: Whether any capture substream is running.
+    """
+    for path in glob.glob(_CAPTURE_STATUS_GLOB):
+        try:
+            with open(path) as _f:
+                if _f.readline().strip() == _CAPTURE_RUNNING:
+                    return True
+        except OSError:
+            continue
+    return False
+
+
+class _Client(object):
+    """A connected session, its buffered request and unsent replies."""
+
+    def __init__(self, uid):
+        self.uid = uid
+        self.requests = bytearray()
+        self.replies = bytearray()
+        self.writing = False
+
+
+class ProbeServer(object):
+
+    def __init__(self, path, process_index):
+        """Answer the probe requests of the sessions on the host.
+
+        Every local user can connect, so no client may block the loop:
+        sockets are non-blocking, replies a client doesn't read are
+        buffered up to a limit and each user may only hold a few
+        connections.
+
+        Args:
+            path (str): The socket path.
+            process_index (eyecare_reminder.processes.ProcessIndex):
+                The host's processes, created by_user.
+        """
+        self.path = path
+        self._process_index = process_index
+        self._server = None
+        self._loop = None
+        # socket: _Client
+        self._clients = {}
+
+    def start(self, loop):
+        """Start listening.
+
+        Args:
+            loop (eyecare_reminder.aioloop.AsyncioEventLoop): The loop.
+
+        Raises:
+            OSError: If the socket can't be created.
+        """
+        self._loop = loop
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        os.chmod(directory, 0o755)
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.path)
+        # every user connects, the replies only cover the peer's processes
+        os.chmod(self.path, 0o666)
+        self._server.listen()
+        self._server.setblocking(False)
+        loop.addReader(self._server.fileno(), self._accept)
+        _LOGGER.info("PROBE DAEMON LISTENING ON {}".format(self.path))
+
+    def _accept(self):
+        try:
+            client, _ = self._server.accept()
+        except BlockingIOError:
+            return
+        _, uid, _ = _PEER_CREDENTIALS.unpack(
+            client.getsockopt(
+                socket.SOL_SOCKET, socket.SO_PEERCRED, _PEER_CREDENTIALS.size
+            )
+        )
+        connections = sum(
+            1 for state in self._clients.values() if state.uid == uid
+        )
+        if connections >= config.probe_daemon_max_clients:
+            _LOGGER.warning(
+                "PROBE CLIENT REFUSED: UID {} HAS {} CONNECTIONS".format(
+                    uid, connections
+                )
+            )
+            client.close()
+            return
+        client.setblocking(False)
+        self._clients[client] = _Client(uid)
+        self._loop.addReader(client.fileno(), lambda: self._read(client))
+        _LOGGER.debug("PROBE CLIENT CONNECTED: UID {}".format(uid))
+
+    def _read(self, client):
+        state = self._clients[client]
+        buffer = state.requests
+        try:
+            data = client.recv(_MAX_REQUEST)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self._drop(client)
+            return
+        buffer += data
+        while b"\n" in buffer:
+            line, _, rest = bytes(buffer).partition(b"\n")
+            buffer[:] = rest
+            reply = json.dumps(self._answer(state.uid, line)) + "\n"
+            state.replies += reply.encode()
+        if len(buffer) > _MAX_REQUEST:
+            _LOGGER.warning("PROBE REQUEST TOO LONG, CLIENT DROPPED")
+            self._drop(client)
+            return
+        if len(state.replies) > _MAX_PENDING_REPLIES:
+            _LOGGER.warning("PROBE CLIENT NOT READING, CLIENT DROPPED")
+            self._drop(client)
+            return
+        self._write(client)
+
+    def _write(self, client):
+        state = self._clients.get(client)
+        if state is None:
+            return
+        try:
+            sent = client.send(state.replies) if state.replies else 0
+        except BlockingIOError:
+            sent = 0
+        except OSError as e:
+            _LOGGER.warning("PROBE CLIENT FAILED: {}".format(e))
+            self._drop(client)
+            return
+        del state.replies[:sent]
+        # wait for the client to read the rest, without blocking the loop
+        if state.replies and not state.writing:
+            self._loop.addWriter(client.fileno(), lambda: self._write(client))
+            state.writing = True
+        elif not state.replies and state.writing:
+            self._loop.removeWriter(client.fileno())
+            state.writing = False
+
+    def _answer(self, uid, line):
+        try:
+            probe = json.loads(line)["probe"]
+        except (ValueError, TypeError, KeyError):
+            return {"error": "Malformed request"}
+        if probe == PROBE_PROCESS:
+            return {"value": self._process_index.textForUser(uid)}
+        if probe == PROBE_MICROPHONE:
+            return {"value": checkCaptureActive()}
+        return {"error": "Unknown probe: {}".format(probe)}
+
+    def _drop(self, client):
+        state = self._clients.pop(client)
+        self._loop.removeReader(client.fileno())
+        if state.writing:
+            self._loop.removeWriter(client.fileno())
+        client.close()
+
+    def close(self):
+        """Disconnect the clients and remove the socket."""
+        for client in list(self._clients):
+            self._drop(client)
+        if self._server is not None:
+            self._loop.removeReader(self._server.fileno())
+            self._server.close()
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+
+class ProbeClient(object):
+
+    def __init__(self, path, timeout):
+        """Ask the probe daemon for the host-wide probes.
+
+        Requests are made from the validation threads, one at a time.
+
+        Args:
+            path (str): The daemon's socket path.
+            timeout (float): Seconds to wait for a reply.
+        """
+        self._path = path
+        self._timeout = timeout
+        self._socket = None
+        self._reader = None
+        self._lock = threading.Lock()
+
+    def connect(self):
+        """Connect to the daemon.
+
+        Raises:
+            OSError: If the daemon can't be reached.
+        """
+        with self._lock:
+            self._connect()
+
+    def _connect(self):
+        self._disconnect()
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self._timeout)
+        try:
+            sock.connect(self._path)
+        except OSError:
+            sock.close()
+            raise
+        self._socket = sock
+        self._reader = sock.makefile("rb")
+
+    def _disconnect(self):
+        if self._socket is not None:
+            self._reader.close()
+            self._socket.close()
+            self._socket = None
+            self._reader = None
+
+    def request(self, probe):
+        """Run a probe in the daemon.
+
+        A connection broken by a daemon restart is reopened once.
+
+        Args:
+            probe (str): One of PROBES.
+
+        Returns:
+            object: The probe's value.
+
+        Raises:
+            ProbeDaemonError: If the daemon can't be reached or the probe
+                fails.
+        """
+        request = (json.dumps({"probe": probe}) + "\n").encode()
+        with self._lock:
+            while True:
+                reconnect = self._socket is not None
+                try:
+                    if self._socket is None:
+                        self._connect()
+                    self._socket.sendall(request)
+                    line = self._reader.readline()
+                    if not line:
+                        raise ConnectionResetError("Connection closed")
+                    break
+                except OSError as e:
+                    self._disconnect()
+                    if not reconnect or isinstance(e, socket.timeout):
+                        raise ProbeDaemonError(
+                            "Probe daemon unavailable: {}".format(e)
+                        )
+        try:
+            reply = json.loads(line)
+        except ValueError:
+            raise ProbeDaemonError("Malformed reply: {!r}".format(line))
+        if "error" in reply:
+            raise ProbeDaemonError(reply["error"])
+        return reply["value"]
+
+    def processNames(self):
+        """Return the names of the processes of the session's user.
+
+        Returns:
+            str: The process names, newline separated.
+        """
+        return self.request(PROBE_PROCESS)
+
+    def isCaptureActive(self):
+        """Return whether any sound card on the host is capturing.
+
+        Returns:
+            bool: Whether any capture substream is running.
+        """
+        return self.request(PROBE_MICROPHONE)
+
+    def close(self):
+        """Disconnect from the daemon."""
+        with self._lock:
+            self._disconnect()
+
+
+def connectProbeDaemon(path):
+    """Connect to the probe daemon, if one is running.
+
+    Args:
+        path (str): The daemon's socket path.
+
+    Returns:
+        ProbeClient or None: The client, None without a daemon.
+    """
+    if not os.path.exists(path):
+        return None
+    client = ProbeClient(path, config.probe_timeout)
+    try:
+        client.connect()
+    except OSError as e:
+        _LOGGER.warning("PROBE DAEMON UNAVAILABLE: {}".format(e))
+        return None
+    _LOGGER.info("USING PROBE DAEMON: {}".format(path))
+    return client
+
+
+def runDaemon(path):
+    """Serve the host-wide probes until interrupted.
+
+    Args:
+        path (str): The socket path.
+
+    Returns:
+        int: The exit status.
+    """
+    import asyncio
+    from . import aioloop
+    # the proc connector needs CAP_NET_ADMIN, without it the daemon
+    # rescans /proc like the sessions would
+    process_index = processes.createProcessIndex(
+        config.process_rescan_interval, by_user=True
+    )
+    if process_index is None:
+        _LOGGER.error("PROBE DAEMON NEEDS /proc")
+        return 1
+    loop = asyncio.new_event_loop()
+    adapter = aioloop.AsyncioEventLoop(loop)
+    server = ProbeServer(path, process_index)
+    try:
+        server.start(adapter)
+    except OSError as e:
+        _LOGGER.error("COULD NOT LISTEN ON {}: {}".format(path, e))
+        loop.close()
+        return 1
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signal_number, loop.stop)
+    try:
+        loop.run_forever()
+    finally:
+        server.close()
+        loop.close()
+    return 0
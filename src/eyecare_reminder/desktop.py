@@ -0,0 +1,259 @@
+"""Desktop entries of the app: the installed launcher and the autostart entry.
+
+Entries are parsed once and reused until the file's modification time,
+size or inode change, and rewritten atomically so a crash mid-write can't
+leave a truncated file behind.
+"""
+import logging
+import os
+import tempfile
+
+from . import config
+
+_LOGGER = logging.getLogger(__name__)
+
+DESKTOP_ENTRY_GROUP = "Desktop Entry"
+
+
+def _fileSignature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+def _isTrue(value):
+    return value is not None and value.strip().lower() == "true"
+
+
+class DesktopEntryFile(object):
+
+    def __init__(self, path):
+        """A desktop entry file, keeping its comments and key order.
+
+        Args:
+            path (str): The file path.
+        """
+        self.path = os.path.abspath(path)
+        self._lines = []
+        self._signature = None
+
+    @property
+    def exists(self):
+        """bool: Whether the file exists."""
+        return self._load()
+
+    def _load(self):
+        signature = _fileSignature(self.path)
+        if signature is None:
+            self._lines = []
+            self._signature = None
+            return False
+        if signature != self._signature:
+            with open(self.path, encoding="utf-8") as _f:
+                self._lines = _f.read().splitlines()
+            self._signature = signature
+        return True
+
+    def _find(self, key, group):
+        # returns the index of the key's line and the index to insert new
+        # keys of the group at, None if the group doesn't exist
+        in_group = False
+        group_end = None
+        for index, line in enumerate(self._lines):
+            stripped = line.strip()
+            if stripped.startswith("[") and stripped.endswith("]"):
+                if in_group:
+                    break
+                in_group = stripped[1:-1] == group
+                if in_group:
+                    group_end = index + 1
+                continue
+            if not in_group or not stripped or stripped.startswith("#"):
+                continue
+            group_end = index + 1
+            if "=" in stripped and stripped.split("=", 1)[0].strip() == key:
+                return index, group_end
+        return None, group_end
+
+    def get(self, key, group=DESKTOP_ENTRY_GROUP):
+        """Return the raw value of a key.
+
+        Args:
+            key (str): The key name.
+            group (str): The group the key is in.
+
+        Returns:
+            str: The value, None if the key or file doesn't exist.
+        """
+        if not self._load():
+            return None
+        index, _ = self._find(key, group)
+        if index is None:
+            return None
+        return self._lines[index].split("=", 1)[1].strip()
+
+    def update(self, values, group=DESKTOP_ENTRY_GROUP, lines=None):
+        """Set several keys with a single write.
+
+        Nothing is written when every key already has its value.
+
+        Args:
+            values (dict[str, str]): The keys and their new values.
+            group (str): The group the keys are in, created if missing.
+            lines (list[str], optional): Content to start from instead of
+                the current file, eg. to create the file as a copy.
+
+        Returns:
+            bool: Whether the file was written.
+        """
+        exists = self._load()
+        if lines is not None:
+            self._lines = list(lines)
+        changed = lines is not None or not exists
+        for key, value in values.items():
+            index, group_end = self._find(key, group)
+            line = "{}={}".format(key, value)
+            if index is not None:
+                if self._lines[index] != line:
+                    self._lines[index] = line
+                    changed = True
+                continue
+            if group_end is None:
+                self._lines += ["[{}]".format(group)]
+                group_end = len(self._lines)
+            self._lines.insert(group_end, line)
+            changed = True
+        if changed:
+            self._write()
+        return changed
+
+    def _write(self):
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        handle, temporary_path = tempfile.mkstemp(
+            prefix=".{}.".format(os.path.basename(self.path)), dir=directory
+        )
+        try:
+            with os.fdopen(handle, "w", encoding="utf-8") as _f:
+                _f.write("\n".join(self._lines) + "\n")
+                _f.flush()
+                os.fsync(_f.fileno())
+            # mkstemp creates the file readable by the owner only
+            os.chmod(temporary_path, 0o644)
+            os.replace(temporary_path, self.path)
+        except OSError:
+            try:
+                os.remove(temporary_path)
+            except OSError:
+                pass
+            raise
+        self._signature = _fileSignature(self.path)
+        _LOGGER.info("DESKTOP ENTRY WRITTEN: {}".format(self.path))
+
+    def lines(self):
+        """Return the lines of the file.
+
+        Returns:
+            list[str]: The lines, empty if the file doesn't exist.
+        """
+        self._load()
+        return list(self._lines)
+
+
+class DesktopEntryManager(object):
+
+    def __init__(self, application_path, autostart_path):
+        """Manage the application and autostart desktop entries.
+
+        Autostart follows the freedesktop autostart specification, an entry
+        in the autostart directory which is disabled with Hidden=true. The
+        GNOME specific key is kept in sync in both entries.
+
+        Args:
+            application_path (str): The installed application entry.
+            autostart_path (str): The entry in the autostart directory.
+        """
+        self.application = DesktopEntryFile(application_path)
+        self.autostart = DesktopEntryFile(autostart_path)
+
+    @property
+    def isInstalled(self):
+        """bool: Whether the application entry is installed."""
+        return self.application.exists
+
+    def isAutostartEnabled(self):
+        """Return whether the app starts on login.
+
+        Users of versions which only set the GNOME key in the application
+        entry keep their setting until the autostart entry is written.
+
+        Returns:
+            bool: Whether autostart is enabled, None if the application
+                entry isn't installed.
+        """
+        if not self.isInstalled:
+            return None
+        if not self.autostart.exists:
+            return _isTrue(self.application.get(config.autostart_key))
+        if _isTrue(self.autostart.get(config.autostart_hidden_key)):
+            return False
+        return self.autostart.get(config.autostart_key) != "false"
+
+    def setAutostart(self, enabled):
+        """Enable or disable starting on login.
+
+        Args:
+            enabled (bool): Whether to start on login.
+        """
+        value = "true" if enabled else "false"
+        self.application.update({config.autostart_key: value})
+        values = {
+            config.autostart_key: value,
+            config.autostart_hidden_key: "false" if enabled else "true",
+        }
+        if self.autostart.exists:
+            self.autostart.update(values)
+        else:
+            # the autostart entry starts out as a copy of the application's
+            self.autostart.update(values, lines=self.application.lines())
+        _LOGGER.info("AUTOSTART {}".format("ENABLED" if enabled else "DISABLED"))
+
+    def migrateAutostart(self):
+        """Write the autostart entry for users whose autostart setting is
+        only stored in the GNOME key of the application entry."""
+        if self.isInstalled and not self.autostart.exists and _isTrue(
+            self.application.get(config.autostart_key)
+        ):
+            self.setAutostart(True)
+
+    def getIconPath(self):
+        """Return the icon of the application entry.
+
+        Returns:
+            str: The icon path, None if the entry isn't installed.
+        """
+        return self.application.get(config.icon_key)
+
+    def setIconPath(self, icon_path):
+        """Point the entries at an absolute icon path, as they can't be
+        relative.
+
+        Args:
+            icon_path (str): The icon path.
+        """
+        for entry in (self.application, self.autostart):
+            if entry.exists:
+                entry.update({config.icon_key: icon_path})
+
+
+def createDesktopEntryManager():
+    """Create the manager for the default desktop entry locations.
+
+    Returns:
+        DesktopEntryManager: The desktop entry manager.
+    """
+    return DesktopEntryManager(
+        config.desktop_file_location, config.autostart_file_location
+    )
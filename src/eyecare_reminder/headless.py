@@ -0,0 +1,351 @@
+"""Running the reminder without Qt.
+
+The core runs on an asyncio loop and its messages are passed to sinks,
+which print them, show them as desktop notifications or send them as JSON
+lines to the clients of a Unix socket, eg. a status bar.
+"""
+import asyncio
+import errno
+import json
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+from . import aioloop, config, core, utils
+
+_LOGGER = logging.getLogger(__name__)
+
+# messages, the events without one only interest socket clients
+EVENT_REMINDER = "reminder"
+EVENT_REMINDER_CLOSED = "reminder_closed"
+EVENT_COOLDOWN_FINISHED = "cooldown_finished"
+EVENT_NEXT_REMINDER = "next_reminder"
+EVENT_CONFIG_RELOADED = "config_reloaded"
+EVENT_CONFIG_INVALID = "config_invalid"
+
+_REMINDER_EVENTS = (
+    EVENT_REMINDER, EVENT_REMINDER_CLOSED, EVENT_COOLDOWN_FINISHED
+)
+_SKIP_ACTION = "skip"
+
+
+class SinkError(ValueError):
+    """Raised for an unknown sink specification."""
+
+
+class StdoutSink(object):
+    """Print the messages with the time they were sent at."""
+
+    def start(self, reminder_core, loop):
+        """Start the sink, once the core exists.
+
+        Args:
+            reminder_core (eyecare_reminder.core.ReminderCore): The core.
+            loop (eyecare_reminder.aioloop.AsyncioEventLoop): The loop.
+        """
+
+    def send(self, event, message):
+        """Send a message.
+
+        Args:
+            event (str): One of the EVENT_* values.
+            message (str): The text, empty for events without one.
+        """
+        if message:
+            print(
+                "[{}] {}".format(time.strftime("%H:%M:%S"), message),
+                flush=True,
+            )
+
+    def close(self):
+        """Release the sink's resources."""
+
+
+class NotificationSink(object):
+    """Show the messages as desktop notifications, the reminder with a
+    button skipping the cooldown. Without the notification client or a
+    notification server the messages are printed instead."""
+
+    def __init__(self):
+        self._client = None
+        self._core = None
+        self._loop = None
+        self._fallback = StdoutSink()
+
+    def start(self, reminder_core, loop):
+        self._core = reminder_core
+        self._loop = loop
+        try:
+            from . import notifications
+        except ImportError as e:
+            # eg. jeepney older than 0.7
+            _LOGGER.warning("NOTIFICATIONS NOT AVAILABLE: {}".format(e))
+            return
+        self._client = notifications.NotificationClient(
+            config.notification_app_name, on_action=self._action
+        )
+
+    def _action(self, key, action):
+        # called from the client thread
+        if key == EVENT_REMINDER and action == _SKIP_ACTION:
+            self._loop.callSoonThreadsafe(self._core.skipCooldown)
+
+    def send(self, event, message):
+        if self._client is None or not self._client.isConnected:
+            self._fallback.send(event, message)
+            return
+        from . import notifications
+        # the reminder and its end share a notification
+        key = EVENT_REMINDER if event in _REMINDER_EVENTS else event
+        if event == EVENT_REMINDER_CLOSED:
+            self._client.close(key)
+        elif event == EVENT_REMINDER:
+            self._client.notify(
+                key,
+                "Eyecare Reminder",
+                message,
+                icon=config.icon_attention,
+                timeout=0,
+                actions=[(_SKIP_ACTION, config.notification_skip_label)],
+                urgency=notifications.URGENCY_CRITICAL,
+            )
+        elif message and event != EVENT_NEXT_REMINDER:
+            self._client.notify(
+                key,
+                "Eyecare Reminder",
+                message,
+                icon=config.icon,
+                timeout=config.reminder_cooldown_duration,
+            )
+
+    def close(self):
+        if self._client is not None:
+            self._client.shutdown()
+
+
+class SocketSink(object):
+
+    def __init__(self, path):
+        """Send the messages as JSON lines to every client of a Unix socket.
+
+        Args:
+            path (str): The socket path.
+        """
+        self.path = path
+        self._server = None
+        self._clients = []
+        self._loop = None
+
+    def start(self, reminder_core, loop):
+        self._loop = loop
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.path)
+        os.chmod(self.path, 0o600)
+        self._server.listen()
+        self._server.setblocking(False)
+        loop.addReader(self._server.fileno(), self._accept)
+        _LOGGER.info("SENDING MESSAGES TO {}".format(self.path))
+
+    def _accept(self):
+        try:
+            client, _ = self._server.accept()
+        except BlockingIOError:
+            return
+        client.setblocking(False)
+        self._clients.append(client)
+        # clients only listen, reading detects them disconnecting
+        self._loop.addReader(client.fileno(), lambda: self._read(client))
+
+    def _read(self, client):
+        try:
+            if client.recv(4096):
+                return
+        except BlockingIOError:
+            return
+        except OSError:
+            pass
+        self._drop(client)
+
+    def _drop(self, client):
+        self._loop.removeReader(client.fileno())
+        self._clients.remove(client)
+        client.close()
+
+    def send(self, event, message):
+        line = json.dumps(
+            {"time": time.time(), "event": event, "message": message}
+        ) + "\n"
+        for client in list(self._clients):
+            try:
+                client.sendall(line.encode())
+            except OSError as e:
+                if e.errno not in (
+                    errno.EAGAIN, errno.EPIPE, errno.ECONNRESET
+                ):
+                    _LOGGER.warning("SOCKET CLIENT FAILED: {}".format(e))
+                # clients that don't keep up with reading are dropped
+                self._drop(client)
+
+    def close(self):
+        for client in list(self._clients):
+            self._drop(client)
+        if self._server is not None:
+            self._loop.removeReader(self._server.fileno())
+            self._server.close()
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+
+def defaultSocketPath():
+    """Return the default socket path, in the user's runtime directory.
+
+    Returns:
+        str: The socket path.
+    """
+    directory = os.environ.get("XDG_RUNTIME_DIR") or os.path.dirname(
+        config.config_cache_location
+    )
+    return os.path.join(directory, config.headless_socket_name)
+
+
+def createSink(specification):
+    """Create a sink from its command line specification.
+
+    Args:
+        specification (str): "stdout", "notification", "socket" or
+            "socket:PATH".
+
+    Returns:
+        object: The sink.
+
+    Raises:
+        SinkError: If the specification is unknown.
+    """
+    name, _, argument = specification.partition(":")
+    if name == "stdout" and not argument:
+        return StdoutSink()
+    if name == "notification" and not argument:
+        return NotificationSink()
+    if name == "socket":
+        return SocketSink(argument or defaultSocketPath())
+    raise SinkError("Unknown sink: {}".format(specification))
+
+
+class HeadlessFrontend(object):
+
+    def __init__(self, reminder_core, sinks):
+        """The frontend of the core without a tray icon.
+
+        Args:
+            reminder_core (eyecare_reminder.core.ReminderCore): The core.
+            sinks (list): The sinks the messages are sent to.
+        """
+        self._core = reminder_core
+        self._sinks = sinks
+
+    def _send(self, event, message=""):
+        for sink in self._sinks:
+            try:
+                sink.send(event, message)
+            except Exception:
+                _LOGGER.exception("SINK FAILED: {}".format(event))
+
+    def setupDeferred(self):
+        """Decode the sounds."""
+        from . import audio
+        audio.getAudioEngine().preload(
+            [config.reminder_sound, config.cooldown_sound]
+        )
+
+    def showReminderMessage(self, play_sound=True):
+        """Send the reminder message.
+
+        Args:
+            play_sound (bool): Whether to play sound or not.
+        """
+        self._send(
+            EVENT_REMINDER,
+            config.reminder_message.format(self._core.getCooldownValue()),
+        )
+        if play_sound:
+            utils.play_sound(config.reminder_sound)
+
+    def showCooldownMessage(self, play_sound=True):
+        """Send the cooldown message.
+
+        Args:
+            play_sound (bool): Whether to play sound or not.
+        """
+        self._send(EVENT_COOLDOWN_FINISHED, config.reminder_end_message)
+        if play_sound:
+            utils.play_sound(config.cooldown_sound)
+
+    def closeReminderMessage(self):
+        """Withdraw the reminder message."""
+        self._send(EVENT_REMINDER_CLOSED)
+
+    def setReminderToolTip(self, time):
+        """Send the time the next reminder will be at.
+
+        Args:
+            time (str): The time in HH:MM format.
+        """
+        self._send(
+            EVENT_NEXT_REMINDER, config.next_reminder_message.format(time)
+        )
+
+    def showConfigReloadedMessage(self):
+        """Send the config reloaded message."""
+        self._send(EVENT_CONFIG_RELOADED, config.config_reloaded_message)
+
+    def showBadConfigMessage(self):
+        """Send the broken config message."""
+        self._send(EVENT_CONFIG_INVALID, config.bad_config_message)
+
+    def setDefaultTrayIcon(self):
+        """There is no tray icon."""
+
+    def startCooldownAnimation(self):
+        """There is no tray icon."""
+
+
+def runHeadless(sink_specifications):
+    """Run the reminder on an asyncio loop until interrupted.
+
+    Args:
+        sink_specifications (list[str]): The sinks, see createSink.
+
+    Returns:
+        int: The exit status.
+    """
+    try:
+        sinks = [createSink(spec) for spec in sink_specifications]
+    except SinkError as e:
+        print(e, file=sys.stderr)
+        return 2
+    loop = asyncio.new_event_loop()
+    adapter = aioloop.AsyncioEventLoop(loop)
+    reminder_core = core.ReminderCore(adapter)
+    frontend = HeadlessFrontend(reminder_core, sinks)
+    for sink in sinks:
+        sink.start(reminder_core, adapter)
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signal_number, reminder_core.exit)
+    reminder_core.setup(frontend)
+    try:
+        loop.run_forever()
+    finally:
+        for sink in sinks:
+            sink.close()
+        loop.close()
+    return 0
@@ -0,0 +1,205 @@
+"""Tray icons rendered once and reused for every animation frame.
+
+The icon images are read from the package data and decoded once. Each
+frame is a QIcon holding a pixmap pre-rendered for every tray icon size
+and screen device pixel ratio, so the tray picks an exact match instead
+of rescaling the image whenever the icon changes.
+"""
+import logging
+import pkgutil
+
+from PyQt5.QtCore import QRectF, Qt
+from PyQt5.QtGui import (
+    QColor,
+    QGuiApplication,
+    QIcon,
+    QImage,
+    QPainter,
+    QPen,
+    QPixmap,
+)
+
+from . import config
+
+_LOGGER = logging.getLogger(__name__)
+
+FRAME_DEFAULT = "default"
+FRAME_ATTENTION = "attention"
+
+_FRAME_FILES = {
+    FRAME_DEFAULT: config.icon_file_name,
+    FRAME_ATTENTION: config.icon_attention_file_name,
+}
+_RING_COLOR = QColor(76, 175, 80)
+_RING_TRACK_COLOR = QColor(0, 0, 0, 90)
+
+
+def loadImage(file_name):
+    """Decode an image of the package data.
+
+    Args:
+        file_name (str): The file name in the images directory.
+
+    Returns:
+        QImage: The decoded image.
+
+    Raises:
+        OSError: If the image can't be read or decoded.
+    """
+    data = pkgutil.get_data(__package__, "images/" + file_name)
+    image = QImage.fromData(data)
+    if image.isNull():
+        raise OSError("Could not decode image: {}".format(file_name))
+    return image
+
+
+def screenPixelRatios():
+    """Return the device pixel ratios of the connected screens.
+
+    Returns:
+        list[float]: The distinct ratios, at least 1.0.
+    """
+    ratios = {screen.devicePixelRatio() for screen in QGuiApplication.screens()}
+    return sorted(ratios or {1.0})
+
+
+class IconCache(object):
+
+    def __init__(self, sizes, pixel_ratios):
+        """Frames of the tray icon, rendered on first use.
+
+        Args:
+            sizes (list[int]): Icon sizes in device independent pixels.
+            pixel_ratios (list[float]): Screen device pixel ratios.
+        """
+        self._images = {
+            frame: loadImage(file_name)
+            for frame, file_name in _FRAME_FILES.items()
+        }
+        self._sizes = sorted(set(sizes))
+        self._pixel_ratios = sorted(set(pixel_ratios))
+        # QIcon by (frame, progress step)
+        self._icons = {}
+
+    def addSize(self, size):
+        """Render the frames at another size, eg. the tray's actual size.
+
+        Args:
+            size (int): The size in device independent pixels.
+
+        Returns:
+            bool: Whether the size is new, the frames are re-rendered.
+        """
+        if size <= 0 or size in self._sizes:
+            return False
+        self._sizes = sorted(self._sizes + [size])
+        self._icons.clear()
+        _LOGGER.debug("TRAY ICON SIZE ADDED: {}".format(size))
+        return True
+
+    def icon(self, frame, progress_step=None):
+        """Return a frame.
+
+        Args:
+            frame (str): FRAME_DEFAULT or FRAME_ATTENTION.
+            progress_step (int, optional): Draw a progress ring filled to
+                progress_step of config.icon_progress_steps.
+
+        Returns:
+            QIcon: The frame, rendered for all sizes.
+        """
+        key = (frame, progress_step)
+        icon = self._icons.get(key)
+        if icon is None:
+            icon = self._icons[key] = self._render(frame, progress_step)
+        return icon
+
+    def _render(self, frame, progress_step):
+        icon = QIcon()
+        image = self._images[frame]
+        for size in self._sizes:
+            for ratio in self._pixel_ratios:
+                pixels = round(size * ratio)
+                pixmap = QPixmap.fromImage(
+                    image.scaled(
+                        pixels,
+                        pixels,
+                        Qt.KeepAspectRatio,
+                        Qt.SmoothTransformation,
+                    )
+                )
+                if progress_step is not None:
+                    self._drawProgressRing(pixmap, progress_step)
+                pixmap.setDevicePixelRatio(ratio)
+                icon.addPixmap(pixmap)
+        return icon
+
+    @staticmethod
+    def _drawProgressRing(pixmap, progress_step):
+        width = max(1.0, pixmap.width() / 10)
+        rect = QRectF(pixmap.rect()).adjusted(
+            width / 2, width / 2, -width / 2, -width / 2
+        )
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(QPen(_RING_TRACK_COLOR, width))
+        painter.drawEllipse(rect)
+        pen = QPen(_RING_COLOR, width)
+        pen.setCapStyle(Qt.FlatCap)
+        painter.setPen(pen)
+        # clockwise from 12 o'clock, in 1/16ths of a degree
+        span = round(360 * 16 * progress_step / config.icon_progress_steps)
+        painter.drawArc(rect, 90 * 16, -span)
+        painter.end()
+
+
+class IconAnimation(object):
+
+    def __init__(self, frames):
+        """A looping sequence of frames.
+
+        Args:
+            frames (list[str]): The frames in order.
+        """
+        self._frames = list(frames)
+        self._index = 0
+
+    def reset(self):
+        """Start again from the first frame."""
+        self._index = 0
+
+    def next(self):
+        """Return the next frame.
+
+        Returns:
+            str: The frame.
+        """
+        frame = self._frames[self._index]
+        self._index = (self._index + 1) % len(self._frames)
+        return frame
+
+
+def progressStep(remaining, duration):
+    """Return the progress ring step for a point in a cooldown.
+
+    Args:
+        remaining (float): Seconds left in the cooldown.
+        duration (float): The cooldown duration in seconds.
+
+    Returns:
+        int: The step, from 0 to config.icon_progress_steps.
+    """
+    if duration <= 0:
+        return config.icon_progress_steps
+    progress = 1 - max(0.0, min(remaining, duration)) / duration
+    return int(progress * config.icon_progress_steps)
+
+
+def createIconCache():
+    """Create the icon cache for the common tray sizes and the connected
+    screens.
+
+    Returns:
+        IconCache: The icon cache.
+    """
+    return IconCache(config.tray_icon_sizes, screenPixelRatios())
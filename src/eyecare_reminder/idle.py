@@ -0,0 +1,206 @@
+import logging
+import subprocess
+import time
+
+from . import config, x11
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class XSyncIdleBackend(object):
+    """Read the XSync IDLETIME system counter."""
+    name = "xsync"
+
+    def __init__(self, display):
+        """Initialize the backend.
+
+        Args:
+            display (eyecare_reminder.x11.Display): The open display.
+
+        Raises:
+            eyecare_reminder.x11.XError: If the counter is unavailable.
+        """
+        self.sync = x11.SyncExtension(display)
+        self.counter = self.sync.getSystemCounter("IDLETIME")
+
+    def getIdleTime(self):
+        """Return the time since the last user input.
+
+        Returns:
+            int: The idle time in milliseconds.
+        """
+        return self.sync.queryCounter(self.counter)
+
+
+class ScreenSaverIdleBackend(object):
+    """Read the idle time from the MIT-SCREEN-SAVER extension."""
+    name = "screensaver"
+
+    def __init__(self, display):
+        """Initialize the backend.
+
+        Args:
+            display (eyecare_reminder.x11.Display): The open display.
+
+        Raises:
+            eyecare_reminder.x11.XError: If the extension is unavailable.
+        """
+        self.screensaver = x11.ScreenSaverExtension(display)
+
+    def getIdleTime(self):
+        """Return the time since the last user input.
+
+        Returns:
+            int: The idle time in milliseconds.
+        """
+        return self.screensaver.queryIdle()
+
+
+class XprintidleIdleBackend(object):
+    """Fall back to running the xprintidle executable."""
+    name = "xprintidle"
+
+    def __init__(self, display=None):
+        """Initialize the backend.
+
+        Args:
+            display (eyecare_reminder.x11.Display, optional): Unused.
+        """
+
+    @staticmethod
+    def getIdleTime():
+        """Return the time since the last user input.
+
+        Returns:
+            int: The idle time in milliseconds.
+        """
+        output = subprocess.check_output(
+            ["xprintidle"], timeout=config.probe_timeout
+        )
+        return int(output.decode())
+
+
+class IdleMonitor(object):
+
+    def __init__(self, backend, on_idle=None, on_resume=None):
+        """Event driven idle tracking through XSync IDLETIME alarms.
+
+        The X server notifies us when the idle counter crosses one of the
+        thresholds and when user input resets it, so no polling is needed
+        while the user is away.
+
+        Args:
+            backend (XSyncIdleBackend): The backend owning the counter.
+            on_idle (callable, optional): Called with the crossed threshold
+                in milliseconds when the user has been idle that long.
+            on_resume (callable, optional): Called with the idle period
+                duration in milliseconds when user input resumes.
+        """
+        self._sync = backend.sync
+        self._counter = backend.counter
+        self._on_idle = on_idle
+        self._on_resume = on_resume
+        self._idle_alarms = {}
+        self._reset_alarm = None
+        self._idle_start = None
+        self._sync.display.addEventHandler(
+            self._sync.event_base + x11.XSyncAlarmNotify, self._alarmNotify
+        )
+
+    @property
+    def isIdle(self):
+        """bool: Whether any idle threshold has been crossed since the last
+        user input."""
+        return self._idle_start is not None
+
+    def setThresholds(self, thresholds):
+        """Set the idle thresholds to register alarms at.
+
+        Args:
+            thresholds (list[int]): Idle thresholds in milliseconds.
+        """
+        thresholds = sorted(set(int(t) for t in thresholds if t > 0))
+        for threshold in list(self._idle_alarms):
+            if threshold not in thresholds:
+                self._sync.destroyAlarm(self._idle_alarms.pop(threshold))
+        for threshold in thresholds:
+            if threshold not in self._idle_alarms:
+                self._idle_alarms[threshold] = self._sync.createAlarm(
+                    self._counter, threshold, x11.XSyncPositiveTransition,
+                )
+        if not thresholds:
+            return
+        # input drops the counter below the smallest threshold
+        if self._reset_alarm is None:
+            self._reset_alarm = self._sync.createAlarm(
+                self._counter, thresholds[0], x11.XSyncNegativeTransition,
+            )
+        else:
+            self._sync.changeAlarm(
+                self._reset_alarm,
+                self._counter,
+                thresholds[0],
+                x11.XSyncNegativeTransition,
+            )
+        _LOGGER.info("IDLE ALARMS SET: {}".format(thresholds))
+
+    def _alarmNotify(self, event):
+        alarm = event.xsyncalarm.alarm
+        if alarm == self._reset_alarm:
+            if self._idle_start is None:
+                return
+            duration = (time.monotonic() - self._idle_start) * 1000
+            self._idle_start = None
+            _LOGGER.info("SYSTEM RESUMED AFTER {}s".format(int(duration / 1000)))
+            if self._on_resume:
+                self._on_resume(duration)
+            return
+        for threshold, idle_alarm in self._idle_alarms.items():
+            if idle_alarm == alarm:
+                if self._idle_start is None:
+                    counter_value = event.xsyncalarm.counter_value.toInt()
+                    self._idle_start = time.monotonic() - counter_value / 1000
+                _LOGGER.info("SYSTEM IDLE FOR {}s".format(threshold // 1000))
+                if self._on_idle:
+                    self._on_idle(threshold)
+                return
+
+    def close(self):
+        """Destroy all registered alarms."""
+        for alarm in self._idle_alarms.values():
+            self._sync.destroyAlarm(alarm)
+        self._idle_alarms = {}
+        if self._reset_alarm is not None:
+            self._sync.destroyAlarm(self._reset_alarm)
+            self._reset_alarm = None
+
+
+_BACKENDS = [XSyncIdleBackend, ScreenSaverIdleBackend]
+
+
+def createIdleBackend(display):
+    """Create the best idle backend available for the display.
+
+    In-process backends are tried first, falling back to xprintidle.
+
+    Args:
+        display (eyecare_reminder.x11.Display or None): The open display.
+
+    Returns:
+        object: The idle backend, exposing name and getIdleTime().
+    """
+    if display is not None:
+        for backend_class in _BACKENDS:
+            try:
+                backend = backend_class(display)
+            except x11.XError as e:
+                _LOGGER.warning(
+                    "IDLE BACKEND {} UNAVAILABLE: {}".format(
+                        backend_class.name.upper(), e
+                    )
+                )
+                continue
+            _LOGGER.info("IDLE BACKEND: {}".format(backend.name.upper()))
+            return backend
+    _LOGGER.info("IDLE BACKEND: XPRINTIDLE")
+    return XprintidleIdleBackend()
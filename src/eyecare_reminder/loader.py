@@ -0,0 +1,203 @@
+"""Layered config loading.
+
+Config values are merged from the system wide config files, the user
+config file and environment variables, later layers overriding earlier
+ones, then validated against the ConfigKeys schema into a ConfigSnapshot.
+"""
+import json
+import logging
+import os
+
+from . import config, utils
+
+_LOGGER = logging.getLogger(__name__)
+
+_CACHE_VERSION = 1
+ENVIRONMENT_LAYER = "environment"
+
+
+class ConfigError(ValueError):
+    """Raised when the merged config is invalid."""
+
+
+def _fileSignature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size, stat.st_ino]
+
+
+class ConfigLoader(object):
+
+    def __init__(self, user_path, system_paths=(), environment=None,
+                 cache_path=None):
+        """Load and validate the layered config.
+
+        Args:
+            user_path (str): The user config file.
+            system_paths (list[str]): System config files, lowest priority
+                first, missing files are skipped.
+            environment (dict, optional): The environment variables,
+                defaults to os.environ.
+            cache_path (str, optional): File caching the parsed config
+                files between runs, no on-disk cache if not given.
+        """
+        self.user_path = user_path
+        self.system_paths = list(system_paths)
+        self._environment = (
+            os.environ if environment is None else environment
+        )
+        self._cache_path = cache_path
+        self._cache = None
+        self._cache_dirty = False
+
+    @property
+    def paths(self):
+        """list[str]: The config files, lowest priority first."""
+        return self.system_paths + [self.user_path]
+
+    def hasSystemConfig(self):
+        """Return whether any system config file exists.
+
+        Returns:
+            bool: Whether a system config file exists.
+        """
+        return any(os.path.exists(path) for path in self.system_paths)
+
+    def load(self):
+        """Merge and validate the config layers.
+
+        Config files are only parsed when their modification time, size or
+        inode changed since they were last parsed.
+
+        Returns:
+            eyecare_reminder.config.ConfigSnapshot: The validated config.
+
+        Raises:
+            ConfigError: If a layer can't be parsed or a value is invalid.
+        """
+        layers = []
+        for path in self.paths:
+            data = self._readFile(path)
+            if data is not None:
+                layers.append((path, data))
+        layers.append((ENVIRONMENT_LAYER, self._readEnvironment()))
+        self._saveCache()
+        return self._merge(layers)
+
+    def _readFile(self, path):
+        signature = _fileSignature(path)
+        if signature is None:
+            return None
+        cache = self._loadCache()
+        entry = cache.get(path)
+        if entry is not None and entry["signature"] == signature:
+            return entry["data"]
+        # only imported when a file has to be parsed
+        import yaml
+        try:
+            with open(path) as _f:
+                data = yaml.load(_f, Loader=utils.getYamlLoader())
+        except (OSError, yaml.YAMLError) as e:
+            raise ConfigError("Could not read {}: {}".format(path, e))
+        if data is None:
+            # empty or comments only
+            data = {}
+        if not isinstance(data, dict):
+            raise ConfigError("{} is not a mapping".format(path))
+        try:
+            json.dumps(data)
+        except (TypeError, ValueError):
+            # eg. dates, which can't be cached but fail validation anyway
+            cache.pop(path, None)
+        else:
+            cache[path] = {"signature": signature, "data": data}
+        self._cache_dirty = True
+        return data
+
+    def _readEnvironment(self):
+        data = {}
+        for key in config.configKeysAsList():
+            value = self._environment.get(key.environmentVariable)
+            if value is None:
+                continue
+            import yaml
+            try:
+                # yaml gives the same types as the config files
+                data[key.name] = yaml.load(value, Loader=utils.getYamlLoader())
+            except yaml.YAMLError as e:
+                raise ConfigError(
+                    "{}: {}".format(key.environmentVariable, e)
+                )
+        return data
+
+    @staticmethod
+    def _merge(layers):
+        values = {}
+        sources = {}
+        problems = []
+        for key in config.configKeysAsList():
+            for source, data in reversed(layers):
+                if key.name in data and data[key.name] is not None:
+                    values[key.name] = data[key.name]
+                    sources[key.name] = source
+                    break
+            else:
+                if key.required:
+                    problems.append("{} is missing".format(key.name))
+                    continue
+                values[key.name] = key.default_value
+                sources[key.name] = "default"
+                continue
+            problem = key.validate(values[key.name])
+            if problem is not None:
+                problems.append(
+                    "{} in {}: {}".format(key.name, sources[key.name], problem)
+                )
+        if problems:
+            raise ConfigError(", ".join(problems))
+        return config.ConfigSnapshot(values, sources)
+
+    def _loadCache(self):
+        if self._cache is not None:
+            return self._cache
+        self._cache = {}
+        if self._cache_path is None:
+            return self._cache
+        try:
+            with open(self._cache_path) as _f:
+                cache = json.load(_f)
+            if cache.get("version") == _CACHE_VERSION:
+                self._cache = cache["files"]
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+        return self._cache
+
+    def _saveCache(self):
+        if not self._cache_dirty or self._cache_path is None:
+            return
+        self._cache_dirty = False
+        temporary_path = "{}.{}.tmp".format(self._cache_path, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(self._cache_path), exist_ok=True)
+            with open(temporary_path, "w") as _f:
+                json.dump(
+                    {"version": _CACHE_VERSION, "files": self._cache}, _f
+                )
+            os.replace(temporary_path, self._cache_path)
+        except OSError as e:
+            _LOGGER.warning("COULD NOT WRITE CONFIG CACHE: {}".format(e))
+
+
+def createConfigLoader():
+    """Create the loader for the default config locations.
+
+    Returns:
+        ConfigLoader: The config loader.
+    """
+    return ConfigLoader(
+        config.default_config_location,
+        system_paths=config.system_config_locations,
+        cache_path=config.config_cache_location,
+    )
@@ -0,0 +1,150 @@
+"""Logging configured explicitly at startup.
+
+Records are handed to a queue on the calling thread and written to disk by
+a listener thread, so the event loop never waits for file I/O. The log
+rotates by size, and events logged through logEvent can additionally be
+written as JSON lines for tools to parse.
+"""
+import atexit
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+
+from . import config
+
+LOG_FORMAT = "%(asctime)s[%(name)s][%(levelname)s] %(message)s"
+LOG_DATE_FORMAT = "[%Y-%m-%d][%H:%M:%S]"
+
+_EVENT_LOGGER = logging.getLogger("eyecare_reminder.events")
+
+_LISTENER = None
+_EVENT_FILTER = None
+
+
+class EventFilter(logging.Filter):
+
+    def __init__(self, enabled=False):
+        """Pass only records logged through logEvent, while enabled.
+
+        Args:
+            enabled (bool): Whether events are passed.
+        """
+        super().__init__()
+        self.enabled = enabled
+
+    def filter(self, record):
+        return self.enabled and hasattr(record, "event")
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Format event records as one JSON object per line."""
+
+    def format(self, record):
+        data = {
+            "time": datetime.datetime.fromtimestamp(
+                record.created
+            ).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "event": record.event,
+        }
+        data.update(record.event_fields)
+        return json.dumps(data, default=str)
+
+
+def logEvent(event, level=logging.INFO, **fields):
+    """Log a structured event.
+
+    The event is written to the log as text and, when event logging is
+    enabled, to the events file as a JSON line.
+
+    Args:
+        event (str): The event type, eg. "reminder_fired".
+        level (int): The logging level.
+        **fields: JSON serializable details of the event.
+    """
+    if not _EVENT_LOGGER.isEnabledFor(level):
+        return
+    details = " ".join(
+        "{}={}".format(name, value) for name, value in fields.items()
+    )
+    _EVENT_LOGGER.log(
+        level,
+        "EVENT {} {}".format(event.upper(), details).rstrip(),
+        extra={"event": event, "event_fields": fields},
+    )
+
+
+def setEventLogging(enabled):
+    """Enable or disable writing events as JSON lines.
+
+    Args:
+        enabled (bool): Whether to write the events file.
+    """
+    if _EVENT_FILTER is not None:
+        _EVENT_FILTER.enabled = enabled
+
+
+def setupLogging(path=None, events_path=None, level=logging.DEBUG):
+    """Configure logging for the app, once at startup.
+
+    Args:
+        path (str, optional): The log file, defaults to
+            config.default_log_location.
+        events_path (str, optional): The JSON lines events file, defaults
+            to config.default_events_log_location.
+        level (int): The minimum level written to the log.
+    """
+    global _LISTENER, _EVENT_FILTER
+    if _LISTENER is not None:
+        return
+    path = path or config.default_log_location
+    events_path = events_path or config.default_events_log_location
+    for file_path in (path, events_path):
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        path,
+        maxBytes=config.log_max_bytes,
+        backupCount=config.log_backup_count,
+        encoding="utf-8",
+    )
+    file_handler.setFormatter(
+        logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
+    )
+    _EVENT_FILTER = EventFilter()
+    # delay, so the file is only created once an event is written
+    events_handler = logging.handlers.RotatingFileHandler(
+        events_path,
+        maxBytes=config.log_max_bytes,
+        backupCount=config.log_backup_count,
+        encoding="utf-8",
+        delay=True,
+    )
+    events_handler.setFormatter(JsonLinesFormatter())
+    events_handler.addFilter(_EVENT_FILTER)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level)
+    _LISTENER = logging.handlers.QueueListener(
+        log_queue,
+        file_handler,
+        events_handler,
+        respect_handler_level=True,
+    )
+    _LISTENER.start()
+    atexit.register(shutdownLogging)
+
+
+def shutdownLogging():
+    """Write the queued records and stop the listener thread."""
+    global _LISTENER
+    if _LISTENER is not None:
+        _LISTENER.stop()
+        _LISTENER = None
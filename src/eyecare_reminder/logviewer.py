@@ -0,0 +1,334 @@
+"""A log viewer which doesn't read the whole log into memory.
+
+The log is memory-mapped and split into chunks of roughly chunk_size bytes
+that start at a record boundary. Locating the boundaries only touches the
+pages around them, so the resulting sparse index of chunk offsets and
+their first timestamps is cheap even for large logs. The viewer shows the
+tail of the log and decodes older chunks as the user scrolls up.
+"""
+import bisect
+import collections
+import mmap
+import os
+import re
+
+from PyQt5.QtGui import QFontDatabase, QTextCursor
+from PyQt5.QtWidgets import (
+    QComboBox,
+    QHBoxLayout,
+    QLabel,
+    QPlainTextEdit,
+    QPushButton,
+    QVBoxLayout,
+    QWidget,
+)
+
+# [2024-01-31][12:00:00][name][LEVEL] message, see logs.LOG_FORMAT
+_RECORD_START = re.compile(
+    rb"^\[(\d{4}-\d\d-\d\d)\]\[(\d\d:\d\d:\d\d)\]\[([^\]]*)\]\[([A-Z]+)\] ?",
+    re.MULTILINE,
+)
+_EVENT = re.compile(r"EVENT ([A-Z_]+)")
+_LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
+
+LogRecord = collections.namedtuple(
+    "LogRecord", ["timestamp", "name", "level", "event", "text"]
+)
+
+
+class LogFile(object):
+
+    def __init__(self, path, chunk_size=64 * 1024):
+        """Random access to the records of a log file.
+
+        Args:
+            path (str): The log file.
+            chunk_size (int): Approximate bytes decoded at once.
+        """
+        self.path = path
+        self._chunk_size = chunk_size
+        self._file = None
+        self._map = None
+        self._signature = None
+        # sparse index, the start offset and timestamp of every chunk
+        self._offsets = []
+        self._timestamps = []
+        self.size = 0
+
+    def refresh(self):
+        """Map the file again if it was written to or rotated.
+
+        Returns:
+            bool: Whether the file changed.
+        """
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            stat = None
+        signature = (stat.st_ino, stat.st_size) if stat else None
+        if signature == self._signature:
+            return False
+        self.close()
+        self._signature = signature
+        if stat is not None and stat.st_size > 0:
+            self._file = open(self.path, "rb")
+            self._map = mmap.mmap(
+                self._file.fileno(), 0, access=mmap.ACCESS_READ
+            )
+            self.size = len(self._map)
+        self._buildIndex()
+        return True
+
+    def close(self):
+        """Unmap and close the file."""
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+        self._map = None
+        self._file = None
+        # the next refresh maps the file again, even if it didn't change
+        self._signature = None
+        self.size = 0
+        self._offsets = []
+        self._timestamps = []
+
+    def _buildIndex(self):
+        if self._map is None:
+            return
+        offset = 0
+        while offset < self.size:
+            match = _RECORD_START.search(self._map, offset)
+            if match is None:
+                break
+            self._offsets.append(match.start())
+            self._timestamps.append(
+                "{} {}".format(
+                    match.group(1).decode(), match.group(2).decode()
+                )
+            )
+            offset = match.start() + self._chunk_size
+        if not self._offsets or self._offsets[0] != 0:
+            # lines before the first record, eg. from an older format
+            self._offsets.insert(0, 0)
+            self._timestamps.insert(0, "")
+
+    @property
+    def chunkCount(self):
+        """int: The number of chunks in the index."""
+        return len(self._offsets)
+
+    def timeRange(self, first_chunk=0):
+        """Return the first timestamp from a chunk on and the last chunk's.
+
+        Args:
+            first_chunk (int): The chunk to start from.
+
+        Returns:
+            tuple(str, str): The timestamps, empty if unknown.
+        """
+        if not self._timestamps:
+            return "", ""
+        return self._timestamps[first_chunk], self._timestamps[-1]
+
+    def chunkForTime(self, timestamp):
+        """Return the chunk containing a point in time.
+
+        Args:
+            timestamp (str): A "YYYY-MM-DD HH:MM:SS" timestamp.
+
+        Returns:
+            int: The chunk index.
+        """
+        return max(0, bisect.bisect_right(self._timestamps, timestamp) - 1)
+
+    def records(self, chunk):
+        """Decode the records of a chunk.
+
+        Args:
+            chunk (int): The chunk index.
+
+        Returns:
+            list[LogRecord]: The records in file order.
+        """
+        start = self._offsets[chunk]
+        if chunk + 1 < len(self._offsets):
+            end = self._offsets[chunk + 1]
+        else:
+            end = self.size
+        data = self._map[start:end]
+        records = []
+        matches = list(_RECORD_START.finditer(data))
+        if not matches or matches[0].start() > 0:
+            head_end = matches[0].start() if matches else len(data)
+            text = data[:head_end].decode("utf-8", "replace").rstrip("\n")
+            if text:
+                records.append(LogRecord("", "", "", None, text))
+        for index, match in enumerate(matches):
+            record_end = (
+                matches[index + 1].start()
+                if index + 1 < len(matches) else len(data)
+            )
+            text = data[match.start():record_end].decode("utf-8", "replace")
+            message = data[match.end():record_end].decode("utf-8", "replace")
+            event = _EVENT.match(message)
+            records.append(
+                LogRecord(
+                    "{} {}".format(
+                        match.group(1).decode(), match.group(2).decode()
+                    ),
+                    match.group(3).decode(),
+                    match.group(4).decode(),
+                    event.group(1).lower() if event else None,
+                    text.rstrip("\n"),
+                )
+            )
+        return records
+
+
+def recordFilter(minimum_level=None, event=None):
+    """Build a predicate selecting records.
+
+    Args:
+        minimum_level (str, optional): The lowest level shown.
+        event (str, optional): The event type shown, "" for any event.
+
+    Returns:
+        callable: Returns whether a LogRecord is shown.
+    """
+    minimum = _LEVELS.index(minimum_level) if minimum_level else 0
+
+    def accept(record):
+        if minimum and (
+            record.level not in _LEVELS
+            or _LEVELS.index(record.level) < minimum
+        ):
+            return False
+        if event is not None:
+            if record.event is None or (event and record.event != event):
+                return False
+        return True
+
+    return accept
+
+
+class LogViewer(QWidget):
+    # records shown at first and added per page when scrolling up
+    _PAGE_RECORDS = 500
+
+    def __init__(self, path, open_externally=None):
+        """A window showing the tail of the log.
+
+        Args:
+            path (str): The log file.
+            open_externally (callable, optional): Opens the log in an
+                external application.
+        """
+        super().__init__()
+        self.setWindowTitle("Eyecare Reminder log")
+        self.resize(900, 600)
+        self._log = LogFile(path)
+        self._next_chunk = 0
+        self._accept = recordFilter()
+        self._events = set()
+
+        self._text = QPlainTextEdit()
+        self._text.setReadOnly(True)
+        self._text.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self._text.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        self._text.verticalScrollBar().valueChanged.connect(self._scrolled)
+
+        self._level = QComboBox()
+        self._level.addItems(["All levels"] + _LEVELS)
+        self._level.currentIndexChanged.connect(self._filterChanged)
+        self._event = QComboBox()
+        self._event.addItem("All records", None)
+        self._event.addItem("Any event", "")
+        self._event.currentIndexChanged.connect(self._filterChanged)
+        self._range = QLabel()
+        reload_button = QPushButton("Reload")
+        reload_button.clicked.connect(self.reload)
+
+        controls = QHBoxLayout()
+        controls.addWidget(self._level)
+        controls.addWidget(self._event)
+        controls.addWidget(self._range, 1)
+        controls.addWidget(reload_button)
+        if open_externally is not None:
+            external_button = QPushButton("Open in editor")
+            external_button.clicked.connect(open_externally)
+            controls.addWidget(external_button)
+        layout = QVBoxLayout(self)
+        layout.addLayout(controls)
+        layout.addWidget(self._text)
+
+        self.reload()
+
+    def reload(self):
+        """Map the log again and show its tail."""
+        self._log.refresh()
+        self._showTail()
+
+    def _filterChanged(self):
+        level = self._level.currentIndex()
+        self._accept = recordFilter(
+            minimum_level=_LEVELS[level - 1] if level else None,
+            event=self._event.currentData(),
+        )
+        self._showTail()
+
+    def _showTail(self):
+        self._text.clear()
+        self._next_chunk = self._log.chunkCount - 1
+        self._loadOlder()
+        self._text.moveCursor(QTextCursor.End)
+
+    def _loadOlder(self):
+        """Prepend older records until a page is filled or the log ends."""
+        lines = []
+        while self._next_chunk >= 0 and len(lines) < self._PAGE_RECORDS:
+            records = self._log.records(self._next_chunk)
+            self._next_chunk -= 1
+            self._addEvents(records)
+            lines = [r.text for r in records if self._accept(r)] + lines
+        if not lines:
+            self._updateRange()
+            return
+        scroll_bar = self._text.verticalScrollBar()
+        distance_from_bottom = scroll_bar.maximum() - scroll_bar.value()
+        cursor = QTextCursor(self._text.document())
+        cursor.movePosition(QTextCursor.Start)
+        text = "\n".join(lines)
+        if not self._text.document().isEmpty():
+            text += "\n"
+        cursor.insertText(text)
+        # keep the records that were visible in place
+        scroll_bar.setValue(scroll_bar.maximum() - distance_from_bottom)
+        self._updateRange()
+
+    def _addEvents(self, records):
+        for record in records:
+            if record.event and record.event not in self._events:
+                self._events.add(record.event)
+                self._event.addItem(record.event, record.event)
+
+    def _updateRange(self):
+        first, last = self._log.timeRange(max(0, self._next_chunk + 1))
+        loaded = self._log.chunkCount - self._next_chunk - 1
+        self._range.setText(
+            "{} to {}, {:.0%} of {:.1f} MB loaded".format(
+                first or "start",
+                last or "end",
+                loaded / max(1, self._log.chunkCount),
+                self._log.size / 1024 / 1024,
+            )
+        )
+
+    def _scrolled(self, value):
+        if value == self._text.verticalScrollBar().minimum() and (
+            self._next_chunk >= 0
+        ):
+            self._loadOlder()
+
+    def closeEvent(self, event):
+        self._log.close()
+        super().closeEvent(event)
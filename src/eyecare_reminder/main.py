@@ -1,11 +1,51 @@
+import argparse
 import sys
 
-from PyQt5.QtWidgets import QApplication
+from . import logs
 
-from . import eyecare_reminder, view
+
+def _parseArguments():
+    parser = argparse.ArgumentParser(
+        prog="eyecare_reminder",
+        description="Reminds you to look away from the screen.",
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="run without the tray icon and without loading Qt",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help=(
+            "serve the process and sound card probes to every session on "
+            "the host, run once per host as root"
+        ),
+    )
+    parser.add_argument(
+        "--sink",
+        action="append",
+        metavar="SINK",
+        help=(
+            "where headless mode sends reminders: stdout, notification or "
+            "socket[:PATH], can be repeated, defaults to notification"
+        ),
+    )
+    return parser.parse_args()
 
 
 def main():
+    arguments = _parseArguments()
+    logs.setupLogging()
+    if arguments.daemon:
+        from . import config, daemon
+        sys.exit(daemon.runDaemon(config.probe_daemon_socket))
+    if arguments.headless:
+        from . import headless
+        sys.exit(headless.runHeadless(arguments.sink or ["notification"]))
+
+    from PyQt5.QtWidgets import QApplication
+    from . import eyecare_reminder, view
     _app = QApplication(sys.argv)
     _app.setQuitOnLastWindowClosed(False)
     _eyecare = eyecare_reminder.EyecareReminder()
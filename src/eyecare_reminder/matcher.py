@@ -0,0 +1,185 @@
+import collections
+import re
+
+from . import config
+
+Pattern = collections.namedtuple(
+    "Pattern", ["name", "match", "ignore_case", "mode"]
+)
+
+
+def parseRule(rule, ignore_case=False):
+    """Parse a blacklist entry into a pattern.
+
+    Entries are either a plain name, matched as a substring, or a mapping
+    like {"name": "zoom*", "match": "glob", "ignore_case": true}. Window
+    entries may also set a "mode", see eyecare_reminder.config.window_modes.
+
+    Args:
+        rule (str or dict): The config entry.
+        ignore_case (bool): Whether plain entries are case-insensitive.
+
+    Returns:
+        Pattern: The parsed pattern.
+
+    Raises:
+        ValueError: If the entry is malformed.
+    """
+    if isinstance(rule, str):
+        return Pattern(
+            rule, config.match_substring, ignore_case, config.window_mode_any
+        )
+    if not isinstance(rule, dict):
+        raise ValueError("Invalid blacklist entry {}".format(rule))
+    pattern = Pattern(
+        rule.get("name", ""),
+        rule.get("match", config.match_substring),
+        rule.get("ignore_case", ignore_case),
+        rule.get("mode", config.window_mode_any),
+    )
+    if (
+        not isinstance(pattern.name, str)
+        or pattern.match not in config.match_types
+        or not isinstance(pattern.ignore_case, bool)
+        or pattern.mode not in config.window_modes
+    ):
+        raise ValueError("Invalid blacklist entry {}".format(rule))
+    if not pattern.name and pattern.mode != config.window_mode_fullscreen:
+        raise ValueError("Blacklist entry {} matches everything".format(rule))
+    return pattern
+
+
+def describePattern(pattern):
+    """Return a short human readable form of a pattern for the log.
+
+    Args:
+        pattern (Pattern): The pattern.
+
+    Returns:
+        str: The description, eg. "glob:zoom*".
+    """
+    description = pattern.name or "*"
+    if pattern.match != config.match_substring:
+        description = "{}:{}".format(pattern.match, description)
+    if pattern.ignore_case:
+        description += " (ignore case)"
+    return description
+
+
+def _globToRegex(glob):
+    # wildcards never cross the newlines separating the searched names
+    parts = []
+    for char in glob:
+        if char == "*":
+            parts.append("[^\n]*")
+        elif char == "?":
+            parts.append("[^\n]")
+        else:
+            parts.append(re.escape(char))
+    return "^{}$".format("".join(parts))
+
+
+def _patternToRegex(pattern):
+    if pattern.match == config.match_glob:
+        return _globToRegex(pattern.name)
+    elif pattern.match == config.match_regex:
+        return pattern.name
+    return re.escape(pattern.name)
+
+
+def _flagsOf(pattern):
+    flags = re.MULTILINE
+    if pattern.ignore_case:
+        flags |= re.IGNORECASE
+    return flags
+
+
+class PatternMatcher(object):
+
+    def __init__(self, patterns):
+        """Compile patterns into a single regular expression.
+
+        Matching is one pass over the searched text however many patterns
+        there are, and reports which pattern matched. Regex patterns with
+        groups, which backreferences and named groups need, or with global
+        inline flags such as (?i) change meaning inside a larger expression
+        and are compiled on their own instead.
+
+        Args:
+            patterns (list[Pattern]): The patterns to compile.
+
+        Raises:
+            ValueError: If a regex pattern does not compile.
+        """
+        self.patterns = list(patterns)
+        self._regex = None
+        # (pattern, compiled regex) searched one by one
+        self._isolated = []
+        groups = []
+        for i, pattern in enumerate(self.patterns):
+            regex = _patternToRegex(pattern)
+            flags = _flagsOf(pattern)
+            try:
+                compiled = re.compile(regex, flags)
+            except re.error as e:
+                raise ValueError(
+                    "Invalid pattern {}: {}".format(pattern.name, e)
+                )
+            # inline global flags show up in the compiled flags
+            if compiled.groups or (
+                compiled.flags != re.compile("", flags).flags
+            ):
+                self._isolated.append((pattern, compiled))
+                continue
+            if pattern.ignore_case:
+                regex = "(?i:{})".format(regex)
+            groups.append("(?P<_p{}>{})".format(i, regex))
+        if groups:
+            try:
+                self._regex = re.compile("|".join(groups), re.MULTILINE)
+            except re.error as e:
+                raise ValueError("Invalid blacklist patterns: {}".format(e))
+
+    def __bool__(self):
+        return self._regex is not None or bool(self._isolated)
+
+    def search(self, text):
+        """Search text for a pattern that matches.
+
+        The combined patterns are searched first, then the ones compiled
+        on their own in order.
+
+        Args:
+            text (str): Newline separated names to search.
+
+        Returns:
+            Pattern or None: The pattern that matched.
+        """
+        if self._regex is not None:
+            match = self._regex.search(text)
+            if match is not None:
+                return self.patterns[int(match.lastgroup[2:])]
+        for pattern, compiled in self._isolated:
+            if compiled.search(text):
+                return pattern
+        return None
+
+
+def compileRules(rules, ignore_case=False):
+    """Parse and compile blacklist entries, grouped by window mode.
+
+    Args:
+        rules (list[str or dict]): The config entries.
+        ignore_case (bool): Whether plain entries are case-insensitive.
+
+    Returns:
+        dict[str, PatternMatcher]: The matcher for each window mode.
+
+    Raises:
+        ValueError: If an entry is malformed.
+    """
+    grouped = {mode: [] for mode in config.window_modes}
+    for rule in rules:
+        pattern = parseRule(rule, ignore_case=ignore_case)
+        grouped[pattern.mode].append(pattern)
+    return {mode: PatternMatcher(p) for mode, p in grouped.items()}
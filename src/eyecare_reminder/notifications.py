@@ -0,0 +1,304 @@
+"""Desktop notifications through the freedesktop Notifications D-Bus API.
+
+Unlike QSystemTrayIcon.showMessage, every notification has a key and
+showing a notification again under the same key replaces the live one in
+place, which allows eg. a countdown to update a single bubble.
+"""
+import logging
+import select
+import socket
+import threading
+import time
+
+from jeepney import DBusAddress, HeaderFields, MatchRule, MessageType
+from jeepney import new_method_call
+from jeepney.bus_messages import message_bus
+from jeepney.io.blocking import open_dbus_connection
+
+_LOGGER = logging.getLogger(__name__)
+
+_NOTIFICATIONS = DBusAddress(
+    "/org/freedesktop/Notifications",
+    bus_name="org.freedesktop.Notifications",
+    interface="org.freedesktop.Notifications",
+)
+_NOTIFY_SIGNATURE = "susssasa{sv}i"
+_CALL_TIMEOUT = 2
+_RECONNECT_DELAYS = (1, 5, 30, 60)
+
+# urgency hint values
+URGENCY_LOW = 0
+URGENCY_NORMAL = 1
+URGENCY_CRITICAL = 2
+
+# NotificationClosed reasons
+CLOSED_EXPIRED = 1
+CLOSED_DISMISSED = 2
+CLOSED_BY_CALL = 3
+CLOSED_UNDEFINED = 4
+
+
+class NotificationClient(object):
+
+    def __init__(self, app_name, bus="SESSION", on_action=None,
+                 on_closed=None):
+        """Keep one session bus connection open for notifications.
+
+        Requests are queued and sent from a background thread, which also
+        reads the replies and the NotificationClosed and ActionInvoked
+        signals, so callers never block on the notification server.
+
+        Args:
+            app_name (str): The application name shown by the server.
+            bus (str): "SESSION" or a D-Bus address, eg. of a stand-in bus.
+            on_action (callable, optional): Called from the client thread
+                with the notification key and the invoked action key.
+            on_closed (callable, optional): Called from the client thread
+                with the notification key and the reason it was closed.
+        """
+        self._app_name = app_name
+        self._bus = bus
+        self._on_action = on_action
+        self._on_closed = on_closed
+        self._connection = None
+        self._capabilities = frozenset()
+        self._connected = threading.Event()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._requests = []
+        # key -> notification id given by the server
+        self._ids = {}
+        # reply serial -> key of the Notify call waiting for its id
+        self._pending = {}
+        # key -> request held back until the pending Notify returns an id
+        self._deferred = {}
+        self._wake_read, self._wake_write = socket.socketpair()
+        self._wake_read.setblocking(False)
+        self._thread = threading.Thread(
+            target=self._run, name="notifications", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def isConnected(self):
+        """bool: Whether a notification server is reachable."""
+        return self._connected.is_set()
+
+    @property
+    def capabilities(self):
+        """frozenset[str]: The capabilities reported by the server."""
+        return self._capabilities
+
+    def waitConnected(self, timeout=None):
+        """Block until the client has connected to the notification server.
+
+        Args:
+            timeout (float, optional): Seconds to wait for.
+
+        Returns:
+            bool: Whether the client is connected.
+        """
+        return self._connected.wait(timeout)
+
+    def notify(self, key, summary, body="", icon="", timeout=-1,
+               actions=None, urgency=URGENCY_NORMAL):
+        """Show a notification, replacing the live one with the same key.
+
+        Args:
+            key (str): Identifies the notification within the application.
+            summary (str): The notification title.
+            body (str): The notification text.
+            icon (str): An icon name or file path.
+            timeout (int): Milliseconds until the notification expires,
+                -1 for the server default and 0 for never.
+            actions (list[tuple(str, str)], optional): Action keys and
+                labels, dropped if the server doesn't support actions.
+            urgency (int): One of the URGENCY_* values.
+        """
+        flat_actions = []
+        if "actions" in self._capabilities:
+            for action_key, label in actions or []:
+                flat_actions += [action_key, label]
+        hints = {
+            "urgency": ("y", urgency),
+            # sounds are played by the application itself
+            "suppress-sound": ("b", True),
+        }
+        self._queue(
+            key, "Notify", (icon, summary, body, flat_actions, hints, timeout)
+        )
+
+    def close(self, key):
+        """Close the live notification with the given key, if any.
+
+        Args:
+            key (str): Identifies the notification within the application.
+        """
+        self._queue(key, "CloseNotification", ())
+
+    def shutdown(self):
+        """Disconnect and stop the client thread."""
+        self._closed = True
+        self._wake()
+
+    def _queue(self, key, method, arguments):
+        with self._lock:
+            self._requests.append((key, method, arguments))
+        self._wake()
+
+    def _wake(self):
+        try:
+            self._wake_write.send(b"\0")
+        except OSError:
+            pass
+
+    def _run(self):
+        attempt = 0
+        while not self._closed:
+            try:
+                self._connect()
+                attempt = 0
+                self._loop()
+            except Exception as e:
+                if self._closed:
+                    break
+                _LOGGER.warning("NOTIFICATIONS DISCONNECTED: {}".format(e))
+            finally:
+                self._connected.clear()
+                self._ids.clear()
+                self._pending.clear()
+                self._deferred.clear()
+                with self._lock:
+                    # don't replay stale notifications after reconnecting
+                    self._requests = []
+                if self._connection is not None:
+                    self._connection.close()
+                    self._connection = None
+            delay = _RECONNECT_DELAYS[min(attempt, len(_RECONNECT_DELAYS) - 1)]
+            attempt += 1
+            time.sleep(delay)
+
+    def _connect(self):
+        self._connection = open_dbus_connection(bus=self._bus)
+        for member in ("NotificationClosed", "ActionInvoked"):
+            rule = MatchRule(
+                type="signal",
+                interface=_NOTIFICATIONS.interface,
+                path=_NOTIFICATIONS.object_path,
+                member=member,
+            )
+            self._call(message_bus.AddMatch(rule))
+        # also starts the server through bus activation
+        reply = self._call(
+            new_method_call(_NOTIFICATIONS, "GetCapabilities")
+        )
+        self._capabilities = frozenset(reply.body[0])
+        self._connected.set()
+        _LOGGER.info(
+            "NOTIFICATIONS CONNECTED: {}".format(
+                ", ".join(sorted(self._capabilities))
+            )
+        )
+
+    def _call(self, message):
+        reply = self._connection.send_and_get_reply(
+            message, timeout=_CALL_TIMEOUT
+        )
+        if reply.header.message_type == MessageType.error:
+            raise ConnectionError(
+                "{}: {}".format(
+                    reply.header.fields.get(HeaderFields.error_name),
+                    reply.body[0] if reply.body else "",
+                )
+            )
+        return reply
+
+    def _loop(self):
+        sock = self._connection.sock
+        while not self._closed:
+            # drain what the connection already buffered before blocking
+            self._receiveAvailable()
+            self._sendQueued()
+            readable, _, _ = select.select([sock, self._wake_read], [], [])
+            if self._wake_read in readable:
+                try:
+                    while self._wake_read.recv(4096):
+                        pass
+                except BlockingIOError:
+                    pass
+
+    def _receiveAvailable(self):
+        while True:
+            try:
+                message = self._connection.receive(timeout=0)
+            except TimeoutError:
+                return
+            self._dispatch(message)
+
+    def _sendQueued(self):
+        with self._lock:
+            requests, self._requests = self._requests, []
+        for key, method, arguments in requests:
+            if key in self._pending.values():
+                # wait for the id, only the latest request matters
+                self._deferred[key] = (method, arguments)
+            else:
+                self._send(key, method, arguments)
+
+    def _send(self, key, method, arguments):
+        notification_id = self._ids.get(key, 0)
+        if method == "CloseNotification":
+            if notification_id:
+                message = new_method_call(
+                    _NOTIFICATIONS, method, "u", (notification_id,)
+                )
+                self._connection.send(message)
+            return
+        message = new_method_call(
+            _NOTIFICATIONS,
+            method,
+            _NOTIFY_SIGNATURE,
+            (self._app_name, notification_id) + arguments,
+        )
+        serial = next(self._connection.outgoing_serial)
+        self._pending[serial] = key
+        self._connection.send(message, serial=serial)
+
+    def _dispatch(self, message):
+        header = message.header
+        if header.message_type in (MessageType.method_return,
+                                   MessageType.error):
+            key = self._pending.pop(
+                header.fields.get(HeaderFields.reply_serial), None
+            )
+            if key is None:
+                return
+            if header.message_type == MessageType.error:
+                _LOGGER.error(
+                    "NOTIFICATION FAILED: {}".format(
+                        header.fields.get(HeaderFields.error_name)
+                    )
+                )
+            else:
+                self._ids[key] = message.body[0]
+            deferred = self._deferred.pop(key, None)
+            if deferred is not None:
+                self._send(key, *deferred)
+        elif header.message_type == MessageType.signal:
+            member = header.fields.get(HeaderFields.member)
+            notification_id = message.body[0]
+            key = self._keyOf(notification_id)
+            if key is None:
+                return
+            if member == "NotificationClosed":
+                del self._ids[key]
+                if self._on_closed is not None:
+                    self._on_closed(key, message.body[1])
+            elif member == "ActionInvoked" and self._on_action is not None:
+                self._on_action(key, message.body[1])
+
+    def _keyOf(self, notification_id):
+        for key, value in self._ids.items():
+            if value == notification_id:
+                return key
+        return None
@@ -0,0 +1,296 @@
+import errno
+import logging
+import os
+import socket
+import struct
+import threading
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+_PROC = "/proc"
+
+# linux/connector.h and linux/cn_proc.h
+_NETLINK_CONNECTOR = 11
+_CN_IDX_PROC = 1
+_CN_VAL_PROC = 1
+_NLMSG_DONE = 3
+_PROC_CN_MCAST_LISTEN = 1
+_PROC_EVENT_FORK = 0x00000001
+_PROC_EVENT_EXEC = 0x00000002
+_PROC_EVENT_COMM = 0x00000200
+_PROC_EVENT_EXIT = 0x80000000
+
+_NLMSGHDR = struct.Struct("=IHHII")
+_CN_MSG = struct.Struct("=IIIIHH")
+_PROC_EVENT_HEADER = struct.Struct("=IIQ")
+_PID_PAIR = struct.Struct("=ii")
+_FORK_EVENT = struct.Struct("=iiii")
+
+# the kernel truncates comm to 15 characters
+_COMM_LENGTH = 15
+
+
+def readProcessName(pid):
+    """Read the name of a process from /proc, the way psutil does.
+
+    Args:
+        pid (int): The process id.
+
+    Returns:
+        str or None: The process name, None if the process is gone.
+    """
+    try:
+        with open(os.path.join(_PROC, str(pid), "comm"), "rb") as _f:
+            name = _f.read().rstrip(b"\n").decode(errors="replace")
+    except OSError:
+        return None
+    if len(name) >= _COMM_LENGTH:
+        # recover the full name from the command line like psutil
+        try:
+            with open(os.path.join(_PROC, str(pid), "cmdline"), "rb") as _f:
+                cmdline = _f.read().split(b"\0")[0].decode(errors="replace")
+        except OSError:
+            return name
+        basename = os.path.basename(cmdline)
+        if basename.startswith(name):
+            return basename
+    return name
+
+
+def readProcessOwner(pid):
+    """Read the user id owning a process.
+
+    Args:
+        pid (int): The process id.
+
+    Returns:
+        int or None: The user id, None if the process is gone.
+    """
+    try:
+        return os.stat(os.path.join(_PROC, str(pid))).st_uid
+    except OSError:
+        return None
+
+
+class ProcessIndex(object):
+
+    def __init__(self, rescan_interval, on_change=None, by_user=False):
+        """In-memory index of the names of the running processes.
+
+        /proc is scanned once, after which the index follows exec and exit
+        events from the netlink proc connector. Listening to the connector
+        requires CAP_NET_ADMIN, without it the index is rescanned whenever
+        it is queried and older than rescan_interval.
+
+        Args:
+            rescan_interval (float): Seconds after which an index that is
+                not event driven is considered stale.
+            on_change (callable, optional): Called without arguments,
+                possibly from the listener thread, when processes start,
+                exit or an explicit rescan finds different ones.
+            by_user (bool): Also record the owner of every process, for
+                textForUser.
+        """
+        self._rescan_interval = rescan_interval
+        self._on_change = on_change
+        self._by_user = by_user
+        self._names = {}
+        self._owners = {}
+        self._text = None
+        # text of each user's process names
+        self._user_texts = {}
+        self._scanned_at = 0
+        self._lock = threading.Lock()
+        self._socket = self._openConnector()
+        self.rescan()
+        if self._socket is not None:
+            thread = threading.Thread(
+                target=self._listen, name="process-index", daemon=True
+            )
+            thread.start()
+            _LOGGER.info("PROCESS INDEX: PROC CONNECTOR")
+        else:
+            _LOGGER.info(
+                "PROCESS INDEX: RESCAN EVERY {}s".format(rescan_interval)
+            )
+
+    @property
+    def isEventDriven(self):
+        """bool: Whether the index follows proc connector events."""
+        return self._socket is not None
+
+    @property
+    def text(self):
+        """str: All process names, newline separated.
+
+        Joined once per change so each lookup is a single substring search.
+        """
+        with self._lock:
+            self._refresh()
+            if self._text is None:
+                self._text = "\n".join(set(self._names.values()))
+            return self._text
+
+    def textForUser(self, uid):
+        """Return the names of the processes a user owns.
+
+        Args:
+            uid (int): The user id, the index must be created by_user.
+
+        Returns:
+            str: The process names, newline separated.
+        """
+        with self._lock:
+            self._refresh()
+            text = self._user_texts.get(uid)
+            if text is None:
+                text = self._user_texts[uid] = "\n".join(set(
+                    name for pid, name in self._names.items()
+                    if self._owners.get(pid) == uid
+                ))
+            return text
+
+    def _refresh(self):
+        if (
+            self._socket is None
+            and time.monotonic() - self._scanned_at > self._rescan_interval
+        ):
+            # the caller is about to read the rescanned index, invalidating
+            # its cached probe results would discard the one being computed
+            self._scan(notify=False)
+
+    def rescan(self):
+        """Rebuild the index from a full /proc scan."""
+        with self._lock:
+            self._scan()
+
+    def _contents(self, names, owners):
+        return set((owners.get(pid), name) for pid, name in names.items())
+
+    def _scan(self, notify=True):
+        names = {}
+        owners = {}
+        for entry in os.listdir(_PROC):
+            if entry.isdigit():
+                name = readProcessName(entry)
+                if name is not None:
+                    names[int(entry)] = name
+                    if self._by_user:
+                        owners[int(entry)] = readProcessOwner(entry)
+        # pids come and go all the time, only names matter to the probes
+        changed = self._contents(names, owners) != self._contents(
+            self._names, self._owners
+        )
+        self._names = names
+        self._owners = owners
+        self._text = None
+        self._user_texts = {}
+        self._scanned_at = time.monotonic()
+        if notify and changed:
+            self._changed()
+
+    def _changed(self):
+        if self._on_change is not None:
+            self._on_change()
+
+    def _update(self, pid):
+        name = readProcessName(pid)
+        owner = readProcessOwner(pid) if self._by_user else None
+        with self._lock:
+            if name is None:
+                self._names.pop(pid, None)
+                self._owners.pop(pid, None)
+            else:
+                self._names[pid] = name
+                if self._by_user:
+                    self._owners[pid] = owner
+            self._text = None
+            self._user_texts = {}
+        self._changed()
+
+    def _remove(self, pid):
+        with self._lock:
+            if self._names.pop(pid, None) is None:
+                return
+            self._owners.pop(pid, None)
+            self._text = None
+            self._user_texts = {}
+        self._changed()
+
+    @staticmethod
+    def _openConnector():
+        try:
+            sock = socket.socket(
+                socket.AF_NETLINK, socket.SOCK_DGRAM, _NETLINK_CONNECTOR
+            )
+        except (OSError, AttributeError) as e:
+            _LOGGER.warning("PROC CONNECTOR UNAVAILABLE: {}".format(e))
+            return None
+        try:
+            sock.bind((0, _CN_IDX_PROC))
+            op = struct.pack("=I", _PROC_CN_MCAST_LISTEN)
+            cn_msg = _CN_MSG.pack(_CN_IDX_PROC, _CN_VAL_PROC, 0, 0, len(op), 0)
+            length = _NLMSGHDR.size + len(cn_msg) + len(op)
+            header = _NLMSGHDR.pack(length, _NLMSG_DONE, 0, 0, os.getpid())
+            sock.send(header + cn_msg + op)
+        except OSError as e:
+            _LOGGER.warning("PROC CONNECTOR UNAVAILABLE: {}".format(e))
+            sock.close()
+            return None
+        return sock
+
+    def _listen(self):
+        while True:
+            try:
+                data = self._socket.recv(4096)
+            except OSError as e:
+                if e.errno == errno.ENOBUFS:
+                    # events were dropped, the index can't be trusted
+                    _LOGGER.warning("PROC CONNECTOR OVERRUN, RESCANNING")
+                    self.rescan()
+                    continue
+                _LOGGER.error("PROC CONNECTOR FAILED: {}".format(e))
+                with self._lock:
+                    self._socket = None
+                return
+            self._handleMessage(data)
+
+    def _handleMessage(self, data):
+        offset = _NLMSGHDR.size + _CN_MSG.size
+        if len(data) < offset + _PROC_EVENT_HEADER.size:
+            return
+        what = _PROC_EVENT_HEADER.unpack_from(data, offset)[0]
+        offset += _PROC_EVENT_HEADER.size
+        if what == _PROC_EVENT_FORK:
+            child_pid, child_tgid = _FORK_EVENT.unpack_from(data, offset)[2:]
+            if child_pid == child_tgid:
+                self._update(child_tgid)
+        elif what in (_PROC_EVENT_EXEC, _PROC_EVENT_COMM):
+            pid, tgid = _PID_PAIR.unpack_from(data, offset)
+            if pid == tgid:
+                self._update(tgid)
+        elif what == _PROC_EVENT_EXIT:
+            pid, tgid = _PID_PAIR.unpack_from(data, offset)
+            if pid == tgid:
+                self._remove(tgid)
+
+
+def createProcessIndex(rescan_interval, on_change=None, by_user=False):
+    """Create a process index, returning None when /proc is unavailable.
+
+    Args:
+        rescan_interval (float): Seconds after which an index that is not
+            event driven is rescanned.
+        on_change (callable, optional): Called when the processes change.
+        by_user (bool): Also record the owner of every process.
+
+    Returns:
+        ProcessIndex or None: The process index.
+    """
+    if not os.path.isdir(_PROC):
+        _LOGGER.info("PROCESS INDEX UNAVAILABLE, USING PSUTIL")
+        return None
+    return ProcessIndex(
+        rescan_interval, on_change=on_change, by_user=by_user
+    )
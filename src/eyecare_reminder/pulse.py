@@ -0,0 +1,432 @@
+"""Microphone activity monitor speaking the PulseAudio native protocol.
+
+Works against PulseAudio and pipewire-pulse. The monitor subscribes to
+source output events and keeps an in-memory flag of whether any
+application is capturing audio, so reading it costs nothing.
+"""
+import logging
+import os
+import socket
+import struct
+import subprocess
+import threading
+import time
+
+from . import config
+
+_LOGGER = logging.getLogger(__name__)
+
+# protocol version requested, fixes the layout of source output info
+_PROTOCOL_VERSION = 19
+_PROTOCOL_VERSION_MASK = 0x0000FFFF
+_COMMAND_CHANNEL = 0xFFFFFFFF
+_DESCRIPTOR = struct.Struct(">IIIII")
+_COOKIE_LENGTH = 256
+
+# commands
+_COMMAND_ERROR = 0
+_COMMAND_REPLY = 2
+_COMMAND_AUTH = 8
+_COMMAND_SET_CLIENT_NAME = 9
+_COMMAND_GET_SOURCE_OUTPUT_INFO_LIST = 32
+_COMMAND_SUBSCRIBE = 35
+_COMMAND_SUBSCRIBE_EVENT = 66
+
+# subscriptions
+_SUBSCRIPTION_MASK_SOURCE_OUTPUT = 0x0008
+_SUBSCRIPTION_EVENT_FACILITY_MASK = 0x000F
+_SUBSCRIPTION_EVENT_SOURCE_OUTPUT = 0x0003
+
+# source outputs opened by volume meters only detect peaks
+_PEAKS_RESAMPLE_METHOD = "peaks"
+
+_RECONNECT_DELAYS = (1, 5, 30, 60)
+
+
+class PulseError(Exception):
+    """Raised on protocol errors or when the server is unavailable."""
+
+
+def defaultSocketPath():
+    """Return the path of the native protocol socket of the session.
+
+    Returns:
+        str: The socket path.
+    """
+    server = os.environ.get("PULSE_SERVER", "")
+    if server.startswith("unix:"):
+        return server[len("unix:"):]
+    runtime_dir = os.environ.get(
+        "XDG_RUNTIME_DIR", "/run/user/{}".format(os.getuid())
+    )
+    return os.path.join(runtime_dir, "pulse", "native")
+
+
+def readCookie(cookie_path=None):
+    """Read the authentication cookie.
+
+    Servers that don't require it, such as pipewire-pulse, accept an empty
+    cookie.
+
+    Args:
+        cookie_path (str, optional): The cookie file to read.
+
+    Returns:
+        bytes: The cookie.
+    """
+    candidates = [cookie_path] if cookie_path else [
+        os.environ.get("PULSE_COOKIE"),
+        os.path.expanduser("~/.config/pulse/cookie"),
+        os.path.expanduser("~/.pulse-cookie"),
+    ]
+    for path in candidates:
+        if not path:
+            continue
+        try:
+            with open(path, "rb") as _f:
+                cookie = _f.read(_COOKIE_LENGTH)
+        except OSError:
+            continue
+        if len(cookie) == _COOKIE_LENGTH:
+            return cookie
+    return bytes(_COOKIE_LENGTH)
+
+
+class TagStruct(object):
+
+    def __init__(self, data=b""):
+        """Encode or decode a native protocol tag struct.
+
+        Args:
+            data (bytes, optional): Data to decode.
+        """
+        self.data = bytearray(data)
+        self.offset = 0
+
+    def putU32(self, value):
+        """Append an unsigned 32 bit integer."""
+        self.data += b"L" + struct.pack(">I", value)
+        return self
+
+    def putString(self, value):
+        """Append a string, None is encoded as a null string."""
+        if value is None:
+            self.data += b"N"
+        else:
+            self.data += b"t" + value.encode() + b"\0"
+        return self
+
+    def putArbitrary(self, value):
+        """Append arbitrary bytes."""
+        self.data += b"x" + struct.pack(">I", len(value)) + value
+        return self
+
+    def putPropList(self, properties):
+        """Append a property list of string values."""
+        self.data += b"P"
+        for key, value in properties.items():
+            value = value.encode() + b"\0"
+            self.putString(key)
+            self.putU32(len(value))
+            self.putArbitrary(value)
+        self.data += b"N"
+        return self
+
+    def eof(self):
+        """Return whether every value has been decoded."""
+        return self.offset >= len(self.data)
+
+    def _take(self, length):
+        if self.offset + length > len(self.data):
+            raise PulseError("Truncated tag struct")
+        chunk = bytes(self.data[self.offset:self.offset + length])
+        self.offset += length
+        return chunk
+
+    def _takeStruct(self, fmt):
+        return struct.unpack(fmt, self._take(struct.calcsize(fmt)))
+
+    def _takeString(self):
+        end = self.data.find(b"\0", self.offset)
+        if end < 0:
+            raise PulseError("Unterminated string")
+        value = bytes(self.data[self.offset:end]).decode(errors="replace")
+        self.offset = end + 1
+        return value
+
+    def get(self):
+        """Decode the next value, whatever its type.
+
+        Returns:
+            object: The decoded value.
+        """
+        tag = self._take(1)
+        if tag == b"t":
+            return self._takeString()
+        elif tag == b"N":
+            return None
+        elif tag in (b"L", b"V"):
+            return self._takeStruct(">I")[0]
+        elif tag == b"B":
+            return self._takeStruct(">B")[0]
+        elif tag in (b"R", b"U"):
+            return self._takeStruct(">Q")[0]
+        elif tag == b"r":
+            return self._takeStruct(">q")[0]
+        elif tag == b"1":
+            return True
+        elif tag == b"0":
+            return False
+        elif tag == b"a":
+            return self._takeStruct(">BBI")
+        elif tag == b"T":
+            return self._takeStruct(">II")
+        elif tag == b"m":
+            return self._take(self._takeStruct(">B")[0])
+        elif tag == b"v":
+            count = self._takeStruct(">B")[0]
+            return self._takeStruct(">{}I".format(count))
+        elif tag == b"x":
+            return self._take(self._takeStruct(">I")[0])
+        elif tag == b"P":
+            properties = {}
+            while True:
+                key = self.get()
+                if key is None:
+                    return properties
+                self.get()  # length, repeated by the arbitrary value
+                properties[key] = self.get()
+        elif tag == b"f":
+            return self.get(), self.get()
+        raise PulseError("Unknown tag {}".format(tag))
+
+
+def _sourceOutputFieldCount(version):
+    count = 11
+    if version >= 13:
+        count += 1  # proplist
+    if version >= 19:
+        count += 1  # corked
+    return count
+
+
+class MicrophoneMonitor(object):
+
+    def __init__(self, socket_path=None, cookie_path=None, on_change=None):
+        """Track whether any application is capturing audio.
+
+        Runs on a background thread which blocks on the server socket, so
+        it only wakes up when the server reports a change.
+
+        Args:
+            socket_path (str, optional): The native protocol socket,
+                defaults to the session server.
+            cookie_path (str, optional): The authentication cookie file.
+            on_change (callable, optional): Called from the monitor thread
+                with the new capture state whenever it changes.
+        """
+        self._socket_path = socket_path or defaultSocketPath()
+        self._cookie_path = cookie_path
+        self._on_change = on_change
+        self._socket = None
+        self._tag = 0
+        self._pending = {}
+        self._version = _PROTOCOL_VERSION
+        self._active = False
+        self._connected = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="microphone-monitor", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def isConnected(self):
+        """bool: Whether the monitor is connected to the server."""
+        return self._connected.is_set()
+
+    @property
+    def isCaptureActive(self):
+        """bool: Whether any application is capturing audio."""
+        return self._active
+
+    def waitConnected(self, timeout=None):
+        """Block until the monitor has connected and read the initial state.
+
+        Args:
+            timeout (float, optional): Seconds to wait for.
+
+        Returns:
+            bool: Whether the monitor is connected.
+        """
+        return self._connected.wait(timeout)
+
+    def close(self):
+        """Disconnect and stop the monitor thread."""
+        self._closed = True
+        if self._socket is not None:
+            try:
+                self._socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def _run(self):
+        attempt = 0
+        while not self._closed:
+            try:
+                self._connect()
+                attempt = 0
+                self._readLoop()
+            except (OSError, PulseError) as e:
+                if self._closed:
+                    break
+                _LOGGER.warning("MICROPHONE MONITOR DISCONNECTED: {}".format(e))
+            finally:
+                self._connected.clear()
+                if self._socket is not None:
+                    self._socket.close()
+                    self._socket = None
+            delay = _RECONNECT_DELAYS[min(attempt, len(_RECONNECT_DELAYS) - 1)]
+            attempt += 1
+            time.sleep(delay)
+
+    def _send(self, command, tagstruct, callback=None):
+        self._tag += 1
+        tag = self._tag
+        payload = TagStruct().putU32(command).putU32(tag).data + tagstruct.data
+        descriptor = _DESCRIPTOR.pack(len(payload), _COMMAND_CHANNEL, 0, 0, 0)
+        self._socket.sendall(descriptor + payload)
+        if callback is not None:
+            self._pending[tag] = callback
+        return tag
+
+    def _receive(self):
+        descriptor = self._receiveExactly(_DESCRIPTOR.size)
+        length, channel = _DESCRIPTOR.unpack(descriptor)[:2]
+        payload = self._receiveExactly(length)
+        if channel != _COMMAND_CHANNEL:
+            return None
+        tagstruct = TagStruct(payload)
+        command = tagstruct.get()
+        tag = tagstruct.get()
+        return command, tag, tagstruct
+
+    def _receiveExactly(self, length):
+        data = bytearray()
+        while len(data) < length:
+            chunk = self._socket.recv(length - len(data))
+            if not chunk:
+                raise PulseError("Connection closed by server")
+            data += chunk
+        return bytes(data)
+
+    def _request(self, command, tagstruct):
+        # synchronous round trip used during the handshake
+        tag = self._send(command, tagstruct)
+        while True:
+            packet = self._receive()
+            if packet is None or packet[1] != tag:
+                continue
+            if packet[0] == _COMMAND_ERROR:
+                raise PulseError("Server error {}".format(packet[2].get()))
+            return packet[2]
+
+    def _connect(self):
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.connect(self._socket_path)
+        self._tag = 0
+        self._pending = {}
+        reply = self._request(
+            _COMMAND_AUTH,
+            TagStruct()
+            .putU32(_PROTOCOL_VERSION)
+            .putArbitrary(readCookie(self._cookie_path)),
+        )
+        server_version = reply.get() & _PROTOCOL_VERSION_MASK
+        self._version = min(_PROTOCOL_VERSION, server_version)
+        if self._version >= 13:
+            name = TagStruct().putPropList(
+                {"application.name": "eyecare_reminder"}
+            )
+        else:
+            name = TagStruct().putString("eyecare_reminder")
+        self._request(_COMMAND_SET_CLIENT_NAME, name)
+        self._request(
+            _COMMAND_SUBSCRIBE,
+            TagStruct().putU32(_SUBSCRIPTION_MASK_SOURCE_OUTPUT),
+        )
+        self._updateState(
+            self._request(_COMMAND_GET_SOURCE_OUTPUT_INFO_LIST, TagStruct())
+        )
+        self._connected.set()
+        _LOGGER.info(
+            "MICROPHONE MONITOR CONNECTED: {} (protocol {})".format(
+                self._socket_path, self._version
+            )
+        )
+
+    def _readLoop(self):
+        while not self._closed:
+            packet = self._receive()
+            if packet is None:
+                continue
+            command, tag, tagstruct = packet
+            if command == _COMMAND_SUBSCRIBE_EVENT:
+                event = tagstruct.get()
+                facility = event & _SUBSCRIPTION_EVENT_FACILITY_MASK
+                if facility == _SUBSCRIPTION_EVENT_SOURCE_OUTPUT:
+                    # the list is short, refetching also covers cork changes
+                    self._send(
+                        _COMMAND_GET_SOURCE_OUTPUT_INFO_LIST,
+                        TagStruct(),
+                        callback=self._updateState,
+                    )
+            elif command == _COMMAND_REPLY and tag in self._pending:
+                self._pending.pop(tag)(tagstruct)
+            elif command == _COMMAND_ERROR:
+                self._pending.pop(tag, None)
+                _LOGGER.error("MICROPHONE MONITOR REQUEST FAILED")
+
+    def _updateState(self, tagstruct):
+        field_count = _sourceOutputFieldCount(self._version)
+        active = False
+        while not tagstruct.eof():
+            fields = [tagstruct.get() for _ in range(field_count)]
+            resample_method = fields[9]
+            corked = fields[12] if self._version >= 19 else False
+            if not corked and resample_method != _PEAKS_RESAMPLE_METHOD:
+                active = True
+        if active != self._active:
+            self._active = active
+            _LOGGER.info(
+                "MICROPHONE {}".format("ACTIVE" if active else "INACTIVE")
+            )
+            if self._on_change is not None:
+                self._on_change(active)
+
+
+def checkMicrophoneActive():
+    """Check whether any audio source is running by asking pactl.
+
+    Fallback for when the native protocol socket can't be reached, works
+    with both PulseAudio and pipewire-pulse.
+
+    Returns:
+        bool: Whether any audio source is running.
+    """
+    try:
+        output = subprocess.check_output(
+            ["pactl", "list", "short", "sources"],
+            timeout=config.probe_timeout,
+        )
+    except (
+        OSError,
+        subprocess.CalledProcessError,
+        subprocess.TimeoutExpired,
+    ) as e:
+        _LOGGER.error("COULD NOT QUERY AUDIO SOURCES: {}".format(e))
+        return False
+    for line in output.decode(errors="replace").splitlines():
+        if "RUNNING" in line.split("\t"):
+            return True
+    return False
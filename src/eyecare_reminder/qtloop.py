@@ -0,0 +1,170 @@
+"""The event loop adapter running the core on the Qt event loop."""
+import logging
+
+from PyQt5.QtCore import (
+    QCoreApplication,
+    QObject,
+    QSocketNotifier,
+    Qt,
+    QTimer,
+    pyqtSignal,
+)
+
+from . import clock
+
+_LOGGER = logging.getLogger(__name__)
+
+# Qt.VeryCoarseTimer fires on whole seconds, up to half a second early
+_VERY_COARSE_ERROR = 0.5
+# Qt.CoarseTimer fires within 5% of the interval
+_COARSE_ERROR = 0.05
+# the timerfd only takes over when the QTimer is this late, ie. it missed
+# time spent suspended
+_SUSPEND_GRACE = 1.0
+
+
+class QtTimerBackend(QObject):
+
+    def __init__(self):
+        """The timer of a scheduler.Scheduler on the Qt event loop.
+
+        A single QTimer is armed at the scheduler's next wakeup, with the
+        coarsest timer type whose error the tolerance allows, so Qt can
+        align it with other timers of the process.
+
+        QTimers don't count time spent suspended. A timerfd on
+        CLOCK_BOOTTIME armed just after the same deadline expires on resume
+        when the deadline passed during a suspend, and doesn't cause a
+        wakeup otherwise.
+        """
+        super().__init__()
+        self._callback = None
+        self._deadline = None
+        self._timer = QTimer()
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._fired)
+        self._timer_fd = clock.createTimerFd()
+        self._notifier = None
+        if self._timer_fd is not None:
+            self._notifier = QSocketNotifier(
+                self._timer_fd.fileno(), QSocketNotifier.Read
+            )
+            self._notifier.activated.connect(self._timerFdActivated)
+
+    def setCallback(self, callback):
+        """Set the function called when the timer fires.
+
+        Args:
+            callback (callable): Called without arguments.
+        """
+        self._callback = callback
+
+    def arm(self, deadline, tolerance):
+        """Arm the timer, replacing the earlier deadline.
+
+        Args:
+            deadline (float): A clock.now time, past deadlines fire on the
+                next event loop iteration.
+            tolerance (float): Seconds the timer may be off by.
+        """
+        self._deadline = deadline
+        remaining = max(0.0, deadline - clock.now())
+        if tolerance >= _VERY_COARSE_ERROR:
+            timer_type = Qt.VeryCoarseTimer
+        elif tolerance >= remaining * _COARSE_ERROR:
+            timer_type = Qt.CoarseTimer
+        else:
+            timer_type = Qt.PreciseTimer
+        self._timer.setTimerType(timer_type)
+        self._timer.start(int(remaining * 1000 + 0.999))
+        if self._timer_fd is not None:
+            self._timer_fd.setDeadline(deadline + _SUSPEND_GRACE)
+
+    def disarm(self):
+        """Stop the timer."""
+        self._deadline = None
+        self._timer.stop()
+        if self._timer_fd is not None:
+            self._timer_fd.setDeadline(None)
+            self._timer_fd.acknowledge()
+
+    def _timerFdActivated(self):
+        self._timer_fd.acknowledge()
+        if self._deadline is not None:
+            _LOGGER.info("TIMER DEADLINE PASSED WHILE SUSPENDED")
+            self._fired()
+
+    def _fired(self):
+        self._deadline = None
+        self._timer.stop()
+        if self._timer_fd is not None:
+            self._timer_fd.setDeadline(None)
+        if self._callback is not None:
+            self._callback()
+
+
+class QtEventLoop(QObject):
+    # emitted from any thread, delivered on the thread running the loop
+    _called = pyqtSignal(object, tuple)
+
+    def __init__(self):
+        """Run the callbacks of a core.ReminderCore on the Qt event loop."""
+        super().__init__()
+        self._notifiers = {}
+        self._called.connect(self._call)
+
+    def createTimerBackend(self):
+        """Create the timer of the scheduler.
+
+        Returns:
+            QtTimerBackend: The timer backend.
+        """
+        return QtTimerBackend()
+
+    @staticmethod
+    def callSoon(callback):
+        """Call a function on the next event loop iteration.
+
+        Args:
+            callback (callable): Called without arguments.
+        """
+        QTimer.singleShot(0, callback)
+
+    def callSoonThreadsafe(self, callback, *args):
+        """Call a function on the event loop, from any thread.
+
+        Args:
+            callback (callable): The function.
+            *args: Its arguments.
+        """
+        self._called.emit(callback, args)
+
+    @staticmethod
+    def _call(callback, args):
+        callback(*args)
+
+    def addReader(self, fd, callback):
+        """Call a function whenever a file descriptor is readable.
+
+        Args:
+            fd (int): The file descriptor.
+            callback (callable): Called without arguments.
+        """
+        notifier = QSocketNotifier(fd, QSocketNotifier.Read)
+        notifier.activated.connect(lambda _fd: callback())
+        self._notifiers[fd] = notifier
+
+    def removeReader(self, fd):
+        """Stop watching a file descriptor.
+
+        Args:
+            fd (int): The file descriptor.
+        """
+        notifier = self._notifiers.pop(fd, None)
+        if notifier is not None:
+            notifier.setEnabled(False)
+
+    @staticmethod
+    def stop():
+        """Quit the application."""
+        QCoreApplication.instance().quit()
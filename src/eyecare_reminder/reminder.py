@@ -0,0 +1,121 @@
+"""The phases of the reminder cycle.
+
+The cycle alternates between waiting for the next reminder and the
+cooldown, the break the user is reminded to take. Every phase stores the
+absolute clock.now time it started at and its deadline, so the remaining
+time is exact however late a timer fires, and a changed interval can be
+applied to a running phase without losing its progress.
+"""
+from . import clock
+
+PHASE_STOPPED = "stopped"
+PHASE_REMINDER = "reminder"
+PHASE_COOLDOWN = "cooldown"
+
+
+class ReminderState(object):
+
+    def __init__(self, now=clock.now, suspended=clock.suspendedTime):
+        """The current phase of the reminder cycle.
+
+        Args:
+            now (callable): Returns the current time in seconds.
+            suspended (callable): Returns the total suspended time in
+                seconds.
+        """
+        self._now = now
+        self._suspended = suspended
+        self.phase = PHASE_STOPPED
+        self.started = None
+        self.deadline = None
+        self._suspended_at_start = 0.0
+        # incremented on every change, to recognize results that were
+        # started for an earlier phase
+        self.generation = 0
+
+    def begin(self, phase, duration, catch_up=0.0):
+        """Start a phase.
+
+        A phase following one that ended at most catch_up seconds ago
+        starts at the deadline of that phase, a fresh start at the current
+        time.
+
+        Args:
+            phase (str): PHASE_REMINDER or PHASE_COOLDOWN.
+            duration (float): The phase duration in seconds.
+            catch_up (float): Seconds the previous phase may have ended
+                late by.
+        """
+        now = self._now()
+        if (
+            self.deadline is not None
+            and 0.0 <= now - self.deadline <= catch_up
+        ):
+            self.started = self.deadline
+        else:
+            self.started = now
+        self.phase = phase
+        self.deadline = self.started + duration
+        self._suspended_at_start = self._suspended()
+        self.generation += 1
+
+    def stop(self):
+        """Stop the cycle, eg. while the user is taking a break anyway."""
+        self.phase = PHASE_STOPPED
+        self.started = None
+        self.deadline = None
+        self.generation += 1
+
+    def retime(self, duration):
+        """Change the duration of the running phase, keeping its progress.
+
+        Args:
+            duration (float): The new phase duration in seconds.
+
+        Returns:
+            bool: Whether a phase is running.
+        """
+        if self.phase == PHASE_STOPPED:
+            return False
+        self.deadline = self.started + duration
+        self.generation += 1
+        return True
+
+    @property
+    def isRunning(self):
+        """bool: Whether a phase is running."""
+        return self.phase != PHASE_STOPPED
+
+    def remaining(self):
+        """Return the time until the deadline of the running phase.
+
+        Returns:
+            float: The remaining seconds, negative once the deadline passed,
+                None if stopped.
+        """
+        if self.deadline is None:
+            return None
+        return self.deadline - self._now()
+
+    def suspendedDuringPhase(self):
+        """Return how long the system was suspended since the phase began.
+
+        Returns:
+            float: The suspended time in seconds.
+        """
+        return max(0.0, self._suspended() - self._suspended_at_start)
+
+    def nextReminder(self, reminder_interval):
+        """Return when the next reminder will be shown, if not suppressed.
+
+        Args:
+            reminder_interval (float): The reminder interval in seconds.
+
+        Returns:
+            float: The clock.now time of the next reminder, None if stopped.
+        """
+        if self.phase == PHASE_REMINDER:
+            return self.deadline
+        if self.phase == PHASE_COOLDOWN:
+            return self.deadline + reminder_interval
+        return None
@@ -0,0 +1,297 @@
+"""Suppression rules declared in config.yaml and their evaluation plan.
+
+A rule is a condition, conditions are either a single probe, eg.
+{"window": "Zoom Meeting"}, or compositions of conditions with "all", "any"
+and "not". A reminder is suppressed when any rule is true.
+
+The engine measures how long each probe takes and how often it is true,
+then orders conditions so that the cheapest, most likely to decide the
+outcome are evaluated first.
+"""
+import datetime
+import logging
+import threading
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+# weight of the latest sample in the moving average of probe cost
+_COST_SMOOTHING = 0.2
+# seconds, assumed cost of probes that haven't been measured yet
+_DEFAULT_COST = 0.001
+
+TIME_OF_DAY = "time_of_day"
+_COMPOSITES = ("all", "any", "not")
+
+
+class RuleError(ValueError):
+    """Raised when a rule in the config is malformed."""
+
+
+def _anyOrderKey(condition):
+    return condition.expectedCost() / max(condition.probability(), 1e-6)
+
+
+def _allOrderKey(condition):
+    return condition.expectedCost() / max(1 - condition.probability(), 1e-6)
+
+
+class ProbeStats(object):
+
+    def __init__(self):
+        """Measured cost and hit rate of a probe."""
+        self.calls = 0
+        self.hits = 0
+        self.cost = _DEFAULT_COST
+
+    @property
+    def probability(self):
+        """float: Estimated probability of the probe being true."""
+        # laplace smoothing keeps unmeasured probes away from 0 and 1
+        return (self.hits + 1) / (self.calls + 2)
+
+    def record(self, cost, hit):
+        """Record one evaluation.
+
+        Args:
+            cost (float): Seconds the evaluation took.
+            hit (bool): Whether the probe was true.
+        """
+        if self.calls == 0:
+            self.cost = cost
+        else:
+            self.cost += _COST_SMOOTHING * (cost - self.cost)
+        self.calls += 1
+        self.hits += int(hit)
+
+
+class Leaf(object):
+
+    def __init__(self, kind, spec, value, check, stats, lock, timer):
+        """A single probe condition.
+
+        Args:
+            kind (str): The probe kind, eg. "window".
+            spec (object): The probe argument as written in the config.
+            value (object): The compiled probe argument.
+            check (callable): Called with value, returns whether true.
+            stats (ProbeStats): The statistics shared by equal probes.
+            lock (threading.Lock): Guards the statistics.
+            timer (callable): Returns the time in seconds, measures the
+                cost of the evaluation.
+        """
+        self.kind = kind
+        self.spec = spec
+        self.value = value
+        self._check = check
+        self.stats = stats
+        self._lock = lock
+        self._timer = timer
+
+    def expectedCost(self):
+        """Return the expected seconds evaluating the condition takes."""
+        return self.stats.cost
+
+    def probability(self):
+        """Return the estimated probability of the condition being true."""
+        return self.stats.probability
+
+    def evaluate(self):
+        """Evaluate the probe, recording its cost and outcome.
+
+        Returns:
+            bool: Whether the condition is true.
+        """
+        started = self._timer()
+        hit = bool(self._check(self.value))
+        with self._lock:
+            self.stats.record(self._timer() - started, hit)
+        return hit
+
+    def label(self):
+        """Return a short name of the condition."""
+        return "{}={}".format(self.kind, self.spec)
+
+    def describe(self):
+        """Return the condition with its statistics for the log."""
+        return "{}[{:.2f}ms p={:.2f}]".format(
+            self.label(), self.stats.cost * 1000, self.stats.probability
+        )
+
+
+class Composite(object):
+
+    def __init__(self, operator, children):
+        """A composition of conditions.
+
+        Args:
+            operator (str): "all", "any" or "not".
+            children (list): The child conditions, one for "not".
+        """
+        self.operator = operator
+        self.children = children
+
+    def _ordered(self):
+        # for "any" stop at the first true child, so prefer cheap and likely
+        # true, for "all" stop at the first false child
+        if self.operator == "any":
+            return sorted(self.children, key=_anyOrderKey)
+        elif self.operator == "all":
+            return sorted(self.children, key=_allOrderKey)
+        return self.children
+
+    def probability(self):
+        """Return the estimated probability of the condition being true,
+        assuming independent children."""
+        if self.operator == "not":
+            return 1 - self.children[0].probability()
+        result = 1.0
+        for child in self.children:
+            if self.operator == "any":
+                result *= 1 - child.probability()
+            else:
+                result *= child.probability()
+        return 1 - result if self.operator == "any" else result
+
+    def expectedCost(self):
+        """Return the expected seconds evaluating the condition takes."""
+        cost = 0.0
+        reach = 1.0
+        for child in self._ordered():
+            cost += reach * child.expectedCost()
+            if self.operator == "any":
+                reach *= 1 - child.probability()
+            else:
+                reach *= child.probability()
+        return cost
+
+    def evaluate(self):
+        """Evaluate the children in plan order, short-circuiting.
+
+        Returns:
+            bool: Whether the condition is true.
+        """
+        if self.operator == "not":
+            return not self.children[0].evaluate()
+        for child in self._ordered():
+            value = child.evaluate()
+            if self.operator == "any" and value:
+                return True
+            if self.operator == "all" and not value:
+                return False
+        return self.operator == "all"
+
+    def label(self):
+        """Return a short name of the condition."""
+        return "{}({})".format(
+            self.operator, ", ".join(c.label() for c in self.children)
+        )
+
+    def describe(self):
+        """Return the condition in plan order for the log."""
+        return "{}({})".format(
+            self.operator, ", ".join(c.describe() for c in self._ordered())
+        )
+
+
+def _parseClock(value):
+    try:
+        return datetime.datetime.strptime(value, "%H:%M").time()
+    except (TypeError, ValueError):
+        raise RuleError("Invalid time {}, expected HH:MM".format(value))
+
+
+def _compileTimeOfDay(value):
+    if not isinstance(value, dict) or set(value) != {"from", "to"}:
+        raise RuleError(
+            "time_of_day expects {{from: HH:MM, to: HH:MM}}, got {}".format(
+                value
+            )
+        )
+    return _parseClock(value["from"]), _parseClock(value["to"])
+
+
+def _checkTimeOfDay(value):
+    start, end = value
+    now = datetime.datetime.now().time()
+    if start <= end:
+        return start <= now < end
+    # the range wraps around midnight
+    return now >= start or now < end
+
+
+class RuleEngine(object):
+
+    def __init__(self, rules, probes, stats=None, timer=time.monotonic):
+        """Compile the suppression rules.
+
+        Args:
+            rules (list[dict] or tuple[dict]): The rules from the config.
+            probes (dict[str, tuple(callable, callable)]): For every probe
+                kind, a function compiling the rule value and a function
+                checking the compiled value.
+            stats (dict[str, ProbeStats], optional): Statistics measured by
+                a previous engine, kept across config reloads.
+            timer (callable): Returns the time in seconds, measures the
+                cost of the probes.
+
+        Raises:
+            RuleError: If a rule is malformed.
+        """
+        self._probes = dict(probes)
+        self._probes[TIME_OF_DAY] = (_compileTimeOfDay, _checkTimeOfDay)
+        self._stats = dict(stats or {})
+        self._lock = threading.Lock()
+        self._timer = timer
+        self.rules = [self._parse(rule) for rule in rules]
+
+    def _parse(self, spec):
+        if not isinstance(spec, dict) or len(spec) != 1:
+            raise RuleError(
+                "A condition must have exactly one key, got {}".format(spec)
+            )
+        kind, value = next(iter(spec.items()))
+        if kind in _COMPOSITES:
+            if kind == "not":
+                return Composite(kind, [self._parse(value)])
+            if not isinstance(value, (list, tuple)) or not value:
+                raise RuleError("{} expects a list of conditions".format(kind))
+            return Composite(kind, [self._parse(v) for v in value])
+        if kind not in self._probes:
+            raise RuleError("Unknown condition {}".format(kind))
+        compile_value, check = self._probes[kind]
+        try:
+            compiled = compile_value(value)
+        except ValueError as e:
+            raise RuleError(str(e))
+        # identical probes in several rules share their statistics
+        stats = self._stats.setdefault(
+            "{}={!r}".format(kind, value), ProbeStats()
+        )
+        return Leaf(
+            kind, value, compiled, check, stats, self._lock, self._timer
+        )
+
+    def orderedRules(self):
+        """Return the rules in the order they should be evaluated.
+
+        Returns:
+            list: The rule conditions, cheapest and likeliest first.
+        """
+        return sorted(self.rules, key=_anyOrderKey)
+
+    def plan(self):
+        """Describe the current evaluation plan for debugging.
+
+        Returns:
+            str: The ordered rules with their measured cost and hit rate.
+        """
+        return " -> ".join(r.describe() for r in self.orderedRules())
+
+    def stats(self):
+        """Return the measured statistics of each probe.
+
+        Returns:
+            dict[str, ProbeStats]: The statistics keyed by probe.
+        """
+        return dict(self._stats)
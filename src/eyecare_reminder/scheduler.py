@@ -0,0 +1,226 @@
+"""A central scheduler for the app's timers, minimizing CPU wakeups.
+
+Every task has a due time and a slack, the time it may run late by. The
+tasks due before the earliest time a task must run by, its due time plus
+slack, share one wakeup, armed at the latest of their due times so the
+slack of a lone task isn't spent for nothing. Periodic tasks are aligned to multiples of their interval, so
+tasks with compatible intervals come due together.
+
+The scheduler doesn't depend on an event loop, backends arm the actual
+timer, see qtloop.QtTimerBackend.
+"""
+import collections
+import logging
+import math
+
+from . import clock, logs
+
+_LOGGER = logging.getLogger(__name__)
+
+_HOUR = 3600.0
+
+
+class Task(object):
+
+    def __init__(self, scheduler, name, callback, due, slack, interval):
+        """A scheduled callback, created by the Scheduler.
+
+        Args:
+            scheduler (Scheduler): The scheduler running the task.
+            name (str): The task name, used in the stats.
+            callback (callable): Called without arguments.
+            due (float): The clock time the task is due at.
+            slack (float): Seconds the task may run late by.
+            interval (float or None): The period of periodic tasks.
+        """
+        self._scheduler = scheduler
+        self.name = name
+        self.callback = callback
+        self.due = due
+        self.slack = slack
+        self.interval = interval
+        self.active = True
+
+    @property
+    def latest(self):
+        """float: The clock time the task has to run by."""
+        return self.due + self.slack
+
+    def cancel(self):
+        """Stop the task, cancelling an inactive task does nothing."""
+        self._scheduler.cancel(self)
+
+
+class Scheduler(object):
+
+    def __init__(self, backend, now=clock.now):
+        """Run tasks on as few timer wakeups as their slack allows.
+
+        Args:
+            backend (object): Arms a single timer, has arm(deadline,
+                tolerance) and disarm() methods and calls the callback
+                given to setCallback when the timer fires.
+            now (callable): Returns the current clock time in seconds.
+        """
+        self._backend = backend
+        self._now = now
+        self._tasks = []
+        self._running = False
+        self._armed_at = None
+        self._started_at = now()
+        self._wakeups = collections.deque()
+        self._runs = collections.Counter()
+        backend.setCallback(self._wake)
+
+    def callAt(self, deadline, callback, name, slack=0.0):
+        """Run a callback once at a point in time.
+
+        Args:
+            deadline (float): The clock time to run at.
+            callback (callable): Called without arguments.
+            name (str): The task name.
+            slack (float): Seconds the callback may run late by.
+
+        Returns:
+            Task: The scheduled task.
+        """
+        return self._add(Task(
+            self, name, callback, deadline, slack, None
+        ))
+
+    def callLater(self, delay, callback, name, slack=0.0):
+        """Run a callback once after a delay.
+
+        Args:
+            delay (float): Seconds to wait.
+            callback (callable): Called without arguments.
+            name (str): The task name.
+            slack (float): Seconds the callback may run late by.
+
+        Returns:
+            Task: The scheduled task.
+        """
+        return self.callAt(self._now() + delay, callback, name, slack=slack)
+
+    def callEvery(self, interval, callback, name, slack=0.0):
+        """Run a callback periodically, at multiples of the interval.
+
+        Runs that were missed, eg. during a suspend, are skipped.
+
+        Args:
+            interval (float): The period in seconds.
+            callback (callable): Called without arguments.
+            name (str): The task name.
+            slack (float): Seconds each run may be late by.
+
+        Returns:
+            Task: The scheduled task.
+        """
+        return self._add(Task(
+            self,
+            name,
+            callback,
+            self._nextMultiple(interval),
+            slack,
+            interval,
+        ))
+
+    def cancel(self, task):
+        """Stop a task.
+
+        Args:
+            task (Task): The task to stop.
+        """
+        if not task.active:
+            return
+        task.active = False
+        self._tasks.remove(task)
+        self._rearm()
+
+    def _add(self, task):
+        self._tasks.append(task)
+        self._rearm()
+        return task
+
+    def _nextMultiple(self, interval):
+        return (math.floor(self._now() / interval) + 1) * interval
+
+    def _rearm(self):
+        if self._running:
+            # rearmed once all due tasks ran
+            return
+        if not self._tasks:
+            if self._armed_at is not None:
+                self._backend.disarm()
+                self._armed_at = None
+            return
+        latest = min(task.latest for task in self._tasks)
+        # the latest due time of the tasks that can share a wakeup, a lone
+        # task runs when it's due
+        wake_at = max(
+            task.due for task in self._tasks if task.due <= latest
+        )
+        # how late the timer may fire without a task missing its latest
+        tolerance = latest - wake_at
+        if wake_at == self._armed_at:
+            return
+        self._armed_at = wake_at
+        self._backend.arm(wake_at, tolerance)
+
+    def _wake(self):
+        now = self._now()
+        self._wakeups.append(now)
+        while self._wakeups[0] < now - _HOUR:
+            self._wakeups.popleft()
+        due = sorted(
+            (task for task in self._tasks if task.due <= now),
+            key=lambda task: task.due,
+        )
+        self._running = True
+        try:
+            for task in due:
+                if not task.active:
+                    # cancelled by a task that ran before it
+                    continue
+                if task.interval is None:
+                    task.active = False
+                    self._tasks.remove(task)
+                else:
+                    task.due = self._nextMultiple(task.interval)
+                self._runs[task.name] += 1
+                try:
+                    task.callback()
+                except Exception:
+                    _LOGGER.exception(
+                        "SCHEDULED TASK FAILED: {}".format(task.name)
+                    )
+        finally:
+            self._running = False
+        self._armed_at = None
+        self._rearm()
+
+    def wakeupsPerHour(self):
+        """Return the rate of timer wakeups over the last hour.
+
+        Returns:
+            float: Wakeups per hour, extrapolated during the first hour.
+        """
+        elapsed = min(_HOUR, self._now() - self._started_at)
+        if elapsed <= 0:
+            return 0.0
+        return len(self._wakeups) * _HOUR / elapsed
+
+    def stats(self):
+        """Return the scheduler stats.
+
+        Returns:
+            dict: The wakeups per hour and the runs of each task.
+        """
+        return {
+            "wakeups_per_hour": round(self.wakeupsPerHour(), 1),
+            "runs": dict(self._runs),
+        }
+
+    def logStats(self):
+        """Log the scheduler stats as an event."""
+        logs.logEvent("scheduler_stats", **self.stats())
@@ -0,0 +1,1093 @@
+"""Replay days of activity against the reminder core in milliseconds.
+
+The core runs on a virtual clock. Its probes read scripted traces of idle
+periods, microphone sessions, open windows and running processes instead
+of the system, and every reminder, suppression and break is recorded on a
+timeline with the number of probe calls and timer wakeups of each day.
+
+    python -m eyecare_reminder.simulation --days 7 --seed 1
+    python -m eyecare_reminder.simulation scenario.yaml --timeline
+
+Without a scenario file, workdays with meetings, breaks and overnight
+suspends are generated. Scenario files are YAML, eg.
+
+    days: 1
+    config: {blacklist_window_names: [Zoom Meeting]}
+    idle: [["12:30", "13:15"]]
+    microphone: [["10:00", "10:45"]]
+    windows: [{name: Zoom Meeting, from: "10:00", to: "10:45"}]
+    processes: [{name: obs, from: "15:00", to: "15:30"}]
+    suspend: [["18:00", "32:45"]]
+    skips: ["09:21"]
+    skip_probability: 0.1
+    config_changes: [{at: "14:00", config: {reminder_interval: 600}}]
+    costs: {process: 0.002}
+    expect:
+      - {at: "00:20", event: reminder_fired}
+      - {at: "10:20", event: timeout_suppressed, phase: reminder}
+
+Times are seconds or "HH:MM[:SS]" from the start of the simulation, hours
+past 24 fall on later days. The run fails when the expected entries don't
+appear on the timeline in order, each within `within` seconds of `at`.
+time_of_day rules still read the real clock.
+"""
+import argparse
+import collections
+import heapq
+import itertools
+import json
+import logging
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+from . import config, core, loader, rules, utils, validation
+
+_LOGGER = logging.getLogger(__name__)
+
+DAY = 86400.0
+_HOUR = 3600.0
+_MINUTE = 60.0
+
+PROBES = ("idle", "process", "window", "microphone")
+# events left off the timeline
+_UNRECORDED_EVENTS = frozenset(["scheduler_stats"])
+# seconds an expected entry may be off by, the reminder timer's slack
+_DEFAULT_WITHIN = 2.0
+
+TimelineEntry = collections.namedtuple(
+    "TimelineEntry", ["time", "event", "fields"]
+)
+
+
+class ScenarioError(ValueError):
+    """Raised when a scenario is malformed."""
+
+
+def parseTime(value):
+    """Parse a scenario time.
+
+    Args:
+        value (float or str): Seconds, or "HH:MM[:SS]" from the start of
+            the simulation.
+
+    Returns:
+        float: The seconds from the start of the simulation.
+
+    Raises:
+        ScenarioError: If the time is malformed.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    parts = str(value).split(":")
+    try:
+        numbers = [int(part) for part in parts]
+    except ValueError:
+        numbers = []
+    if len(numbers) not in (2, 3) or min(numbers) < 0:
+        raise ScenarioError(
+            "Invalid time {}, expected HH:MM[:SS]".format(value)
+        )
+    seconds = numbers[2] if len(numbers) == 3 else 0
+    return numbers[0] * _HOUR + numbers[1] * _MINUTE + seconds
+
+
+def formatTime(seconds):
+    """Format a simulation time for the timeline.
+
+    Args:
+        seconds (float): The seconds from the start of the simulation.
+
+    Returns:
+        str: The day, counted from 1, and the time of day.
+    """
+    day, rest = divmod(int(round(seconds)), int(DAY))
+    return "day {} {:02d}:{:02d}:{:02d}".format(
+        day + 1, rest // 3600, rest // 60 % 60, rest % 60
+    )
+
+
+def _parsePeriods(scenario, key):
+    periods = []
+    for entry in scenario.get(key) or []:
+        if isinstance(entry, dict):
+            try:
+                name = entry["name"]
+                period = [entry["from"], entry["to"]]
+            except KeyError as e:
+                raise ScenarioError("{} entry without {}".format(key, e))
+        else:
+            name = None
+            period = entry
+        if not isinstance(period, (list, tuple)) or len(period) != 2:
+            raise ScenarioError(
+                "{} expects [from, to] periods, got {}".format(key, entry)
+            )
+        start, end = parseTime(period[0]), parseTime(period[1])
+        if end <= start:
+            raise ScenarioError(
+                "{} period ends before it starts: {}".format(key, entry)
+            )
+        periods.append((start, end, name))
+    return sorted(periods, key=lambda period: period[0])
+
+
+def _checkDisjoint(periods, key):
+    for previous, period in zip(periods, periods[1:]):
+        if period[0] < previous[1]:
+            raise ScenarioError(
+                "{} periods overlap at {}".format(key, formatTime(period[0]))
+            )
+
+
+class DayStats(object):
+
+    def __init__(self, day):
+        """What happened on one simulated day.
+
+        Args:
+            day (int): The day, counted from 0.
+        """
+        self.day = day
+        self.events = collections.Counter()
+        self.calls = collections.Counter()
+        self.costs = collections.Counter()
+        self.wakeups = 0
+
+    @property
+    def cost(self):
+        """float: Seconds spent in probes."""
+        return sum(self.costs.values())
+
+    def asDict(self):
+        """Return the stats for JSON output.
+
+        Returns:
+            dict: The stats.
+        """
+        return {
+            "day": self.day + 1,
+            "events": dict(self.events),
+            "probe_calls": dict(self.calls),
+            "probe_cost_ms": {
+                probe: round(cost * 1000, 3)
+                for probe, cost in self.costs.items()
+            },
+            "wakeups": self.wakeups,
+        }
+
+
+class SimulatedTimerBackend(object):
+
+    def __init__(self, simulation):
+        """The scheduler's timer, fired by the simulated loop.
+
+        Args:
+            simulation (Simulation): The simulation.
+        """
+        self._simulation = simulation
+        self._callback = None
+        self.deadline = None
+
+    def setCallback(self, callback):
+        """Set the function called when the timer fires.
+
+        Args:
+            callback (callable): Called without arguments.
+        """
+        self._callback = callback
+
+    def arm(self, deadline, tolerance):
+        """Arm the timer, it fires as late as the tolerance allows.
+
+        Firing late is the worst case for the timers' drift.
+
+        Args:
+            deadline (float): A virtual clock time.
+            tolerance (float): Seconds the timer may be off by.
+        """
+        self.deadline = deadline + tolerance
+
+    def disarm(self):
+        """Stop the timer."""
+        self.deadline = None
+
+    def fire(self):
+        """Fire the timer."""
+        self.deadline = None
+        self._simulation.day().wakeups += 1
+        self._callback()
+
+
+class SimulatedLoop(object):
+
+    def __init__(self, simulation):
+        """An event loop adapter on a virtual clock.
+
+        Args:
+            simulation (Simulation): The simulation.
+        """
+        self._simulation = simulation
+        self.time = 0.0
+        self.suspended = 0.0
+        self._ready = collections.deque()
+        self._events = []
+        self._sequence = itertools.count()
+        self._timer = None
+        self._stopped = False
+
+    def now(self):
+        """Return the virtual clock time.
+
+        Returns:
+            float: The seconds since the start of the simulation.
+        """
+        return self.time
+
+    def suspendedTime(self):
+        """Return the virtual time spent suspended.
+
+        Returns:
+            float: The seconds spent suspended.
+        """
+        return self.suspended
+
+    def createTimerBackend(self):
+        """Create the timer of the scheduler.
+
+        Returns:
+            SimulatedTimerBackend: The timer backend.
+        """
+        self._timer = SimulatedTimerBackend(self._simulation)
+        return self._timer
+
+    def callSoon(self, callback):
+        """Call a function before the clock moves on.
+
+        Args:
+            callback (callable): Called without arguments.
+        """
+        self._ready.append((callback, ()))
+
+    def callSoonThreadsafe(self, callback, *args):
+        """Call a function before the clock moves on.
+
+        Args:
+            callback (callable): The function.
+            *args: Its arguments.
+        """
+        self._ready.append((callback, args))
+
+    def addReader(self, fd, callback):
+        """There are no file descriptors in a simulation."""
+
+    def removeReader(self, fd):
+        """There are no file descriptors in a simulation."""
+
+    def stop(self):
+        """Stop the loop."""
+        self._stopped = True
+
+    def callAt(self, at, callback, *args):
+        """Call a function at a virtual time.
+
+        Args:
+            at (float): The virtual clock time.
+            callback (callable): The function.
+            *args: Its arguments.
+        """
+        heapq.heappush(
+            self._events, (at, next(self._sequence), callback, args)
+        )
+
+    def suspend(self, duration):
+        """Suspend the system, the clock jumps past the suspend.
+
+        Args:
+            duration (float): The seconds to stay suspended.
+        """
+        self.time += duration
+        self.suspended += duration
+
+    def runUntil(self, end):
+        """Run the callbacks in time order up to a point in time.
+
+        Args:
+            end (float): The virtual clock time to stop at.
+        """
+        while not self._stopped:
+            while self._ready:
+                callback, args = self._ready.popleft()
+                callback(*args)
+            event_at = self._events[0][0] if self._events else math.inf
+            timer_at = math.inf
+            if self._timer is not None and self._timer.deadline is not None:
+                timer_at = self._timer.deadline
+            if min(event_at, timer_at) > end:
+                break
+            # callbacks that were due during a suspend run on resume
+            self.time = max(self.time, min(event_at, timer_at))
+            if event_at <= timer_at:
+                _, _, callback, args = heapq.heappop(self._events)
+                callback(*args)
+            else:
+                self._timer.fire()
+        self.time = max(self.time, end)
+
+
+class SimulatedIdle(object):
+
+    def __init__(self, simulation, on_idle, on_resume):
+        """The idle backend and idle monitor, following the idle trace.
+
+        Args:
+            simulation (Simulation): The simulation.
+            on_idle (callable): Called with the crossed threshold in
+                milliseconds.
+            on_resume (callable): Called with the idle period duration in
+                milliseconds, if a threshold was crossed.
+        """
+        self._simulation = simulation
+        self._on_idle = on_idle
+        self._on_resume = on_resume
+        self._thresholds = []
+        self._idle_since = None
+        self._crossed = False
+
+    def getIdleTime(self):
+        """Return the idle time.
+
+        Returns:
+            float: The milliseconds since the last input.
+        """
+        self._simulation.recordProbe("idle")
+        if self._idle_since is None:
+            return 0
+        return (self._simulation.loop.time - self._idle_since) * 1000
+
+    def setThresholds(self, thresholds):
+        """Set the idle thresholds, they apply from the next idle period.
+
+        Args:
+            thresholds (list[int]): Idle thresholds in milliseconds.
+        """
+        self._thresholds = sorted(set(int(t) for t in thresholds if t > 0))
+
+    def begin(self, end):
+        """Start an idle period.
+
+        Args:
+            end (float): The virtual time input resumes at.
+        """
+        loop = self._simulation.loop
+        self._idle_since = loop.time
+        self._crossed = False
+        for threshold in self._thresholds:
+            at = loop.time + threshold / 1000
+            if at < end:
+                loop.callAt(at, self._thresholdCrossed, threshold)
+        loop.callAt(end, self._resumed)
+
+    def _thresholdCrossed(self, threshold):
+        self._crossed = True
+        self._on_idle(threshold)
+
+    def _resumed(self):
+        duration = (self._simulation.loop.time - self._idle_since) * 1000
+        self._idle_since = None
+        if self._crossed:
+            self._on_resume(duration)
+
+
+class SimulatedIndex(object):
+
+    def __init__(self, simulation, probe, on_change):
+        """A window or process index, following its trace.
+
+        Args:
+            simulation (Simulation): The simulation.
+            probe (str): "window" or "process".
+            on_change (callable): Called without arguments on changes.
+        """
+        self._simulation = simulation
+        self._probe = probe
+        self._on_change = on_change
+        self._names = collections.Counter()
+
+    @property
+    def text(self):
+        """str: The open names, newline separated."""
+        self._simulation.recordProbe(self._probe)
+        return "\n".join(self._names)
+
+    def open(self, name):
+        """Open a window or start a process.
+
+        Args:
+            name (str): Its name.
+        """
+        self._names[name] += 1
+        self._on_change()
+
+    def close(self, name):
+        """Close a window or end a process.
+
+        Args:
+            name (str): Its name.
+        """
+        self._names[name] -= 1
+        if self._names[name] <= 0:
+            del self._names[name]
+        self._on_change()
+
+
+class SimulatedMicrophone(object):
+
+    def __init__(self, simulation, on_change):
+        """The microphone monitor, following the microphone trace.
+
+        Args:
+            simulation (Simulation): The simulation.
+            on_change (callable): Called with the new capture state.
+        """
+        self._simulation = simulation
+        self._on_change = on_change
+        self._sessions = 0
+        self.isConnected = True
+
+    @property
+    def isCaptureActive(self):
+        """bool: Whether any session is capturing."""
+        self._simulation.recordProbe("microphone")
+        return self._sessions > 0
+
+    def open(self, name=None):
+        """Start capturing."""
+        self._sessions += 1
+        if self._sessions == 1:
+            self._on_change(True)
+
+    def close(self, name=None):
+        """Stop capturing."""
+        self._sessions -= 1
+        if self._sessions == 0:
+            self._on_change(False)
+
+
+class ImmediateValidationPipeline(object):
+    """Run the probes of a validation in order, on the calling thread."""
+
+    def validate(self, probes, callback, context=None, max_in_flight=None):
+        """Validate and call back before returning.
+
+        Args:
+            probes (list[eyecare_reminder.validation.Probe]): The probes.
+            callback (callable): Called with the ValidationResult.
+            context (object, optional): Passed back in the result.
+            max_in_flight (int, optional): Unused, probes run one by one.
+        """
+        for probe in probes:
+            try:
+                suppress = probe.check()
+            except Exception:
+                _LOGGER.exception("PROBE {} FAILED".format(probe.name.upper()))
+                suppress = probe.default
+            if suppress:
+                callback(
+                    validation.ValidationResult(False, probe.name, context)
+                )
+                return
+        callback(validation.ValidationResult(True, None, context))
+
+    def shutdown(self):
+        """Nothing runs in the background."""
+
+
+class SimulatedCore(core.ReminderCore):
+
+    def __init__(self, simulation, config_path):
+        """The reminder core, reading the simulation's traces.
+
+        Args:
+            simulation (Simulation): The simulation.
+            config_path (str): The config file of the simulation.
+        """
+        self._simulation = simulation
+        self._config_path = config_path
+        loop = simulation.loop
+        super().__init__(loop, now=loop.now, suspended=loop.suspendedTime)
+
+    def _createConfigLoader(self):
+        return loader.ConfigLoader(self._config_path, environment={})
+
+    def _createProbeSources(self):
+        simulation = self._simulation
+        self._idle_backend = self._idle_monitor = SimulatedIdle(
+            simulation, self._systemIdle, self._systemResumed
+        )
+        self._window_index = SimulatedIndex(
+            simulation,
+            "window",
+            lambda: self._probe_cache.invalidate("window"),
+        )
+        self._process_index = SimulatedIndex(
+            simulation,
+            "process",
+            lambda: self._probe_cache.invalidate("process"),
+        )
+        self._microphone_monitor = SimulatedMicrophone(
+            simulation,
+            lambda active: self._probe_cache.invalidate("microphone"),
+        )
+
+    def _createValidationPipeline(self):
+        return ImmediateValidationPipeline()
+
+    def _createConfigWatcher(self):
+        # config changes are scripted, see Simulation._changeConfig
+        return None
+
+    def _createRuleEngine(self, suppression_rules, probes, stats):
+        # the probes' cost is measured on the simulated cost, which keeps
+        # the evaluation order the same from run to run
+        return rules.RuleEngine(
+            suppression_rules,
+            probes,
+            stats=stats,
+            timer=self._simulation.probeTime,
+        )
+
+    def _deferredStartup(self):
+        """There is no desktop entry or sound to set up."""
+
+    @property
+    def windowIndex(self):
+        """SimulatedIndex: The windows."""
+        return self._window_index
+
+    @property
+    def processIndex(self):
+        """SimulatedIndex: The processes."""
+        return self._process_index
+
+    @property
+    def microphone(self):
+        """SimulatedMicrophone: The microphone."""
+        return self._microphone_monitor
+
+    @property
+    def idle(self):
+        """SimulatedIdle: The idle backend and monitor."""
+        return self._idle_monitor
+
+
+class SimulatedFrontend(object):
+
+    def __init__(self, simulation):
+        """The frontend of the simulated core, it only skips cooldowns.
+
+        Args:
+            simulation (Simulation): The simulation.
+        """
+        self._simulation = simulation
+
+    def showReminderMessage(self, play_sound=True):
+        self._simulation.reminderShown()
+
+    def showCooldownMessage(self, play_sound=True):
+        pass
+
+    def closeReminderMessage(self):
+        pass
+
+    def setReminderToolTip(self, time):
+        pass
+
+    def showConfigReloadedMessage(self):
+        pass
+
+    def showBadConfigMessage(self):
+        self._simulation.recordEvent("config_invalid", {})
+
+    def setDefaultTrayIcon(self):
+        pass
+
+    def startCooldownAnimation(self):
+        pass
+
+
+class _TimelineHandler(logging.Handler):
+
+    def __init__(self, simulation):
+        super().__init__()
+        self._simulation = simulation
+
+    def emit(self, record):
+        event = getattr(record, "event", None)
+        if event is not None and event not in _UNRECORDED_EVENTS:
+            self._simulation.recordEvent(event, record.event_fields)
+
+
+class SimulationResult(object):
+
+    def __init__(self, timeline, days, elapsed):
+        """The outcome of a simulation.
+
+        Args:
+            timeline (list[TimelineEntry]): The events in time order.
+            days (list[DayStats]): The stats of every simulated day.
+            elapsed (float): The real seconds the simulation took.
+        """
+        self.timeline = timeline
+        self.days = days
+        self.elapsed = elapsed
+
+    def check(self, expectations):
+        """Check that the expected entries appear on the timeline in order.
+
+        Args:
+            expectations (list[dict]): Entries with an event, optionally
+                the time it is expected at, the seconds it may be off by as
+                within, and fields it must have.
+
+        Returns:
+            list[str]: A description of every missing entry.
+        """
+        failures = []
+        position = 0
+        for expected in expectations:
+            expected = dict(expected)
+            event = expected.pop("event", None)
+            at = expected.pop("at", None)
+            at = None if at is None else parseTime(at)
+            within = float(expected.pop("within", _DEFAULT_WITHIN))
+            index = self._find(position, event, at, within, expected)
+            if index is None:
+                failures.append(
+                    "Expected {}{}{} not found".format(
+                        event,
+                        "" if at is None else " at " + formatTime(at),
+                        "".join(
+                            " {}={}".format(key, value)
+                            for key, value in expected.items()
+                        ),
+                    )
+                )
+            else:
+                position = index + 1
+        return failures
+
+    def _find(self, position, event, at, within, fields):
+        for index in range(position, len(self.timeline)):
+            entry = self.timeline[index]
+            if at is not None and entry.time > at + within:
+                return None
+            if (
+                entry.event == event
+                and (at is None or entry.time >= at - within)
+                and all(
+                    entry.fields.get(key) == value
+                    for key, value in fields.items()
+                )
+            ):
+                return index
+        return None
+
+    def report(self):
+        """Format the stats of every day as a table.
+
+        Returns:
+            str: The table.
+        """
+        header = (
+            "{:>5} {:>9} {:>10} {:>6} {:>7}".format(
+                "day", "reminders", "suppressed", "breaks", "wakeups"
+            )
+            + "".join(" {:>10}".format(probe) for probe in PROBES)
+            + " {:>13}".format("probe cost ms")
+        )
+        lines = [header]
+        total = DayStats(-1)
+        for stats in self.days:
+            lines.append(self._row(str(stats.day + 1), stats))
+            total.events.update(stats.events)
+            total.calls.update(stats.calls)
+            total.costs.update(stats.costs)
+            total.wakeups += stats.wakeups
+        lines.append(self._row("total", total))
+        lines.append(
+            "simulated {} days in {:.0f} ms".format(
+                len(self.days), self.elapsed * 1000
+            )
+        )
+        return "\n".join(lines)
+
+    @staticmethod
+    def _row(label, stats):
+        return (
+            "{:>5} {:>9} {:>10} {:>6} {:>7}".format(
+                label,
+                stats.events["reminder_fired"],
+                stats.events["timeout_suppressed"],
+                stats.events["idle_break"] + stats.events["suspend_break"],
+                stats.wakeups,
+            )
+            + "".join(" {:>10}".format(stats.calls[probe]) for probe in PROBES)
+            + " {:>13.3f}".format(stats.cost * 1000)
+        )
+
+    def asDict(self):
+        """Return the result for JSON output.
+
+        Returns:
+            dict: The days and the timeline.
+        """
+        return {
+            "days": [stats.asDict() for stats in self.days],
+            "timeline": [
+                dict(entry.fields, time=entry.time, event=entry.event)
+                for entry in self.timeline
+            ],
+        }
+
+
+class Simulation(object):
+
+    def __init__(self, scenario, seed=0):
+        """Run the reminder core through a scenario.
+
+        Args:
+            scenario (dict): The scenario, see the module documentation.
+            seed (int): Seeds the random cooldown skips.
+
+        Raises:
+            ScenarioError: If the scenario is malformed.
+        """
+        if not isinstance(scenario, dict):
+            raise ScenarioError("A scenario must be a mapping")
+        self._scenario = scenario
+        self._random = random.Random(seed)
+        try:
+            self._length = float(scenario.get("days", 1)) * DAY
+            self._skip_probability = float(
+                scenario.get("skip_probability", 0)
+            )
+            self._costs = dict(config.simulation_probe_costs)
+            self._costs.update(scenario.get("costs") or {})
+        except (TypeError, ValueError) as e:
+            raise ScenarioError(str(e))
+        self._idle = _parsePeriods(scenario, "idle")
+        _checkDisjoint(self._idle, "idle")
+        self._suspends = _parsePeriods(scenario, "suspend")
+        _checkDisjoint(self._suspends, "suspend")
+        self._microphone = _parsePeriods(scenario, "microphone")
+        self._windows = _parsePeriods(scenario, "windows")
+        self._processes = _parsePeriods(scenario, "processes")
+        self._skips = [parseTime(t) for t in scenario.get("skips") or []]
+        self._config_changes = []
+        for change in scenario.get("config_changes") or []:
+            try:
+                self._config_changes.append(
+                    (parseTime(change["at"]), dict(change["config"]))
+                )
+            except (KeyError, TypeError, ValueError) as e:
+                raise ScenarioError("Invalid config change: {}".format(e))
+        # written over the default config, like the user's edits
+        self._config_values = {
+            key.name: key.default_value for key in config.configKeysAsList()
+        }
+        self._config_values.update(scenario.get("config") or {})
+        self.loop = SimulatedLoop(self)
+        self.core = None
+        self._probe_time = 0.0
+        self._days = {}
+        self._timeline = []
+
+    def day(self):
+        """Return the stats of the current day.
+
+        Returns:
+            DayStats: The stats.
+        """
+        day = int(self.loop.time // DAY)
+        stats = self._days.get(day)
+        if stats is None:
+            stats = self._days[day] = DayStats(day)
+        return stats
+
+    def probeTime(self):
+        """Return the simulated seconds spent in probes so far.
+
+        Returns:
+            float: The seconds.
+        """
+        return self._probe_time
+
+    def recordProbe(self, probe):
+        """Record a probe call at its assumed cost.
+
+        Args:
+            probe (str): One of PROBES.
+        """
+        cost = self._costs.get(probe, 0.0)
+        self._probe_time += cost
+        stats = self.day()
+        stats.calls[probe] += 1
+        stats.costs[probe] += cost
+
+    def recordEvent(self, event, fields):
+        """Add an event to the timeline.
+
+        Args:
+            event (str): The event type.
+            fields (dict): Its details.
+        """
+        self._timeline.append(
+            TimelineEntry(self.loop.time, event, dict(fields))
+        )
+        self.day().events[event] += 1
+
+    def reminderShown(self):
+        """Skip the cooldown at random, as often as the scenario says."""
+        if self._random.random() < self._skip_probability:
+            delay = self._random.uniform(
+                5, self.core.getCooldownValue() / 2
+            )
+            self.loop.callAt(self.loop.time + delay, self.core.skipCooldown)
+
+    def _writeConfig(self, path, values):
+        utils.write_yaml(path, values)
+
+    def _schedule(self, periods, source):
+        for start, end, name in periods:
+            self.loop.callAt(start, source.open, name)
+            self.loop.callAt(end, source.close, name)
+
+    def _changeConfig(self, path, values):
+        self._config_values.update(values)
+        self._writeConfig(path, self._config_values)
+        self.core.reloadConfig()
+
+    def run(self):
+        """Run the scenario.
+
+        Returns:
+            SimulationResult: The timeline and stats.
+
+        Raises:
+            ScenarioError: If the scenario's config is invalid.
+        """
+        started = time.perf_counter()
+        event_logger = logging.getLogger("eyecare_reminder.events")
+        handler = _TimelineHandler(self)
+        level, propagate = event_logger.level, event_logger.propagate
+        event_logger.addHandler(handler)
+        event_logger.setLevel(logging.INFO)
+        event_logger.propagate = False
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "config.yaml")
+                self._writeConfig(path, self._config_values)
+                self.core = SimulatedCore(self, path)
+                self.core.setup(SimulatedFrontend(self))
+                if self.core.getRemainingTime() is None:
+                    raise ScenarioError("The scenario's config is invalid")
+                self._schedule(self._windows, self.core.windowIndex)
+                self._schedule(self._processes, self.core.processIndex)
+                self._schedule(self._microphone, self.core.microphone)
+                for start, end, _ in self._idle:
+                    self.loop.callAt(start, self.core.idle.begin, end)
+                for start, end, _ in self._suspends:
+                    self.loop.callAt(start, self.loop.suspend, end - start)
+                for at in self._skips:
+                    self.loop.callAt(at, self.core.skipCooldown)
+                for at, values in self._config_changes:
+                    self.loop.callAt(at, self._changeConfig, path, values)
+                self.loop.runUntil(self._length)
+        finally:
+            event_logger.removeHandler(handler)
+            event_logger.setLevel(level)
+            event_logger.propagate = propagate
+        days = [
+            self._days.get(day) or DayStats(day)
+            for day in range(int(math.ceil(self._length / DAY)))
+        ]
+        return SimulationResult(
+            self._timeline, days, time.perf_counter() - started
+        )
+
+
+def generateScenario(days, seed=0):
+    """Generate workdays of activity.
+
+    Every day has a workday of around eight hours with a lunch break, short
+    breaks, video calls holding the microphone and a "Zoom Meeting"
+    window, and now and then a screen recording. The laptop is suspended
+    overnight.
+
+    Args:
+        days (int): The number of days.
+        seed (int): Seeds the randomness.
+
+    Returns:
+        dict: The scenario.
+    """
+    rng = random.Random(seed)
+    idle = []
+    suspend = []
+    microphone = []
+    windows = []
+    processes = []
+    asleep_since = 0.0
+    for day in range(days):
+        base = day * DAY
+        start = base + 8.5 * _HOUR + rng.uniform(0, _HOUR)
+        end = base + 17 * _HOUR + rng.uniform(0, 1.5 * _HOUR)
+        suspend.append([asleep_since, start])
+        lunch = base + 12 * _HOUR + rng.uniform(0, _HOUR)
+        idle.append([lunch, lunch + rng.uniform(30, 60) * _MINUTE])
+        for _ in range(rng.randint(2, 6)):
+            at = rng.uniform(start, end - 15 * _MINUTE)
+            idle.append([at, at + rng.uniform(2, 15) * _MINUTE])
+        for _ in range(rng.randint(0, 3)):
+            at = rng.uniform(start, end - _HOUR)
+            period = [at, at + rng.choice([15, 30, 45, 60]) * _MINUTE]
+            microphone.append(period)
+            windows.append(
+                {"name": "Zoom Meeting", "from": period[0], "to": period[1]}
+            )
+        if rng.random() < 0.3:
+            at = rng.uniform(start, end - _HOUR)
+            processes.append(
+                {
+                    "name": "obs",
+                    "from": at,
+                    "to": at + rng.uniform(15, 45) * _MINUTE,
+                }
+            )
+        # the screen is left on for a while before the laptop is closed
+        idle.append([end, end + 30 * _MINUTE])
+        asleep_since = end + 30 * _MINUTE
+    if asleep_since < days * DAY:
+        suspend.append([asleep_since, days * DAY])
+    return {
+        "days": days,
+        "config": {
+            "blacklist_window_names": ["Zoom Meeting"],
+            "blacklist_process_names": ["obs"],
+        },
+        "idle": _mergePeriods(idle),
+        "suspend": suspend,
+        "microphone": microphone,
+        "windows": windows,
+        "processes": processes,
+        "skip_probability": 0.1,
+    }
+
+
+def _mergePeriods(periods):
+    merged = []
+    for start, end in sorted(periods):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def loadScenario(path):
+    """Read a scenario file.
+
+    Args:
+        path (str): The YAML file.
+
+    Returns:
+        dict: The scenario.
+
+    Raises:
+        ScenarioError: If the file can't be read.
+    """
+    import yaml
+    try:
+        with open(path) as _f:
+            return yaml.load(_f, Loader=utils.getYamlLoader())
+    except (OSError, yaml.YAMLError) as e:
+        raise ScenarioError("Could not read {}: {}".format(path, e))
+
+
+def _parseArguments(arguments):
+    parser = argparse.ArgumentParser(
+        prog="python -m eyecare_reminder.simulation",
+        description=(
+            "Replay days of activity against the reminder on a virtual clock."
+        ),
+    )
+    parser.add_argument(
+        "scenario",
+        nargs="?",
+        help="a scenario file, workdays are generated without one",
+    )
+    parser.add_argument(
+        "--days", type=int, default=5, help="days to generate, default 5"
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="seeds the generated activity"
+    )
+    parser.add_argument(
+        "--timeline", action="store_true", help="print the timeline"
+    )
+    parser.add_argument(
+        "--json", action="store_true", help="print the result as JSON"
+    )
+    return parser.parse_args(arguments)
+
+
+def main(arguments=None):
+    """Run a simulation from the command line.
+
+    Args:
+        arguments (list[str], optional): The arguments, defaults to
+            sys.argv.
+
+    Returns:
+        int: 0 when the expected timeline entries appeared, 1 otherwise
+            and 2 for a malformed scenario.
+    """
+    arguments = _parseArguments(arguments)
+    try:
+        if arguments.scenario:
+            scenario = loadScenario(arguments.scenario)
+        else:
+            scenario = generateScenario(arguments.days, arguments.seed)
+        result = Simulation(scenario, seed=arguments.seed).run()
+    except ScenarioError as e:
+        print(e, file=sys.stderr)
+        return 2
+    failures = result.check(scenario.get("expect") or [])
+    if arguments.json:
+        print(json.dumps(dict(result.asDict(), failures=failures), indent=2))
+    else:
+        if arguments.timeline:
+            for entry in result.timeline:
+                print(
+                    "{}  {}{}".format(
+                        formatTime(entry.time),
+                        entry.event,
+                        "".join(
+                            " {}={}".format(key, value)
+                            for key, value in entry.fields.items()
+                        ),
+                    )
+                )
+            print()
+        print(result.report())
+        for failure in failures:
+            print(failure, file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,10 @@
+"""Helpers shared across the app.
+
+psutil, yaml and the audio engine are imported on first use, they aren't
+needed to bring up the tray icon.
+"""
 import os
-import psutil
 import subprocess
-import yaml
-from yaml.loader import SafeLoader
 
 
 def checkIfProcessRunning(process_name):
@@ -15,6 +17,7 @@ def checkIfProcessRunning(process_name):
     Returns:
         bool: Whether the process is running or not.
     """
+    import psutil
     for proc in psutil.process_iter():
         try:
             if process_name.lower() in proc.name().lower():
@@ -29,6 +32,24 @@ def checkIfProcessRunning(process_name):
     return False
 
 
+def iterProcessNames():
+    """Iterate over the names of the running processes.
+
+    Yields:
+        str: The name of each running process.
+    """
+    import psutil
+    for proc in psutil.process_iter():
+        try:
+            yield proc.name()
+        except (
+            psutil.NoSuchProcess,
+            psutil.AccessDenied,
+            psutil.ZombieProcess,
+        ):
+            pass
+
+
 def checkIfWindowRunning(window_name, output=None):
     """Check if there are any windows open that contain the given window_name
 
@@ -48,16 +69,32 @@ def checkIfWindowRunning(window_name, output=None):
         return False
 
 
+def getYamlLoader():
+    """Return the fastest available safe yaml loader.
+
+    Returns:
+        type: The libyaml CSafeLoader if available, otherwise SafeLoader.
+    """
+    try:
+        # libyaml parses several times faster
+        from yaml import CSafeLoader
+        return CSafeLoader
+    except ImportError:
+        from yaml.loader import SafeLoader
+        return SafeLoader
+
+
 def import_yaml(path):
     """Imports a yaml file.
 
     Returns:
         dict: The contents of the yaml file as a dict object.
     """
+    import yaml
     with open(path) as _f:
         data = {}
         try:
-            data = yaml.load(_f, Loader=SafeLoader)
+            data = yaml.load(_f, Loader=getYamlLoader())
         except yaml.YAMLError:
             # we pass as user will be notified of invalid config
             # when empty dict is returned
@@ -72,6 +109,7 @@ def write_yaml(path, data):
         path (str): The path to write the yaml file at.
         data (dict): The data to write into the yaml file.
     """
+    import yaml
     dirpath = os.path.dirname(path)
     if not os.path.exists(dirpath):
         os.makedirs(dirpath)
@@ -106,11 +144,12 @@ def convert_seconds_to_ms(value):
 def play_sound(sound_file):
     """Play a sound.
 
+    The sound is decoded once and then played in-process from memory,
+    see eyecare_reminder.audio.
+
     Args:
         sound_file (str): The file path of the sound to play.
-            Must have .wav file extension
+            Files other than .wav are decoded with ffmpeg.
     """
-    ext = sound_file.split(".")[-1]
-    if not ext == "wav":
-        raise RuntimeError("Unsupported audio extension .{}".format(ext))
-    subprocess.Popen(("aplay", sound_file))
+    from . import audio
+    audio.getAudioEngine().play(sound_file)
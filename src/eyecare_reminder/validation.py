@@ -0,0 +1,180 @@
+import collections
+import concurrent.futures
+import logging
+import time
+
+from . import logs
+
+_LOGGER = logging.getLogger(__name__)
+
+Probe = collections.namedtuple(
+    "Probe", ["name", "check", "timeout", "default"]
+)
+Probe.__doc__ = """A suppression check run by the validation pipeline.
+
+Args:
+    name (str): The probe name used in the log.
+    check (callable): Returns True when the reminder should be suppressed.
+    timeout (float): Seconds after which the probe is abandoned.
+    default (bool): The vote assumed when the probe times out or fails.
+"""
+
+ValidationResult = collections.namedtuple(
+    "ValidationResult", ["valid", "suppressed_by", "context"]
+)
+
+
+class ValidationPipeline(object):
+
+    def __init__(self, max_workers=4):
+        """Run suppression probes concurrently, off the calling thread.
+
+        Args:
+            max_workers (int): Maximum number of probes running at once.
+        """
+        self._pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="probe"
+        )
+        self._coordinator = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="validation"
+        )
+        # probe name -> call that timed out while running, the probe isn't
+        # started again until it returns so a hung probe can't take every
+        # worker, only used on the coordinator thread
+        self._abandoned = {}
+
+    def validate(self, probes, callback, context=None, max_in_flight=None):
+        """Start a validation and return immediately.
+
+        Probes are started in the given order, at most max_in_flight at a
+        time, so cheaper probes listed first can decide the result before
+        expensive ones are started. The callback receives a
+        ValidationResult on the coordinator thread as soon as any probe
+        votes to suppress, or once every probe has voted not to. A probe
+        that timed out while running isn't started again until that call
+        returns, in the meantime its default vote is assumed.
+
+        Args:
+            probes (list[Probe]): The probes to run.
+            callback (callable): Called with the ValidationResult.
+            context (object, optional): Passed back in the result.
+            max_in_flight (int, optional): Maximum probes running at once,
+                defaults to all of them.
+        """
+        self._coordinator.submit(
+            self._run, probes, callback, context, max_in_flight
+        )
+
+    def _run(self, probes, callback, context, max_in_flight):
+        try:
+            result = self._evaluate(probes, context, max_in_flight)
+        except Exception:
+            _LOGGER.exception("VALIDATION FAILED")
+            result = ValidationResult(True, None, context)
+        callback(result)
+
+    def _evaluate(self, probes, context, max_in_flight):
+        queued = list(probes)
+        max_in_flight = max_in_flight or len(queued)
+        pending = {}
+        deadlines = {}
+        while queued or pending:
+            while queued and len(pending) < max_in_flight:
+                probe = queued.pop(0)
+                if self._isStillRunning(probe):
+                    _LOGGER.warning(
+                        "PROBE {} STILL RUNNING, SKIPPED".format(
+                            probe.name.upper()
+                        )
+                    )
+                    logs.logEvent(
+                        "probe_skipped",
+                        level=logging.WARNING,
+                        probe=probe.name,
+                    )
+                    if probe.default:
+                        self._cancel(pending)
+                        return ValidationResult(False, probe.name, context)
+                    continue
+                future = self._pool.submit(self._timed, probe)
+                pending[future] = probe
+                deadlines[future] = time.monotonic() + probe.timeout
+            if not pending:
+                break
+            next_deadline = min(deadlines[future] for future in pending)
+            timeout = max(0, next_deadline - time.monotonic())
+            done, _ = concurrent.futures.wait(
+                pending,
+                timeout=timeout,
+                return_when=concurrent.futures.FIRST_COMPLETED,
+            )
+            now = time.monotonic()
+            for future in list(pending):
+                probe = pending[future]
+                if future in done:
+                    suppress = self._vote(probe, future)
+                elif now >= deadlines[future]:
+                    if not future.cancel():
+                        self._abandoned[probe.name] = future
+                    _LOGGER.warning(
+                        "PROBE {} TIMED OUT AFTER {}s".format(
+                            probe.name.upper(), probe.timeout
+                        )
+                    )
+                    logs.logEvent(
+                        "probe_timeout",
+                        level=logging.WARNING,
+                        probe=probe.name,
+                        timeout=probe.timeout,
+                    )
+                    suppress = probe.default
+                else:
+                    continue
+                del pending[future]
+                if suppress:
+                    self._cancel(pending)
+                    return ValidationResult(False, probe.name, context)
+        return ValidationResult(True, None, context)
+
+    def _isStillRunning(self, probe):
+        future = self._abandoned.get(probe.name)
+        if future is None:
+            return False
+        if future.done():
+            del self._abandoned[probe.name]
+            return False
+        return True
+
+    @staticmethod
+    def _cancel(pending):
+        # running probes finish, their result isn't needed anymore
+        for future in pending:
+            future.cancel()
+
+    @staticmethod
+    def _timed(probe):
+        started = time.monotonic()
+        suppress = probe.check()
+        logs.logEvent(
+            "probe",
+            level=logging.DEBUG,
+            probe=probe.name,
+            duration_ms=round((time.monotonic() - started) * 1000, 3),
+            suppress=bool(suppress),
+        )
+        return suppress
+
+    @staticmethod
+    def _vote(probe, future):
+        try:
+            return bool(future.result())
+        except Exception as e:
+            _LOGGER.error(
+                "PROBE {} FAILED: {}".format(probe.name.upper(), e)
+            )
+            return probe.default
+
+    def shutdown(self):
+        """Stop accepting validations, without waiting for hung probes."""
+        self._coordinator.shutdown(wait=False)
+        self._pool.shutdown(wait=False)
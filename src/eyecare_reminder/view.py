@@ -1,11 +1,24 @@
+import logging
+import os
+
+from PyQt5.QtCore import pyqtSignal
 from PyQt5.QtWidgets import QSystemTrayIcon, QMenu, QMessageBox, QAction
-from PyQt5.QtGui import QIcon
 
 
-from . import config, utils
+from . import config, icons, utils
+
+_LOGGER = logging.getLogger(__name__)
+
+_REMINDER_NOTIFICATION = "reminder"
+_CONFIG_NOTIFICATION = "config"
+_SKIP_ACTION = "skip"
+_EDIT_CONFIG_ACTION = "edit_config"
 
 
 class View(QSystemTrayIcon):
+    # emitted from the notification client thread
+    notificationActionInvoked = pyqtSignal(str, str)
+    notificationClosed = pyqtSignal(str, int)
 
     def __init__(self, controller):
         """Initialize the view object.
@@ -18,10 +31,22 @@ class View(QSystemTrayIcon):
         self.checkTray()
         super().__init__()
 
-        self.icon_default = QIcon(config.icon)
-        self.icon_attention = QIcon(config.icon_attention)
-        self.setIcon(self.icon_default)
-        self.current_icon_file = config.icon
+        self._icons = icons.createIconCache()
+        self._animation = icons.IconAnimation(
+            [icons.FRAME_ATTENTION, icons.FRAME_DEFAULT]
+        )
+        self._animation_task = None
+        # the (frame, progress step) shown, to skip redundant tray updates
+        self._shown_frame = None
+        self._showFrame(icons.FRAME_DEFAULT)
+
+        # eyecare_reminder.notifications.NotificationClient, created by
+        # setupDeferred
+        self._notifications = None
+        self._log_viewer = None
+        self.notificationActionInvoked.connect(self._notificationAction)
+        self.notificationClosed.connect(self._notificationClosed)
+        self._countdown_task = None
 
         self.edit_config_action = QAction("Edit config")
         self.reload_config_action = QAction("Reload config")
@@ -31,13 +56,10 @@ class View(QSystemTrayIcon):
 
         self.autostart_action = QAction("Autostart")
         self.autostart_action.setCheckable(True)
-        autostart = self._controller.getDesktopFileAutostart()
-        if autostart:
-            self.autostart_action.setChecked(True)
 
         self.edit_config_action.triggered.connect(self._controller.editConfig)
         self.reload_config_action.triggered.connect(self._controller.reloadConfig)
-        self.open_log_action.triggered.connect(self._controller.openLog)
+        self.open_log_action.triggered.connect(self.showLogViewer)
         self.reset_to_default_action.triggered.connect(self.showResetToDefaultMessage)
         self.autostart_action.triggered.connect(self._controller.toggleAutostart)
         self.exit_action.triggered.connect(self._controller.exit)
@@ -56,18 +78,73 @@ class View(QSystemTrayIcon):
 
         self.setVisible(True)
 
+    def setupDeferred(self):
+        """Do the setup that isn't needed to show the tray icon.
+
+        Called by the controller once the icon is shown, starts the
+        notification client, decodes the sounds and reads the autostart
+        state from the desktop file.
+        """
+        from . import audio
+        # the tray's size is only known once the icon is embedded
+        if self._icons.addSize(self.geometry().height()):
+            frame, self._shown_frame = self._shown_frame, None
+            self._showFrame(*frame)
+        try:
+            from . import notifications
+        except ImportError as e:
+            # eg. jeepney older than 0.7, messages fall back to the tray
+            # icon's bubbles
+            _LOGGER.warning("NOTIFICATIONS NOT AVAILABLE: {}".format(e))
+        else:
+            self._notifications = notifications.NotificationClient(
+                config.notification_app_name,
+                on_action=self.notificationActionInvoked.emit,
+                on_closed=self.notificationClosed.emit,
+            )
+        audio.getAudioEngine().preload(
+            [config.reminder_sound, config.cooldown_sound]
+        )
+        autostart = self._controller.getDesktopFileAutostart()
+        if autostart is None:
+            # the desktop file isn't installed
+            self.autostart_action.setEnabled(False)
+        elif autostart:
+            self.autostart_action.setChecked(True)
+
+    def _notificationsConnected(self):
+        return self._notifications is not None and (
+            self._notifications.isConnected
+        )
+
     def showReminderMessage(self, play_sound=True):
         """Show the reminder message as a notification.
 
+        When the notification server is reachable the message counts down
+        the remaining cooldown in place and offers to skip it.
+
         Args:
             play_sound (bool): Whether to play sound or not.
         """
-        self.showMessage(
-            "Eyecare Reminder",
-            config.reminder_message.format(self._controller.getCooldownValue()),
-            self.icon_attention,
-            config.reminder_notification_duration
-        )
+        cooldown = self._controller.getCooldownValue()
+        if self._notificationsConnected():
+            self._stopCountdown()
+            self._updateCountdown()
+            self._countdown_task = self._controller.scheduler.callEvery(
+                utils.convert_ms_to_seconds(config.countdown_update_interval),
+                self._updateCountdown,
+                "countdown",
+                slack=utils.convert_ms_to_seconds(
+                    config.countdown_update_slack
+                ),
+            )
+        else:
+            self.showMessage(
+                "Eyecare Reminder",
+                config.reminder_message.format(cooldown),
+                self._icons.icon(icons.FRAME_ATTENTION),
+                config.reminder_notification_duration
+            )
         if play_sound:
             utils.play_sound(config.reminder_sound)
 
@@ -77,34 +154,139 @@ class View(QSystemTrayIcon):
         Args:
             play_sound (bool): Whether to play sound or not.
         """
-        self.showMessage(
-            "Eyecare Reminder",
-            config.reminder_end_message,
-            self.icon_default,
-            config.reminder_cooldown_duration,
-        )
+        self._stopCountdown()
+        if self._notificationsConnected():
+            # replaces the countdown
+            self._notifications.notify(
+                _REMINDER_NOTIFICATION,
+                "Eyecare Reminder",
+                config.reminder_end_message,
+                icon=os.path.abspath(config.icon),
+                timeout=config.reminder_cooldown_duration,
+            )
+        else:
+            self.showMessage(
+                "Eyecare Reminder",
+                config.reminder_end_message,
+                self._icons.icon(icons.FRAME_DEFAULT),
+                config.reminder_cooldown_duration,
+            )
         if play_sound:
             utils.play_sound(config.cooldown_sound)
 
+    def closeReminderMessage(self):
+        """Stop the countdown and close the reminder notification."""
+        self._stopCountdown()
+        if self._notifications is not None:
+            self._notifications.close(_REMINDER_NOTIFICATION)
+
+    def _updateCountdown(self):
+        """Countdown timer callback, updates the live reminder in place."""
+        from . import notifications
+        # the controller's deadline, so the countdown follows retimed
+        # cooldowns and suspends
+        remaining = max(0, self._controller.getRemainingTime() or 0)
+        self._notifications.notify(
+            _REMINDER_NOTIFICATION,
+            "Eyecare Reminder",
+            config.reminder_message.format(round(remaining)),
+            icon=os.path.abspath(config.icon_attention),
+            # outlive the update interval so the bubble doesn't flicker
+            timeout=int(remaining * 1000) + config.countdown_update_interval,
+            actions=[(_SKIP_ACTION, config.notification_skip_label)],
+            urgency=notifications.URGENCY_CRITICAL,
+        )
+        if remaining <= 0:
+            self._stopCountdown()
+
+    def _stopCountdown(self):
+        if self._countdown_task is not None:
+            self._countdown_task.cancel()
+            self._countdown_task = None
+
+    def _notificationAction(self, key, action):
+        """Handle an action invoked on a notification.
+
+        Args:
+            key (str): The notification key.
+            action (str): The action key.
+        """
+        if key == _REMINDER_NOTIFICATION and action == _SKIP_ACTION:
+            self.closeReminderMessage()
+            self._controller.skipCooldown()
+        elif key == _CONFIG_NOTIFICATION and action == _EDIT_CONFIG_ACTION:
+            self._controller.editConfig()
+
+    def _notificationClosed(self, key, reason):
+        """Stop updating a countdown the user dismissed.
+
+        Args:
+            key (str): The notification key.
+            reason (int): One of the notifications.CLOSED_* values.
+        """
+        from . import notifications
+        if key == _REMINDER_NOTIFICATION and (
+            reason == notifications.CLOSED_DISMISSED
+        ):
+            self._stopCountdown()
+
+    def showLogViewer(self):
+        """Open the log viewer window, or raise it if already open."""
+        if self._log_viewer is None:
+            from . import logviewer
+            self._log_viewer = logviewer.LogViewer(
+                config.default_log_location,
+                open_externally=self._controller.openLog,
+            )
+        else:
+            self._log_viewer.reload()
+        self._log_viewer.show()
+        self._log_viewer.raise_()
+        self._log_viewer.activateWindow()
+
     def showBadConfigMessage(self):
-        """Open a window asking the user whether to restore the default config.
+        """Show that the config is broken as a notification.
+
+        The previous config stays in effect, the notification offers to
+        open the config for editing, saved fixes are applied right away.
         """
-        button_reply = QMessageBox.question(
-            None,
-            'Broken config',
-            "The config file is broken, would you like to restore defaults?",
+        if self._notificationsConnected():
+            self._notifications.notify(
+                _CONFIG_NOTIFICATION,
+                "Eyecare Reminder",
+                config.bad_config_message,
+                icon=os.path.abspath(config.icon_attention),
+                timeout=config.bad_config_notification_duration,
+                actions=[(
+                    _EDIT_CONFIG_ACTION,
+                    config.notification_edit_config_label,
+                )],
+            )
+            return
+        self.showMessage(
+            "Eyecare Reminder",
+            config.bad_config_message,
+            self._icons.icon(icons.FRAME_ATTENTION),
+            config.bad_config_notification_duration,
         )
-        if button_reply == QMessageBox.StandardButton.Yes:
-            self._controller.writeDefaultConfig()
-        else:
-            self._controller.editConfig()
 
     def showConfigReloadedMessage(self):
         """Show the config reloaded message as a notification."""
+        if self._notificationsConnected():
+            from . import notifications
+            self._notifications.notify(
+                _CONFIG_NOTIFICATION,
+                "Eyecare Reminder",
+                config.config_reloaded_message,
+                icon=os.path.abspath(config.icon),
+                timeout=3000,
+                urgency=notifications.URGENCY_LOW,
+            )
+            return
         self.showMessage(
             "Eyecare Reminder",
             config.config_reloaded_message,
-            self.icon_default,
+            self._icons.icon(icons.FRAME_DEFAULT),
             3000,
         )
 
@@ -127,28 +309,63 @@ class View(QSystemTrayIcon):
         """
         self.setToolTip(config.next_reminder_message.format(time))
 
+    def _showFrame(self, frame, progress_step=None):
+        """Show a cached frame in the tray.
+
+        Args:
+            frame (str): One of the icons.FRAME_* values.
+            progress_step (int, optional): The progress ring step.
+        """
+        if (frame, progress_step) == self._shown_frame:
+            return
+        self.setIcon(self._icons.icon(frame, progress_step))
+        self._shown_frame = (frame, progress_step)
+
     def setDefaultTrayIcon(self):
-        """Set the default tray icon."""
-        self.setIcon(self.icon_default)
-        self.current_icon_file = config.icon
+        """Stop the animation and set the default tray icon."""
+        if self._animation_task is not None:
+            self._animation_task.cancel()
+            self._animation_task = None
+        self._animation.reset()
+        self._showFrame(icons.FRAME_DEFAULT)
 
     def setAttentionTrayIcon(self):
         """Set the attention tray icon."""
-        self.setIcon(self.icon_attention)
-        self.current_icon_file = config.icon_attention
+        self._showFrame(icons.FRAME_ATTENTION)
+
+    def startCooldownAnimation(self):
+        """Animate the tray icon until the cooldown ends."""
+        self.setDefaultTrayIcon()
+        self._animation_task = self._controller.scheduler.callEvery(
+            utils.convert_ms_to_seconds(config.icon_animation_speed),
+            self._animateIconTimeout,
+            "animation",
+            slack=utils.convert_ms_to_seconds(config.icon_animation_slack),
+        )
+
+    def _animateIconTimeout(self):
+        """Animation timer callback."""
+        if not self.animateIcon():
+            _LOGGER.error("Could not switch icon")
 
     def animateIcon(self):
-        """Animate the tray icon. Switch between default and attention icon.
+        """Show the next frame of the cooldown animation.
+
+        The icon blinks between the attention and default icon, with a
+        ring showing the progress of the cooldown.
 
         Returns:
             bool: Whether animation is playing correctly or not.
         """
-        if self.current_icon_file == config.icon:
-            self.setAttentionTrayIcon()
-        elif self.current_icon_file == config.icon_attention:
-            self.setDefaultTrayIcon()
-        else:
+        remaining = self._controller.getRemainingTime()
+        if remaining is None:
             return False
+        self._showFrame(
+            self._animation.next(),
+            icons.progressStep(
+                remaining, self._controller.getCooldownValue()
+            ),
+        )
         return True
 
     def checkTray(self):
@@ -0,0 +1,148 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import struct
+
+_LOGGER = logging.getLogger(__name__)
+
+# sys/inotify.h
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_DIRECTORY_EVENTS = (
+    _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+)
+
+_EVENT = struct.Struct("=iIII")
+_READ_SIZE = 4096
+
+# seconds between checks of the file when inotify isn't available
+_POLL_INTERVAL = 5.0
+
+
+class FileWatcher(object):
+
+    def __init__(self, path, debounce, loop, scheduler, callback, slack=0):
+        """Watch a file for changes made by the user.
+
+        Editors often save by writing a temporary file and renaming it over
+        the original, so the parent directory is watched through inotify
+        rather than the file itself, whose watch would be dropped by the
+        rename. Without inotify the file is checked periodically.
+
+        Args:
+            path (str): The file to watch.
+            debounce (int): Milliseconds without further changes to wait
+                for before calling back.
+            loop (object): The event loop adapter, watches the inotify
+                file descriptor.
+            scheduler (eyecare_reminder.scheduler.Scheduler): Runs the
+                debounce timer.
+            callback (callable): Called without arguments once per burst
+                of changes, after the debounce delay.
+            slack (int): Milliseconds the debounce timer may be late by.
+        """
+        self._path = os.path.abspath(path)
+        self._name = os.fsencode(os.path.basename(self._path))
+        self._scheduler = scheduler
+        self._callback = callback
+        self._debounce = debounce / 1000
+        self._slack = slack / 1000
+        self._task = None
+        self._mtime = self._modificationTime()
+        self._fd = self._openInotify()
+        if self._fd is not None:
+            loop.addReader(self._fd, self._readEvents)
+        else:
+            _LOGGER.info(
+                "WATCHING {} EVERY {}s".format(self._path, _POLL_INTERVAL)
+            )
+            scheduler.callEvery(
+                _POLL_INTERVAL,
+                self._settled,
+                "file_poll",
+                slack=_POLL_INTERVAL / 2,
+            )
+
+    def _openInotify(self):
+        library = ctypes.util.find_library("c")
+        if library is None:
+            return None
+        try:
+            libc = ctypes.CDLL(library, use_errno=True)
+            libc.inotify_add_watch.argtypes = [
+                ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32
+            ]
+            fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        except (OSError, AttributeError) as e:
+            _LOGGER.warning("INOTIFY NOT AVAILABLE: {}".format(e))
+            return None
+        if fd < 0:
+            _LOGGER.warning(
+                "INOTIFY NOT AVAILABLE: {}".format(
+                    os.strerror(ctypes.get_errno())
+                )
+            )
+            return None
+        directory = os.path.dirname(self._path)
+        if libc.inotify_add_watch(
+            fd, os.fsencode(directory), _DIRECTORY_EVENTS
+        ) < 0:
+            _LOGGER.warning(
+                "COULD NOT WATCH {}: {}".format(
+                    directory, os.strerror(ctypes.get_errno())
+                )
+            )
+            os.close(fd)
+            return None
+        return fd
+
+    def _modificationTime(self):
+        try:
+            stat = os.stat(self._path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_ino, stat.st_size
+
+    def _readEvents(self):
+        changed = False
+        while True:
+            try:
+                data = os.read(self._fd, _READ_SIZE)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                _, mask, _, length = _EVENT.unpack_from(data, offset)
+                name = data[
+                    offset + _EVENT.size:offset + _EVENT.size + length
+                ].rstrip(b"\0")
+                offset += _EVENT.size + length
+                if name == self._name or mask & _IN_Q_OVERFLOW:
+                    changed = True
+        if changed:
+            self._pathChanged()
+
+    def _pathChanged(self):
+        # every write of a save restarts the countdown
+        if self._task is not None:
+            self._task.cancel()
+        self._task = self._scheduler.callLater(
+            self._debounce, self._settled, "config_watcher", slack=self._slack
+        )
+
+    def _settled(self):
+        self._task = None
+        mtime = self._modificationTime()
+        if mtime is None or mtime == self._mtime:
+            # nothing changed, or the file is mid-replace
+            return
+        self._mtime = mtime
+        _LOGGER.info("FILE CHANGED: {}".format(self._path))
+        self._callback()
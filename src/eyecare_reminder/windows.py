@@ -0,0 +1,185 @@
+import collections
+import logging
+import threading
+
+from . import x11
+
+_LOGGER = logging.getLogger(__name__)
+
+_WINDOW_EVENT_MASK = x11.PropertyChangeMask | x11.StructureNotifyMask
+_NAME_PROPERTIES = ("_NET_WM_NAME", "WM_NAME", "WM_CLASS")
+
+ActiveWindow = collections.namedtuple("ActiveWindow", ["names", "fullscreen"])
+
+
+def readWindowNames(display, window):
+    """Read the title and class names of a window.
+
+    Args:
+        display (eyecare_reminder.x11.Display): The open display.
+        window (int): The window id.
+
+    Returns:
+        tuple(str): The window title, name and class strings.
+    """
+    names = []
+    for prop in _NAME_PROPERTIES:
+        value = display.getStringProperty(window, prop)
+        if value:
+            names.extend(v for v in value.split("\0") if v)
+    return tuple(names)
+
+
+def getActiveWindow(display):
+    """Read the names and fullscreen state of the focused window.
+
+    Only a handful of property reads on the active window are made,
+    regardless of how many windows are open.
+
+    Args:
+        display (eyecare_reminder.x11.Display): The open display.
+
+    Returns:
+        ActiveWindow or None: The active window, None if there is none.
+    """
+    active = display.getWindowListProperty(display.root, "_NET_ACTIVE_WINDOW")
+    if not active or not active[0]:
+        return None
+    window = active[0]
+    state = display.getWindowListProperty(window, "_NET_WM_STATE")
+    fullscreen = display.internAtom("_NET_WM_STATE_FULLSCREEN") in state
+    return ActiveWindow(readWindowNames(display, window), fullscreen)
+
+
+class WindowIndex(object):
+
+    def __init__(self, display, on_change=None):
+        """In-memory index of the names of the open windows.
+
+        The client list and window names are read once, after which the
+        index keeps itself up to date from PropertyNotify, CreateNotify and
+        DestroyNotify events on the given display.
+
+        Args:
+            display (eyecare_reminder.x11.Display): The open display.
+            on_change (callable, optional): Called without arguments when
+                windows, their names, the focused window or its state
+                change.
+        """
+        self._display = display
+        self._on_change = on_change
+        self._names = {}
+        # the last _NET_CLIENT_LIST, windows leaving it are evicted
+        self._clients = set()
+        self._text = None
+        # events are handled on the GUI thread, probes read from workers
+        self._lock = threading.Lock()
+        display.addEventHandler(x11.PropertyNotify, self._propertyNotify)
+        display.addEventHandler(x11.CreateNotify, self._createNotify)
+        display.addEventHandler(x11.DestroyNotify, self._destroyNotify)
+        display.selectInput(
+            display.root, x11.PropertyChangeMask | x11.SubstructureNotifyMask
+        )
+        self._refreshClientList()
+        display.flush()
+        _LOGGER.info("WINDOW INDEX BUILT: {} WINDOWS".format(len(self._names)))
+
+    @property
+    def text(self):
+        """str: All indexed window names and classes, newline separated.
+
+        Joined once per change so each lookup is a single substring search.
+        """
+        with self._lock:
+            if self._text is None:
+                self._text = "\n".join(
+                    name for names in self._names.values() for name in names
+                )
+            return self._text
+
+    def _addWindow(self, window):
+        if window in self._names:
+            return
+        self._display.selectInput(window, _WINDOW_EVENT_MASK)
+        names = readWindowNames(self._display, window)
+        with self._lock:
+            self._names[window] = names
+            self._text = None
+        self._changed()
+
+    def _removeWindow(self, window):
+        with self._lock:
+            if self._names.pop(window, None) is None:
+                return
+            self._text = None
+        self._changed()
+
+    def _changed(self):
+        if self._on_change is not None:
+            self._on_change()
+
+    def _refreshClientList(self):
+        clients = set(
+            self._display.getWindowListProperty(
+                self._display.root, "_NET_CLIENT_LIST"
+            )
+        )
+        removed = self._clients - clients
+        self._clients = clients
+        for window in clients:
+            self._addWindow(window)
+        # windows the window manager stopped managing, whether or not
+        # their DestroyNotify reached the index
+        with self._lock:
+            evicted = [
+                window for window in removed
+                if self._names.pop(window, None) is not None
+            ]
+            if evicted:
+                self._text = None
+        if evicted:
+            self._changed()
+
+    def _propertyNotify(self, event):
+        window = event.xproperty.window
+        atom = event.xproperty.atom
+        if window == self._display.root:
+            if atom == self._display.internAtom("_NET_CLIENT_LIST"):
+                self._refreshClientList()
+            elif atom == self._display.internAtom("_NET_ACTIVE_WINDOW"):
+                self._changed()
+        elif window in self._names:
+            if any(
+                atom == self._display.internAtom(prop)
+                for prop in _NAME_PROPERTIES
+            ):
+                names = readWindowNames(self._display, window)
+                with self._lock:
+                    self._names[window] = names
+                    self._text = None
+                self._changed()
+            elif atom == self._display.internAtom("_NET_WM_STATE"):
+                self._changed()
+
+    def _createNotify(self, event):
+        if event.xcreatewindow.parent == self._display.root:
+            self._addWindow(event.xcreatewindow.window)
+
+    def _destroyNotify(self, event):
+        self._removeWindow(event.xdestroywindow.window)
+
+
+def createWindowIndex(display, on_change=None):
+    """Create a window index, returning None when X is unavailable.
+
+    Args:
+        display (eyecare_reminder.x11.Display or None): The open display.
+        on_change (callable, optional): Called when the windows change.
+
+    Returns:
+        WindowIndex or None: The window index.
+    """
+    if display is None:
+        _LOGGER.info("WINDOW INDEX UNAVAILABLE, USING XWININFO")
+        return None
+    return WindowIndex(display, on_change=on_change)
@@ -0,0 +1,650 @@
+"""Minimal ctypes bindings to Xlib and the X extensions used by the app.
+
+Only the handful of calls needed for in-process queries are bound, so no
+python X11 package is required. Every binding is loaded lazily the first
+time a display is opened.
+"""
+import ctypes
+import ctypes.util
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+_LIBRARIES = {}
+_THREADS_INITIALIZED = False
+
+# Xlib basic types
+XID = ctypes.c_ulong
+Window = XID
+Atom = ctypes.c_ulong
+Bool = ctypes.c_int
+Status = ctypes.c_int
+
+# XSync constants
+XSyncAbsolute = 0
+XSyncPositiveTransition = 0
+XSyncNegativeTransition = 1
+XSyncCACounter = 1 << 0
+XSyncCAValueType = 1 << 1
+XSyncCAValue = 1 << 2
+XSyncCATestType = 1 << 3
+XSyncCADelta = 1 << 4
+XSyncCAEvents = 1 << 5
+XSyncAlarmNotify = 1
+
+# core protocol constants
+AnyPropertyType = 0
+CreateNotify = 16
+DestroyNotify = 17
+PropertyNotify = 28
+StructureNotifyMask = 1 << 17
+SubstructureNotifyMask = 1 << 19
+PropertyChangeMask = 1 << 22
+
+
+class XSyncValue(ctypes.Structure):
+    _fields_ = [("hi", ctypes.c_int), ("lo", ctypes.c_uint)]
+
+    def toInt(self):
+        """Return the 64 bit value as a python integer.
+
+        Returns:
+            int: The value.
+        """
+        return (self.hi << 32) | self.lo
+
+    @classmethod
+    def fromInt(cls, value):
+        """Build a sync value from a python integer.
+
+        Args:
+            value (int): The value.
+
+        Returns:
+            XSyncValue: The sync value.
+        """
+        return cls(hi=value >> 32, lo=value & 0xFFFFFFFF)
+
+
+class XSyncTrigger(ctypes.Structure):
+    _fields_ = [
+        ("counter", XID),
+        ("value_type", ctypes.c_int),
+        ("wait_value", XSyncValue),
+        ("test_type", ctypes.c_int),
+    ]
+
+
+class XSyncAlarmAttributes(ctypes.Structure):
+    _fields_ = [
+        ("trigger", XSyncTrigger),
+        ("delta", XSyncValue),
+        ("events", Bool),
+        ("state", ctypes.c_int),
+    ]
+
+
+class XSyncAlarmNotifyEvent(ctypes.Structure):
+    _fields_ = [
+        ("type", ctypes.c_int),
+        ("serial", ctypes.c_ulong),
+        ("send_event", Bool),
+        ("display", ctypes.c_void_p),
+        ("alarm", XID),
+        ("counter_value", XSyncValue),
+        ("alarm_value", XSyncValue),
+        ("time", ctypes.c_ulong),
+        ("state", ctypes.c_int),
+    ]
+
+
+class XPropertyEvent(ctypes.Structure):
+    _fields_ = [
+        ("type", ctypes.c_int),
+        ("serial", ctypes.c_ulong),
+        ("send_event", Bool),
+        ("display", ctypes.c_void_p),
+        ("window", Window),
+        ("atom", Atom),
+        ("time", ctypes.c_ulong),
+        ("state", ctypes.c_int),
+    ]
+
+
+class XCreateWindowEvent(ctypes.Structure):
+    _fields_ = [
+        ("type", ctypes.c_int),
+        ("serial", ctypes.c_ulong),
+        ("send_event", Bool),
+        ("display", ctypes.c_void_p),
+        ("parent", Window),
+        ("window", Window),
+        ("x", ctypes.c_int),
+        ("y", ctypes.c_int),
+        ("width", ctypes.c_int),
+        ("height", ctypes.c_int),
+        ("border_width", ctypes.c_int),
+        ("override_redirect", Bool),
+    ]
+
+
+class XDestroyWindowEvent(ctypes.Structure):
+    _fields_ = [
+        ("type", ctypes.c_int),
+        ("serial", ctypes.c_ulong),
+        ("send_event", Bool),
+        ("display", ctypes.c_void_p),
+        ("event", Window),
+        ("window", Window),
+    ]
+
+
+class XEvent(ctypes.Union):
+    _fields_ = [
+        ("type", ctypes.c_int),
+        ("xproperty", XPropertyEvent),
+        ("xcreatewindow", XCreateWindowEvent),
+        ("xdestroywindow", XDestroyWindowEvent),
+        ("xsyncalarm", XSyncAlarmNotifyEvent),
+        ("pad", ctypes.c_long * 24),
+    ]
+
+
+class XSyncSystemCounter(ctypes.Structure):
+    _fields_ = [
+        ("name", ctypes.c_char_p),
+        ("counter", XID),
+        ("resolution", XSyncValue),
+    ]
+
+
+class XScreenSaverInfo(ctypes.Structure):
+    _fields_ = [
+        ("window", Window),
+        ("state", ctypes.c_int),
+        ("kind", ctypes.c_int),
+        ("til_or_since", ctypes.c_ulong),
+        ("idle", ctypes.c_ulong),
+        ("eventMask", ctypes.c_ulong),
+    ]
+
+
+class XError(Exception):
+    """Raised when the X server or an X library is not available."""
+
+
+# windows can disappear between being listed and being queried, the default
+# Xlib error handler would exit the whole process on the resulting BadWindow
+_ERROR_HANDLER_TYPE = ctypes.CFUNCTYPE(
+    ctypes.c_int, ctypes.c_void_p, ctypes.c_void_p
+)
+
+
+@_ERROR_HANDLER_TYPE
+def _ignoreErrors(display, error_event):
+    return 0
+
+
+def _loadLibrary(name, soname):
+    """Load a shared library once and cache it.
+
+    Args:
+        name (str): The library name as passed to ctypes.util.find_library.
+        soname (str): The versioned file name used if the lookup fails.
+
+    Returns:
+        ctypes.CDLL: The loaded library.
+    """
+    if name not in _LIBRARIES:
+        path = ctypes.util.find_library(name) or soname
+        try:
+            _LIBRARIES[name] = ctypes.CDLL(path)
+        except OSError as e:
+            raise XError("Could not load {}: {}".format(soname, e))
+    return _LIBRARIES[name]
+
+
+def _xlib():
+    lib = _loadLibrary("X11", "libX11.so.6")
+    lib.XInitThreads.restype = Status
+    lib.XOpenDisplay.argtypes = [ctypes.c_char_p]
+    lib.XOpenDisplay.restype = ctypes.c_void_p
+    lib.XCloseDisplay.argtypes = [ctypes.c_void_p]
+    lib.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+    lib.XDefaultRootWindow.restype = Window
+    lib.XConnectionNumber.argtypes = [ctypes.c_void_p]
+    lib.XFree.argtypes = [ctypes.c_void_p]
+    lib.XFlush.argtypes = [ctypes.c_void_p]
+    lib.XPending.argtypes = [ctypes.c_void_p]
+    lib.XNextEvent.argtypes = [ctypes.c_void_p, ctypes.POINTER(XEvent)]
+    lib.XSetErrorHandler.argtypes = [_ERROR_HANDLER_TYPE]
+    lib.XSetErrorHandler.restype = ctypes.c_void_p
+    lib.XInternAtom.argtypes = [ctypes.c_void_p, ctypes.c_char_p, Bool]
+    lib.XInternAtom.restype = Atom
+    lib.XSelectInput.argtypes = [ctypes.c_void_p, Window, ctypes.c_long]
+    lib.XGetWindowProperty.argtypes = [
+        ctypes.c_void_p,
+        Window,
+        Atom,
+        ctypes.c_long,
+        ctypes.c_long,
+        Bool,
+        Atom,
+        ctypes.POINTER(Atom),
+        ctypes.POINTER(ctypes.c_int),
+        ctypes.POINTER(ctypes.c_ulong),
+        ctypes.POINTER(ctypes.c_ulong),
+        ctypes.POINTER(ctypes.c_void_p),
+    ]
+    lib.XGetWindowProperty.restype = ctypes.c_int
+    return lib
+
+
+def _xext():
+    lib = _loadLibrary("Xext", "libXext.so.6")
+    lib.XSyncQueryExtension.argtypes = [
+        ctypes.c_void_p,
+        ctypes.POINTER(ctypes.c_int),
+        ctypes.POINTER(ctypes.c_int),
+    ]
+    lib.XSyncQueryExtension.restype = Bool
+    lib.XSyncInitialize.argtypes = [
+        ctypes.c_void_p,
+        ctypes.POINTER(ctypes.c_int),
+        ctypes.POINTER(ctypes.c_int),
+    ]
+    lib.XSyncInitialize.restype = Status
+    lib.XSyncListSystemCounters.argtypes = [
+        ctypes.c_void_p, ctypes.POINTER(ctypes.c_int),
+    ]
+    lib.XSyncListSystemCounters.restype = ctypes.POINTER(XSyncSystemCounter)
+    lib.XSyncFreeSystemCounterList.argtypes = [
+        ctypes.POINTER(XSyncSystemCounter),
+    ]
+    lib.XSyncQueryCounter.argtypes = [
+        ctypes.c_void_p, XID, ctypes.POINTER(XSyncValue),
+    ]
+    lib.XSyncQueryCounter.restype = Status
+    lib.XSyncCreateAlarm.argtypes = [
+        ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(XSyncAlarmAttributes),
+    ]
+    lib.XSyncCreateAlarm.restype = XID
+    lib.XSyncChangeAlarm.argtypes = [
+        ctypes.c_void_p,
+        XID,
+        ctypes.c_ulong,
+        ctypes.POINTER(XSyncAlarmAttributes),
+    ]
+    lib.XSyncChangeAlarm.restype = Status
+    lib.XSyncDestroyAlarm.argtypes = [ctypes.c_void_p, XID]
+    lib.XSyncDestroyAlarm.restype = Status
+    return lib
+
+
+def _xss():
+    lib = _loadLibrary("Xss", "libXss.so.1")
+    lib.XScreenSaverQueryExtension.argtypes = [
+        ctypes.c_void_p,
+        ctypes.POINTER(ctypes.c_int),
+        ctypes.POINTER(ctypes.c_int),
+    ]
+    lib.XScreenSaverQueryExtension.restype = Bool
+    lib.XScreenSaverAllocInfo.restype = ctypes.POINTER(XScreenSaverInfo)
+    lib.XScreenSaverQueryInfo.argtypes = [
+        ctypes.c_void_p, XID, ctypes.POINTER(XScreenSaverInfo),
+    ]
+    lib.XScreenSaverQueryInfo.restype = Status
+    return lib
+
+
+class Display(object):
+
+    def __init__(self, display_name=None):
+        """Open a persistent connection to the X server.
+
+        Args:
+            display_name (str, optional): The display to connect to,
+                defaults to the DISPLAY environment variable.
+
+        Raises:
+            XError: If Xlib is missing or the display can't be opened.
+        """
+        global _THREADS_INITIALIZED
+        self.xlib = _xlib()
+        if not _THREADS_INITIALIZED:
+            # probes may query the display from worker threads
+            self.xlib.XInitThreads()
+            self.xlib.XSetErrorHandler(_ignoreErrors)
+            _THREADS_INITIALIZED = True
+        name = display_name.encode() if display_name else None
+        self.handle = self.xlib.XOpenDisplay(name)
+        if not self.handle:
+            raise XError("Could not open X display {}".format(display_name))
+        self.root = self.xlib.XDefaultRootWindow(self.handle)
+        self._event_handlers = {}
+        self._atoms = {}
+
+    def fileno(self):
+        """Return the file descriptor of the X connection.
+
+        Returns:
+            int: The connection file descriptor.
+        """
+        return self.xlib.XConnectionNumber(self.handle)
+
+    def internAtom(self, name):
+        """Return the atom for a name, caching the round trip.
+
+        Args:
+            name (str): The atom name.
+
+        Returns:
+            int: The atom.
+        """
+        if name not in self._atoms:
+            self._atoms[name] = self.xlib.XInternAtom(
+                self.handle, name.encode(), False
+            )
+        return self._atoms[name]
+
+    def selectInput(self, window, event_mask):
+        """Select the events to receive for a window.
+
+        Args:
+            window (int): The window id.
+            event_mask (int): The event mask.
+        """
+        self.xlib.XSelectInput(self.handle, window, event_mask)
+
+    def getProperty(self, window, name, max_length=1024):
+        """Read a window property.
+
+        Args:
+            window (int): The window id.
+            name (str): The property name.
+            max_length (int): Maximum length to read in 32 bit units.
+
+        Returns:
+            tuple(int, int, bytes) or None: The property type atom,
+                format and raw data, or None if the property is not set.
+        """
+        actual_type = Atom()
+        actual_format = ctypes.c_int()
+        item_count = ctypes.c_ulong()
+        bytes_after = ctypes.c_ulong()
+        data = ctypes.c_void_p()
+        status = self.xlib.XGetWindowProperty(
+            self.handle,
+            window,
+            self.internAtom(name),
+            0,
+            max_length,
+            False,
+            AnyPropertyType,
+            ctypes.byref(actual_type),
+            ctypes.byref(actual_format),
+            ctypes.byref(item_count),
+            ctypes.byref(bytes_after),
+            ctypes.byref(data),
+        )
+        if status != 0 or not data.value:
+            return None
+        try:
+            if actual_format.value == 32:
+                # format 32 items are stored as C longs client side
+                item_size = ctypes.sizeof(ctypes.c_long)
+            else:
+                item_size = actual_format.value // 8
+            raw = ctypes.string_at(data.value, item_count.value * item_size)
+        finally:
+            self.xlib.XFree(data)
+        return actual_type.value, actual_format.value, raw
+
+    def getWindowListProperty(self, window, name):
+        """Read a property holding a list of window ids or atoms.
+
+        Args:
+            window (int): The window id.
+            name (str): The property name.
+
+        Returns:
+            list[int]: The ids, empty if the property is not set.
+        """
+        prop = self.getProperty(window, name, max_length=65536)
+        if prop is None or prop[1] != 32:
+            return []
+        raw = prop[2]
+        count = len(raw) // ctypes.sizeof(ctypes.c_ulong)
+        return list((ctypes.c_ulong * count).from_buffer_copy(raw))
+
+    def getStringProperty(self, window, name):
+        """Read a text property.
+
+        Args:
+            window (int): The window id.
+            name (str): The property name.
+
+        Returns:
+            str or None: The decoded text, or None if not set.
+        """
+        prop = self.getProperty(window, name)
+        if prop is None or prop[1] != 8:
+            return None
+        encoding = "utf-8"
+        if prop[0] != self.internAtom("UTF8_STRING"):
+            encoding = "latin-1"
+        return prop[2].decode(encoding, errors="replace")
+
+    def addEventHandler(self, event_type, callback):
+        """Register a callback for an X event type.
+
+        Args:
+            event_type (int): The X event type.
+            callback (callable): Called with the XEvent for every event.
+        """
+        self._event_handlers.setdefault(event_type, []).append(callback)
+
+    def flush(self):
+        """Flush the output buffer of the connection."""
+        self.xlib.XFlush(self.handle)
+
+    def processEvents(self):
+        """Dispatch all queued events to the registered handlers.
+
+        Should be called whenever the connection file descriptor becomes
+        readable.
+        """
+        event = XEvent()
+        while self.handle and self.xlib.XPending(self.handle):
+            self.xlib.XNextEvent(self.handle, ctypes.byref(event))
+            for callback in self._event_handlers.get(event.type, []):
+                callback(event)
+
+    def close(self):
+        """Close the connection to the X server."""
+        if self.handle:
+            self.xlib.XCloseDisplay(self.handle)
+            self.handle = None
+
+
+def openDisplay(display_name=None):
+    """Open a display, returning None instead of raising when unavailable.
+
+    Args:
+        display_name (str, optional): The display to connect to.
+
+    Returns:
+        Display or None: The opened display.
+    """
+    try:
+        return Display(display_name)
+    except XError as e:
+        _LOGGER.warning("X DISPLAY UNAVAILABLE: {}".format(e))
+        return None
+
+
+class SyncExtension(object):
+
+    def __init__(self, display):
+        """Initialize the X Synchronization extension on a display.
+
+        Args:
+            display (Display): The display to use.
+
+        Raises:
+            XError: If the extension is not supported.
+        """
+        self.display = display
+        self.xext = _xext()
+        event_base = ctypes.c_int()
+        error_base = ctypes.c_int()
+        if not self.xext.XSyncQueryExtension(
+            display.handle, ctypes.byref(event_base), ctypes.byref(error_base)
+        ):
+            raise XError("XSync extension not supported")
+        major = ctypes.c_int()
+        minor = ctypes.c_int()
+        if not self.xext.XSyncInitialize(
+            display.handle, ctypes.byref(major), ctypes.byref(minor)
+        ):
+            raise XError("XSync extension could not be initialized")
+        self.event_base = event_base.value
+
+    def getSystemCounter(self, name):
+        """Return the id of a system counter by name.
+
+        Args:
+            name (str): The counter name, eg. "IDLETIME".
+
+        Returns:
+            int: The counter id.
+
+        Raises:
+            XError: If the counter does not exist.
+        """
+        count = ctypes.c_int()
+        counters = self.xext.XSyncListSystemCounters(
+            self.display.handle, ctypes.byref(count)
+        )
+        if not counters:
+            raise XError("No XSync system counters")
+        try:
+            for i in range(count.value):
+                if counters[i].name.decode() == name:
+                    return counters[i].counter
+        finally:
+            self.xext.XSyncFreeSystemCounterList(counters)
+        raise XError("XSync counter {} not found".format(name))
+
+    def queryCounter(self, counter):
+        """Return the current value of a counter.
+
+        Args:
+            counter (int): The counter id.
+
+        Returns:
+            int: The counter value.
+        """
+        value = XSyncValue()
+        if not self.xext.XSyncQueryCounter(
+            self.display.handle, counter, ctypes.byref(value)
+        ):
+            raise XError("Could not query XSync counter")
+        return value.toInt()
+
+    def _alarmAttributes(self, counter, value, test_type):
+        attributes = XSyncAlarmAttributes()
+        attributes.trigger.counter = counter
+        attributes.trigger.value_type = XSyncAbsolute
+        attributes.trigger.wait_value = XSyncValue.fromInt(value)
+        attributes.trigger.test_type = test_type
+        # a zero delta keeps transition alarms armed after they trigger
+        attributes.delta = XSyncValue.fromInt(0)
+        attributes.events = True
+        mask = (
+            XSyncCACounter
+            | XSyncCAValueType
+            | XSyncCAValue
+            | XSyncCATestType
+            | XSyncCADelta
+            | XSyncCAEvents
+        )
+        return mask, attributes
+
+    def createAlarm(self, counter, value, test_type):
+        """Create an alarm sending events when the counter crosses a value.
+
+        Args:
+            counter (int): The counter id.
+            value (int): The value to wait for.
+            test_type (int): XSyncPositiveTransition or
+                XSyncNegativeTransition.
+
+        Returns:
+            int: The alarm id.
+        """
+        mask, attributes = self._alarmAttributes(counter, value, test_type)
+        alarm = self.xext.XSyncCreateAlarm(
+            self.display.handle, mask, ctypes.byref(attributes)
+        )
+        self.display.flush()
+        return alarm
+
+    def changeAlarm(self, alarm, counter, value, test_type):
+        """Change the value and test of an existing alarm.
+
+        Args:
+            alarm (int): The alarm id.
+            counter (int): The counter id.
+            value (int): The value to wait for.
+            test_type (int): XSyncPositiveTransition or
+                XSyncNegativeTransition.
+        """
+        mask, attributes = self._alarmAttributes(counter, value, test_type)
+        self.xext.XSyncChangeAlarm(
+            self.display.handle, alarm, mask, ctypes.byref(attributes)
+        )
+        self.display.flush()
+
+    def destroyAlarm(self, alarm):
+        """Destroy an alarm.
+
+        Args:
+            alarm (int): The alarm id.
+        """
+        self.xext.XSyncDestroyAlarm(self.display.handle, alarm)
+        self.display.flush()
+
+
+class ScreenSaverExtension(object):
+
+    def __init__(self, display):
+        """Initialize the MIT-SCREEN-SAVER extension on a display.
+
+        Args:
+            display (Display): The display to use.
+
+        Raises:
+            XError: If the extension is not supported.
+        """
+        self.display = display
+        self.xss = _xss()
+        event_base = ctypes.c_int()
+        error_base = ctypes.c_int()
+        if not self.xss.XScreenSaverQueryExtension(
+            display.handle, ctypes.byref(event_base), ctypes.byref(error_base)
+        ):
+            raise XError("MIT-SCREEN-SAVER extension not supported")
+        self._info = self.xss.XScreenSaverAllocInfo()
+
+    def queryIdle(self):
+        """Return the time since the last user input.
+
+        Returns:
+            int: The idle time in milliseconds.
+        """
+        if not self.xss.XScreenSaverQueryInfo(
+            self.display.handle, self.display.root, self._info
+        ):
+            raise XError("Could not query screen saver info")
+        return self._info.contents.idle
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# the tests run against the sources, without installing the package
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src")
+)
@@ -0,0 +1,89 @@
+"""Config snapshots loaded from the layers."""
+import pytest
+
+from eyecare_reminder import config, loader, utils
+
+
+def _defaults():
+    return {
+        key.name: key.default_value for key in config.configKeysAsList()
+    }
+
+
+def _snapshot(**values):
+    return config.ConfigSnapshot(dict(_defaults(), **values), {})
+
+
+def test_snapshot_is_immutable():
+    snapshot = _snapshot()
+    with pytest.raises(AttributeError):
+        snapshot.reminder_interval = 1
+    with pytest.raises(AttributeError):
+        del snapshot.reminder_interval
+
+
+def test_snapshot_lists_are_frozen():
+    names = ["zoom", {"name": "obs*", "match": "glob"}]
+    rules = [{"any": [{"idle": True}, {"process": ["zoom"]}]}]
+    snapshot = _snapshot(
+        blacklist_process_names=names, suppression_rules=rules
+    )
+    names.append("teams")
+    names[1]["name"] = "mpv"
+    rules[0]["any"].pop()
+    assert snapshot.blacklist_process_names == (
+        "zoom", {"name": "obs*", "match": "glob"}
+    )
+    assert snapshot.suppression_rules == (
+        {"any": ({"idle": True}, {"process": ("zoom",)})},
+    )
+    assert isinstance(snapshot.blacklist_window_names, tuple)
+
+
+def test_changed_keys():
+    snapshot = _snapshot(blacklist_window_names=["Zoom"])
+    same = _snapshot(blacklist_window_names=["Zoom"])
+    assert snapshot.changedKeys(same) == set()
+    assert snapshot == _snapshot(blacklist_window_names=("Zoom",))
+    assert snapshot.changedKeys(
+        _snapshot(blacklist_window_names=["Zoom", "Teams"], idle_time=5)
+    ) == {"blacklist_window_names", "idle_time"}
+    assert snapshot.changedKeys(None) == set(
+        key.name for key in config.configKeysAsList()
+    )
+
+
+def test_layers(tmp_path):
+    user_path = tmp_path / "user.yaml"
+    system_path = tmp_path / "system.yaml"
+    defaults = _defaults()
+    utils.write_yaml(
+        str(system_path),
+        dict(defaults, reminder_interval=600, blacklist_process_names=["a"]),
+    )
+    user_path.write_text("reminder_interval: 900\n")
+    config_loader = loader.ConfigLoader(
+        str(user_path),
+        system_paths=[str(system_path)],
+        environment={"EYECARE_REMINDER_IDLE_TIME": "30"},
+        cache_path=str(tmp_path / "cache.json"),
+    )
+    snapshot = config_loader.load()
+    assert snapshot.reminder_interval == 900
+    assert snapshot.blacklist_process_names == ("a",)
+    assert snapshot.idle_time == 30
+    assert snapshot.sources == dict(
+        {key: str(system_path) for key in defaults},
+        reminder_interval=str(user_path),
+        idle_time=loader.ENVIRONMENT_LAYER,
+    )
+
+
+def test_invalid_value(tmp_path):
+    user_path = tmp_path / "user.yaml"
+    utils.write_yaml(str(user_path), dict(_defaults(), reminder_interval=0))
+    config_loader = loader.ConfigLoader(
+        str(user_path), environment={}, cache_path=str(tmp_path / "c.json")
+    )
+    with pytest.raises(loader.ConfigError, match="^reminder_interval in "):
+        config_loader.load()
@@ -0,0 +1,112 @@
+"""Blacklist entries compiled into pattern matchers."""
+import pytest
+
+from eyecare_reminder import config, matcher
+
+
+def _matcher(*rules, ignore_case=False):
+    return matcher.PatternMatcher(
+        [matcher.parseRule(rule, ignore_case=ignore_case) for rule in rules]
+    )
+
+
+def _regex(name, ignore_case=False):
+    return {"name": name, "match": "regex", "ignore_case": ignore_case}
+
+
+def _matched(pattern_matcher, text):
+    pattern = pattern_matcher.search(text)
+    return None if pattern is None else pattern.name
+
+
+def test_match_types():
+    pattern_matcher = _matcher(
+        "Zoom Meeting",
+        {"name": "obs*", "match": "glob"},
+        _regex("^mpv( |$)"),
+    )
+    assert _matched(pattern_matcher, "a\nZoom Meeting - 2\nb") == (
+        "Zoom Meeting"
+    )
+    assert _matched(pattern_matcher, "zoom meeting") is None
+    assert _matched(pattern_matcher, "a\nobs64\nb") == "obs*"
+    # globs match whole names
+    assert _matched(pattern_matcher, "a\nlobster\nb") is None
+    assert _matched(pattern_matcher, "x\nmpv video.mkv") == "^mpv( |$)"
+    assert _matched(pattern_matcher, "x\nmpvpaper") is None
+
+
+def test_ignore_case():
+    pattern_matcher = _matcher("zoom", ignore_case=True)
+    assert _matched(pattern_matcher, "ZOOM") == "zoom"
+    pattern_matcher = _matcher(
+        {"name": "zoom*", "match": "glob", "ignore_case": True}, "Teams"
+    )
+    assert _matched(pattern_matcher, "ZoomWebinar") == "zoom*"
+    assert _matched(pattern_matcher, "teams") is None
+
+
+def test_backreferences():
+    pattern_matcher = _matcher(
+        "zoom", _regex(r"(\w+)-\1"), _regex(r"(\w)(\w)\2\1")
+    )
+    assert _matched(pattern_matcher, "abc-abc") == r"(\w+)-\1"
+    assert _matched(pattern_matcher, "abc-abd") is None
+    assert _matched(pattern_matcher, "abba") == r"(\w)(\w)\2\1"
+    assert _matched(pattern_matcher, "zoom") == "zoom"
+
+
+def test_named_groups():
+    pattern_matcher = _matcher(
+        _regex("(?P<name>a)(?P=name)"), _regex("(?P<name>b)(?P=name)")
+    )
+    assert _matched(pattern_matcher, "aa") == "(?P<name>a)(?P=name)"
+    assert _matched(pattern_matcher, "bb") == "(?P<name>b)(?P=name)"
+    assert _matched(pattern_matcher, "ab") is None
+
+
+def test_global_flags_stay_with_their_pattern():
+    pattern_matcher = _matcher(
+        "Teams", _regex("(?i)zoom"), _regex("(?x) o b s")
+    )
+    assert _matched(pattern_matcher, "ZOOM") == "(?i)zoom"
+    assert _matched(pattern_matcher, "obs") == "(?x) o b s"
+    # (?i) doesn't leak into the other patterns
+    assert _matched(pattern_matcher, "teams") is None
+    assert _matched(pattern_matcher, "Teams") == "Teams"
+
+
+def test_invalid_regex():
+    with pytest.raises(ValueError):
+        _matcher("zoom", _regex("(unclosed"))
+
+
+def test_empty():
+    assert not _matcher()
+    assert _matcher("zoom")
+    assert _matcher(_regex("(a)\\1"))
+    assert _matcher().search("zoom") is None
+
+
+def test_compile_rules_by_mode():
+    matchers = matcher.compileRules([
+        "Zoom",
+        {"name": "Slides", "mode": "active"},
+        {"mode": "fullscreen"},
+    ])
+    assert _matched(matchers[config.window_mode_any], "Zoom") == "Zoom"
+    assert _matched(matchers[config.window_mode_active], "Slides") == (
+        "Slides"
+    )
+    assert matchers[config.window_mode_fullscreen]
+
+
+def test_malformed_entries():
+    for rule in (
+        1,
+        {"name": "zoom", "match": "exact"},
+        {"name": "zoom", "ignore_case": "yes"},
+        {"name": ""},
+    ):
+        with pytest.raises(ValueError):
+            matcher.parseRule(rule)
@@ -0,0 +1,314 @@
+"""The notification client against a fake session bus."""
+import itertools
+import queue
+import socket
+import threading
+import time
+
+import pytest
+from jeepney import HeaderFields, new_error, new_method_return, new_signal
+
+from eyecare_reminder import headless, notifications
+
+_TIMEOUT = 5
+
+
+def _waitFor(predicate):
+    deadline = time.monotonic() + _TIMEOUT
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("Timed out")
+        time.sleep(0.005)
+
+
+class _FakeBus(object):
+
+    def __init__(self, capabilities=("actions", "body")):
+        """A bus connection with the notification server behind it.
+
+        Messages for the client are queued and announced by a byte on the
+        socket the client waits on.
+
+        Args:
+            capabilities (tuple[str]): The server's capabilities.
+        """
+        self.capabilities = capabilities
+        self.sock, self._peer = socket.socketpair()
+        self.outgoing_serial = itertools.count(1)
+        self.calls = queue.Queue()
+        self.matches = []
+        self.hold = False
+        self.held = []
+        self.fail = False
+        self._ids = itertools.count(1)
+        self._incoming = []
+        self._lock = threading.Lock()
+
+    def send_and_get_reply(self, message, timeout=None):
+        message.header.serial = next(self.outgoing_serial)
+        member = message.header.fields[HeaderFields.member]
+        if member == "AddMatch":
+            self.matches.append(message.body[0])
+            return new_method_return(message)
+        if member == "GetCapabilities":
+            return new_method_return(
+                message, "as", (list(self.capabilities),)
+            )
+        return new_error(message, "org.freedesktop.DBus.Error.UnknownMethod")
+
+    def send(self, message, serial=None):
+        message.header.serial = serial or next(self.outgoing_serial)
+        member = message.header.fields[HeaderFields.member]
+        self.calls.put((member, message.body))
+        if member == "Notify":
+            if self.fail:
+                reply = new_error(message, "org.freedesktop.DBus.Error.Failed")
+            else:
+                notification_id = message.body[1] or next(self._ids)
+                reply = new_method_return(message, "u", (notification_id,))
+            if self.hold:
+                self.held.append(reply)
+            else:
+                self.deliver(reply)
+        elif member == "CloseNotification":
+            self.signal(
+                "NotificationClosed",
+                message.body[0],
+                notifications.CLOSED_BY_CALL,
+            )
+
+    def signal(self, member, notification_id, argument):
+        """Emit a NotificationClosed or ActionInvoked signal."""
+        signature = "uu" if member == "NotificationClosed" else "us"
+        self.deliver(new_signal(
+            notifications._NOTIFICATIONS,
+            member,
+            signature,
+            (notification_id, argument),
+        ))
+
+    def release(self):
+        """Deliver the held replies."""
+        self.hold = False
+        held, self.held = self.held, []
+        for reply in held:
+            self.deliver(reply)
+
+    def deliver(self, message):
+        with self._lock:
+            self._incoming.append(message)
+        self._peer.send(b"\0")
+
+    def receive(self, timeout=None):
+        with self._lock:
+            if not self._incoming:
+                raise TimeoutError
+            message = self._incoming.pop(0)
+        self.sock.recv(1)
+        return message
+
+    def close(self):
+        self.sock.close()
+        self._peer.close()
+
+    def nextCall(self):
+        return self.calls.get(timeout=_TIMEOUT)
+
+
+@pytest.fixture
+def bus(monkeypatch):
+    buses = queue.Queue()
+    bus = _FakeBus()
+    buses.put(bus)
+
+    def connect(bus="SESSION"):
+        try:
+            return buses.get_nowait()
+        except queue.Empty:
+            raise ConnectionRefusedError("no bus")
+
+    monkeypatch.setattr(notifications, "open_dbus_connection", connect)
+    monkeypatch.setattr(notifications, "_RECONNECT_DELAYS", (0.01,))
+    bus.queue = buses
+    return bus
+
+
+@pytest.fixture
+def client(bus):
+    events = queue.Queue()
+    client = notifications.NotificationClient(
+        "test",
+        on_action=lambda key, action: events.put(("action", key, action)),
+        on_closed=lambda key, reason: events.put(("closed", key, reason)),
+    )
+    client.events = events
+    assert client.waitConnected(_TIMEOUT)
+    yield client
+    client.shutdown()
+
+
+def test_connects(bus, client):
+    assert client.capabilities == frozenset(["actions", "body"])
+    assert len(bus.matches) == 2
+    for member in ("NotificationClosed", "ActionInvoked"):
+        assert any(
+            "member='{}'".format(member) in rule for rule in bus.matches
+        )
+
+
+def test_notify_replaces_by_key(bus, client):
+    client.notify("reminder", "Summary", "first", actions=[("skip", "Skip")])
+    member, body = bus.nextCall()
+    assert member == "Notify"
+    app_name, replaces, icon, summary, text, actions, hints, timeout = body
+    assert (app_name, replaces, text) == ("test", 0, "first")
+    assert actions == ["skip", "Skip"]
+    assert hints["urgency"] == ("y", notifications.URGENCY_NORMAL)
+    client.notify("reminder", "Summary", "second")
+    assert bus.nextCall()[1][1:5] == (1, "", "Summary", "second")
+    client.notify("other", "Summary", "third")
+    assert bus.nextCall()[1][1] == 0
+
+
+def test_notify_waits_for_the_id(bus, client):
+    bus.hold = True
+    client.notify("reminder", "Summary", "first")
+    assert bus.nextCall()[1][1] == 0
+    # only the latest of the updates sent before the id is known is kept
+    client.notify("reminder", "Summary", "second")
+    client.notify("reminder", "Summary", "third")
+    _waitFor(lambda: not client._requests)
+    assert bus.calls.empty()
+    bus.release()
+    assert bus.nextCall()[1][1:5] == (1, "", "Summary", "third")
+    time.sleep(0.05)
+    assert bus.calls.empty()
+
+
+def test_actions_dropped_without_the_capability(bus):
+    bus.capabilities = ("body",)
+    client = notifications.NotificationClient("test")
+    try:
+        assert client.waitConnected(_TIMEOUT)
+        client.notify("reminder", "Summary", actions=[("skip", "Skip")])
+        assert bus.nextCall()[1][5] == []
+    finally:
+        client.shutdown()
+
+
+def test_close(bus, client):
+    client.close("reminder")
+    client.notify("reminder", "Summary")
+    # nothing to close before the notification was shown
+    assert bus.nextCall()[0] == "Notify"
+    client.close("reminder")
+    assert bus.nextCall() == ("CloseNotification", (1,))
+    assert client.events.get(timeout=_TIMEOUT) == (
+        "closed", "reminder", notifications.CLOSED_BY_CALL
+    )
+    client.notify("reminder", "Summary")
+    assert bus.nextCall()[1][1] == 0
+
+
+def test_signals_dispatched_by_key(bus, client):
+    client.notify("reminder", "Summary")
+    client.notify("other", "Summary")
+    bus.nextCall()
+    bus.nextCall()
+    _waitFor(lambda: len(client._ids) == 2)
+    bus.signal("ActionInvoked", client._ids["reminder"], "skip")
+    assert client.events.get(timeout=_TIMEOUT) == (
+        "action", "reminder", "skip"
+    )
+    bus.signal(
+        "NotificationClosed",
+        client._ids["other"],
+        notifications.CLOSED_DISMISSED,
+    )
+    assert client.events.get(timeout=_TIMEOUT) == (
+        "closed", "other", notifications.CLOSED_DISMISSED
+    )
+    # notifications of other applications
+    bus.signal("ActionInvoked", 99, "default")
+    bus.signal("NotificationClosed", 99, notifications.CLOSED_EXPIRED)
+    client.notify("other", "Summary")
+    assert bus.nextCall()[1][1] == 0
+    assert client.events.empty()
+
+
+def test_failed_notify(bus, client):
+    bus.fail = True
+    client.notify("reminder", "Summary")
+    bus.nextCall()
+    bus.fail = False
+    client.notify("reminder", "Summary")
+    assert bus.nextCall()[1][1] == 0
+
+
+def test_reconnects(bus, client):
+    client.notify("reminder", "Summary")
+    bus.nextCall()
+    second = _FakeBus()
+    bus.queue.put(second)
+    bus.close()
+    _waitFor(lambda: client._connection is second)
+    assert client.waitConnected(_TIMEOUT)
+    # the ids of the old connection aren't reused
+    client.notify("reminder", "Summary")
+    assert second.nextCall()[1][1] == 0
+
+
+def test_not_connected(bus):
+    bus.queue.get()
+    client = notifications.NotificationClient("test")
+    try:
+        assert not client.waitConnected(0.1)
+        client.notify("reminder", "Summary")
+    finally:
+        client.shutdown()
+
+
+class _Loop(object):
+
+    def __init__(self):
+        self.calls = queue.Queue()
+
+    def callSoonThreadsafe(self, callback, *args):
+        self.calls.put(callback)
+
+
+class _Core(object):
+
+    def skipCooldown(self):
+        pass
+
+
+def test_sink_falls_back_without_a_server(bus, capsys):
+    bus.queue.get()
+    sink = headless.NotificationSink()
+    sink.start(_Core(), _Loop())
+    try:
+        sink.send(headless.EVENT_REMINDER, "Look away")
+        assert "Look away" in capsys.readouterr().out
+    finally:
+        sink.close()
+
+
+def test_sink_notifies(bus, capsys):
+    sink = headless.NotificationSink()
+    core, loop = _Core(), _Loop()
+    sink.start(core, loop)
+    try:
+        assert sink._client.waitConnected(_TIMEOUT)
+        sink.send(headless.EVENT_REMINDER, "Look away")
+        member, body = bus.nextCall()
+        assert body[4] == "Look away"
+        assert body[5] == ["skip", "Skip"]
+        _waitFor(lambda: sink._client._ids)
+        bus.signal("ActionInvoked", 1, "skip")
+        assert loop.calls.get(timeout=_TIMEOUT) == core.skipCooldown
+        sink.send(headless.EVENT_REMINDER_CLOSED, "")
+        assert bus.nextCall() == ("CloseNotification", (1,))
+        assert capsys.readouterr().out == ""
+    finally:
+        sink.close()
@@ -0,0 +1,274 @@
+"""The microphone monitor against a fake PulseAudio server."""
+import queue
+import socket
+import threading
+import time
+import types
+
+import pytest
+
+from eyecare_reminder import pulse
+
+_TIMEOUT = 5
+
+
+def _waitFor(predicate):
+    deadline = time.monotonic() + _TIMEOUT
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("Timed out")
+        time.sleep(0.005)
+
+
+class _Output(object):
+
+    def __init__(self, resample_method="", corked=False):
+        """A source output, an application capturing audio."""
+        self.resample_method = resample_method
+        self.corked = corked
+
+    def encode(self, version):
+        tagstruct = pulse.TagStruct()
+        # index, name, module, client, source, sample spec, channel map,
+        # buffer and source latency, only their count matters
+        tagstruct.putU32(1).putString("record")
+        for _ in range(7):
+            tagstruct.putU32(0)
+        tagstruct.putString(self.resample_method).putString("protocol")
+        if version >= 13:
+            tagstruct.putPropList({"application.name": "recorder"})
+        if version >= 19:
+            tagstruct.data += b"1" if self.corked else b"0"
+        return tagstruct.data
+
+
+class _FakeServer(object):
+
+    def __init__(self, version=pulse._PROTOCOL_VERSION, outputs=()):
+        """Answers the requests of every connection made to it.
+
+        Args:
+            version (int): The protocol version the server reports.
+            outputs (list[_Output]): The initial source outputs.
+        """
+        self.version = version
+        self.outputs = list(outputs)
+        self.requests = queue.Queue()
+        self.connections = []
+        self.fail = None
+        self._lock = threading.Lock()
+
+    @property
+    def module(self):
+        """object: Replaces the socket module of pulse."""
+        return types.SimpleNamespace(
+            socket=self._socket,
+            AF_UNIX=socket.AF_UNIX,
+            SOCK_STREAM=socket.SOCK_STREAM,
+            SHUT_RDWR=socket.SHUT_RDWR,
+        )
+
+    def _socket(self, family, type):
+        client, peer = socket.socketpair(family, type)
+        server = self
+
+        class Client(socket.socket):
+
+            def connect(self, address):
+                server.connections.append(peer)
+                threading.Thread(
+                    target=server._serve, args=(peer,), daemon=True
+                ).start()
+
+        return Client(family, type, fileno=client.detach())
+
+    def _serve(self, connection):
+        try:
+            while True:
+                descriptor = self._receive(connection, pulse._DESCRIPTOR.size)
+                length = pulse._DESCRIPTOR.unpack(descriptor)[0]
+                tagstruct = pulse.TagStruct(self._receive(connection, length))
+                command, tag = tagstruct.get(), tagstruct.get()
+                arguments = []
+                while not tagstruct.eof():
+                    arguments.append(tagstruct.get())
+                self.requests.put((command, arguments))
+                self._answer(connection, command, tag)
+        except OSError:
+            pass
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _receive(connection, length):
+        data = b""
+        while len(data) < length:
+            chunk = connection.recv(length - len(data))
+            if not chunk:
+                raise OSError("closed")
+            data += chunk
+        return data
+
+    def _answer(self, connection, command, tag):
+        if command == self.fail:
+            self.send(
+                connection,
+                pulse._COMMAND_ERROR,
+                tag,
+                pulse.TagStruct().putU32(1).data,
+            )
+            return
+        reply = pulse.TagStruct()
+        if command == pulse._COMMAND_AUTH:
+            # the high bits carry flags, such as shared memory support
+            reply.putU32(0x80000000 | self.version)
+        elif command == pulse._COMMAND_SET_CLIENT_NAME:
+            reply.putU32(7)
+        elif command == pulse._COMMAND_GET_SOURCE_OUTPUT_INFO_LIST:
+            for output in self.outputs:
+                reply.data += output.encode(min(self.version, 19))
+        self.send(connection, pulse._COMMAND_REPLY, tag, reply.data)
+
+    def send(self, connection, command, tag, data):
+        payload = pulse.TagStruct().putU32(command).putU32(tag).data + data
+        with self._lock:
+            connection.sendall(
+                pulse._DESCRIPTOR.pack(
+                    len(payload), pulse._COMMAND_CHANNEL, 0, 0, 0
+                )
+                + payload
+            )
+
+    def change(self, outputs):
+        """Replace the source outputs and announce it to the client.
+
+        Args:
+            outputs (list[_Output]): The new source outputs.
+        """
+        self.outputs = list(outputs)
+        event = pulse.TagStruct().putU32(
+            pulse._SUBSCRIPTION_EVENT_SOURCE_OUTPUT
+        ).putU32(1)
+        self.send(
+            self.connections[-1],
+            pulse._COMMAND_SUBSCRIBE_EVENT,
+            0xFFFFFFFF,
+            event.data,
+        )
+
+    def commands(self):
+        commands = []
+        while not self.requests.empty():
+            commands.append(self.requests.get()[0])
+        return commands
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = _FakeServer()
+    monkeypatch.setattr(pulse, "socket", server.module)
+    monkeypatch.setattr(pulse, "_RECONNECT_DELAYS", (0.01,))
+    return server
+
+
+@pytest.fixture
+def monitor(server):
+    changes = queue.Queue()
+    monitors = []
+
+    def start():
+        monitor = pulse.MicrophoneMonitor(
+            socket_path="/nonexistent",
+            cookie_path="/nonexistent",
+            on_change=changes.put,
+        )
+        monitor.changes = changes
+        monitors.append(monitor)
+        return monitor
+
+    yield start
+    for monitor in monitors:
+        monitor.close()
+
+
+def test_handshake(server, monitor):
+    server.version = 32
+    microphone = monitor()
+    assert microphone.waitConnected(_TIMEOUT)
+    assert not microphone.isCaptureActive
+    requests = [server.requests.get() for _ in range(4)]
+    assert [command for command, _ in requests] == [
+        pulse._COMMAND_AUTH,
+        pulse._COMMAND_SET_CLIENT_NAME,
+        pulse._COMMAND_SUBSCRIBE,
+        pulse._COMMAND_GET_SOURCE_OUTPUT_INFO_LIST,
+    ]
+    assert requests[0][1] == [
+        pulse._PROTOCOL_VERSION, bytes(pulse._COOKIE_LENGTH)
+    ]
+    assert requests[1][1] == [{"application.name": b"eyecare_reminder\0"}]
+    assert requests[2][1] == [pulse._SUBSCRIPTION_MASK_SOURCE_OUTPUT]
+    assert microphone._version == pulse._PROTOCOL_VERSION
+
+
+def test_handshake_with_old_server(server, monitor):
+    server.version = 12
+    server.outputs = [_Output()]
+    microphone = monitor()
+    assert microphone.waitConnected(_TIMEOUT)
+    assert microphone.isCaptureActive
+    server.requests.get()
+    assert server.requests.get()[1] == ["eyecare_reminder"]
+
+
+def test_capture_transitions(server, monitor):
+    microphone = monitor()
+    assert microphone.waitConnected(_TIMEOUT)
+    transitions = [
+        ([_Output()], True),
+        ([_Output(corked=True)], False),
+        ([_Output(corked=True), _Output()], True),
+        ([_Output(resample_method="peaks")], False),
+        ([], None),
+        ([_Output()], True),
+        ([], False),
+    ]
+    for outputs, expected in transitions:
+        server.change(outputs)
+        # unchanged states aren't reported, a spurious callback would be
+        # read in place of the next transition
+        if expected is not None:
+            assert microphone.changes.get(timeout=_TIMEOUT) is expected
+            assert microphone.isCaptureActive is expected
+    assert microphone.changes.empty()
+
+
+def test_reconnects_after_disconnect(server, monitor):
+    server.outputs = [_Output()]
+    microphone = monitor()
+    assert microphone.waitConnected(_TIMEOUT)
+    assert microphone.changes.get(timeout=_TIMEOUT) is True
+    server.outputs = []
+    server.connections[0].shutdown(socket.SHUT_RDWR)
+    _waitFor(lambda: len(server.connections) == 2)
+    assert microphone.waitConnected(_TIMEOUT)
+    assert microphone.changes.get(timeout=_TIMEOUT) is False
+    assert server.commands().count(pulse._COMMAND_AUTH) == 2
+
+
+def test_reconnects_after_server_error(server, monitor):
+    server.fail = pulse._COMMAND_SUBSCRIBE
+    microphone = monitor()
+    _waitFor(lambda: len(server.connections) >= 2)
+    assert not microphone.isConnected
+    server.fail = None
+    assert microphone.waitConnected(_TIMEOUT)
+
+
+def test_close_stops_the_thread(server, monitor):
+    microphone = monitor()
+    assert microphone.waitConnected(_TIMEOUT)
+    microphone.close()
+    microphone._thread.join(_TIMEOUT)
+    assert not microphone._thread.is_alive()
+    assert len(server.connections) == 1
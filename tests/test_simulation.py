@@ -0,0 +1,162 @@
+"""Scenarios replayed against the reminder core on the virtual clock."""
+import pytest
+
+from eyecare_reminder import simulation
+
+# a short cycle keeps the timelines readable, a reminder every 10 minutes
+# and a one minute break
+_CONFIG = {
+    "reminder_interval": 600,
+    "reminder_cooldown_interval": 60,
+    "idle_time": 300,
+    "suppress_when_microphone_active": True,
+    "blacklist_process_names": [],
+    "blacklist_window_names": [],
+}
+_CYCLE = 660
+# the simulated timer fires as late as the reminder timer's slack allows
+_LATE = 1
+
+
+def _run(days=0.05, **scenario):
+    scenario = dict(scenario, days=days)
+    scenario["config"] = dict(_CONFIG, **scenario.get("config", {}))
+    return simulation.Simulation(scenario).run()
+
+
+def _timeline(result, until=None):
+    return [
+        (round(entry.time, 3), entry.event)
+        for entry in result.timeline
+        if entry.event != "config_reloaded"
+        and (until is None or entry.time < until)
+    ]
+
+
+def test_interval():
+    result = _run()
+    assert _timeline(result) == [
+        (600 + cycle * _CYCLE + offset + _LATE, event)
+        for cycle in range(6)
+        for offset, event in ((0, "reminder_fired"), (60, "cooldown_finished"))
+        if 600 + cycle * _CYCLE + offset + _LATE < 0.05 * simulation.DAY
+    ]
+
+
+def test_interval_doesnt_drift():
+    result = _run(days=1)
+    reminders = [
+        entry.time for entry in result.timeline
+        if entry.event == "reminder_fired"
+    ]
+    assert len(reminders) == (simulation.DAY - 600 - _LATE) // _CYCLE + 1
+    assert reminders[-1] == 600 + (len(reminders) - 1) * _CYCLE + _LATE
+
+
+def test_cooldown_skipped():
+    result = _run(skips=["00:10:30"])
+    assert _timeline(result, until=1300) == [
+        (600 + _LATE, "reminder_fired"),
+        (630, "cooldown_skipped"),
+        (1230 + _LATE, "reminder_fired"),
+        (1290 + _LATE, "cooldown_finished"),
+    ]
+
+
+def test_cooldown_skip_outside_cooldown_is_ignored():
+    result = _run(skips=["00:05"])
+    assert _timeline(result, until=700) == [
+        (600 + _LATE, "reminder_fired"),
+        (660 + _LATE, "cooldown_finished"),
+    ]
+
+
+def test_idle_period_is_one_break():
+    # crosses the cooldown and the idle time thresholds
+    result = _run(idle=[["00:05", "00:15"]])
+    assert _timeline(result, until=1600) == [
+        (360, "idle_break"),
+        (1500 + _LATE, "reminder_fired"),
+        (1560 + _LATE, "cooldown_finished"),
+    ]
+
+
+def test_short_idle_period_isnt_a_break():
+    result = _run(idle=[["00:05", "00:05:30"]])
+    assert _timeline(result, until=700) == [
+        (600 + _LATE, "reminder_fired"),
+        (660 + _LATE, "cooldown_finished"),
+    ]
+
+
+def test_suppressed_reminder_keeps_the_cycle():
+    result = _run(microphone=[["00:09", "00:12"]])
+    assert result.check([
+        {"at": 600 + _LATE, "event": "timeout_suppressed",
+         "phase": "reminder", "within": 0},
+        {"at": 1200 + _LATE, "event": "reminder_fired", "within": 0},
+        {"at": 1260 + _LATE, "event": "cooldown_finished", "within": 0},
+    ]) == []
+    assert _timeline(result, until=1200) == [
+        (600 + _LATE, "timeout_suppressed")
+    ]
+
+
+def test_suppressed_by_window():
+    result = _run(
+        config={"blacklist_window_names": ["Zoom Meeting"]},
+        windows=[{"name": "Zoom Meeting", "from": "00:09", "to": "00:12"}],
+    )
+    assert _timeline(result, until=1300) == [
+        (600 + _LATE, "timeout_suppressed"),
+        (1200 + _LATE, "reminder_fired"),
+        (1260 + _LATE, "cooldown_finished"),
+    ]
+
+
+def test_suspend_counts_as_break():
+    result = _run(suspend=[["00:03", "00:06"]])
+    assert _timeline(result, until=1300) == [
+        (600 + _LATE, "suspend_break"),
+        (1200 + _LATE, "reminder_fired"),
+        (1260 + _LATE, "cooldown_finished"),
+    ]
+
+
+def test_short_suspend_isnt_a_break():
+    result = _run(suspend=[["00:03", "00:03:30"]])
+    assert _timeline(result, until=700) == [
+        (600 + _LATE, "reminder_fired"),
+        (660 + _LATE, "cooldown_finished"),
+    ]
+
+
+def test_suspend_past_the_deadline_starts_a_fresh_cycle():
+    result = _run(suspend=[["00:08", "00:30"]])
+    assert _timeline(result, until=2500) == [
+        (1800, "suspend_break"),
+        (2400 + _LATE, "reminder_fired"),
+        (2460 + _LATE, "cooldown_finished"),
+    ]
+
+
+def test_changed_interval_keeps_progress():
+    result = _run(
+        config_changes=[{"at": "00:05", "config": {"reminder_interval": 420}}]
+    )
+    assert _timeline(result, until=500) == [
+        (420 + _LATE, "reminder_fired"),
+        (480 + _LATE, "cooldown_finished"),
+    ]
+
+
+def test_missing_expectation_is_reported():
+    result = _run()
+    assert result.check([{"at": 300, "event": "reminder_fired"}]) == [
+        "Expected reminder_fired at day 1 00:05:00 not found"
+    ]
+
+
+def test_malformed_scenario():
+    with pytest.raises(simulation.ScenarioError):
+        simulation.Simulation({"idle": [["00:10", "noon"]]})
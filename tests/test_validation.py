@@ -0,0 +1,92 @@
+"""The validation pipeline running suppression probes."""
+import queue
+import threading
+
+import pytest
+
+from eyecare_reminder import validation
+
+_TIMEOUT = 5
+
+
+@pytest.fixture
+def pipeline():
+    pipeline = validation.ValidationPipeline(max_workers=2)
+    yield pipeline
+    pipeline.shutdown()
+
+
+def _validate(pipeline, probes, max_in_flight=None):
+    results = queue.Queue()
+    pipeline.validate(
+        probes, results.put, context="context", max_in_flight=max_in_flight
+    )
+    return results.get(timeout=_TIMEOUT)
+
+
+class _Check(object):
+
+    def __init__(self, vote=False, block=False):
+        """A probe check counting its calls, optionally until released."""
+        self.vote = vote
+        self.calls = 0
+        self.released = threading.Event()
+        if not block:
+            self.released.set()
+
+    def __call__(self):
+        self.calls += 1
+        self.released.wait(_TIMEOUT)
+        return self.vote
+
+
+def _probe(name, check, timeout=_TIMEOUT, default=False):
+    return validation.Probe(name, check, timeout, default)
+
+
+def test_valid(pipeline):
+    result = _validate(pipeline, [
+        _probe("idle", _Check()), _probe("process", _Check())
+    ])
+    assert result == validation.ValidationResult(True, None, "context")
+
+
+def test_suppressed_before_later_probes_start(pipeline):
+    later = _Check()
+    result = _validate(
+        pipeline,
+        [_probe("idle", _Check(vote=True)), _probe("process", later)],
+        max_in_flight=1,
+    )
+    assert result == validation.ValidationResult(False, "idle", "context")
+    assert later.calls == 0
+
+
+def test_failed_probe_votes_its_default(pipeline):
+    def fail():
+        raise OSError("no display")
+
+    assert _validate(pipeline, [_probe("window", fail)]).valid
+    result = _validate(pipeline, [_probe("window", fail, default=True)])
+    assert not result.valid
+
+
+def test_hung_probe_isnt_started_again(pipeline):
+    hung = _Check(vote=True, block=True)
+    probes = [
+        _probe("microphone", hung, timeout=0.05), _probe("idle", _Check())
+    ]
+    try:
+        assert _validate(pipeline, probes).valid
+        # the abandoned call still holds a worker, another would hold both
+        assert _validate(pipeline, probes).valid
+        assert hung.calls == 1
+        suppressing = [_probe("microphone", hung, timeout=0.05, default=True)]
+        assert not _validate(pipeline, suppressing).valid
+        assert hung.calls == 1
+    finally:
+        hung.released.set()
+    pipeline._abandoned["microphone"].result(timeout=_TIMEOUT)
+    # started again once the abandoned call returned
+    assert not _validate(pipeline, probes).valid
+    assert hung.calls == 2